@@ -0,0 +1,628 @@
+#####################################################################################
+#
+#
+# 	Artifact Store for Out-of-Band Data Exchange Between Airflow Tasks
+#
+#
+#####################################################################################
+
+
+#####################################################################################
+# External Library and Module Imports
+#####################################################################################
+
+# System and OS
+import os
+import time
+import shutil
+import pickle
+import hashlib
+import tempfile
+
+#Data packages
+import numpy as np
+import pandas as pd
+
+#Arrow is optional. Without it, artifacts are stored as pickles
+try:
+	import pyarrow as pa
+	import pyarrow.ipc
+	import pyarrow.parquet as pq
+except ImportError:
+	pa = None
+	pq = None
+
+#####################################################################################
+# Artifact References
+#####################################################################################
+
+#Key identifying an artifact reference in XCom
+ARTIFACT_KEY = '__airbender_artifact__'
+
+#Key identifying a view (rows of a stored frame) in XCom
+VIEW_KEY = '__airbender_view__'
+
+#Environment variables for the default store
+ARTIFACT_ROOT_ENV = 'AIRBENDER_ARTIFACT_ROOT'
+ARTIFACT_FORMAT_ENV = 'AIRBENDER_ARTIFACT_FORMAT'
+ARTIFACT_RETENTION_ENV = 'AIRBENDER_ARTIFACT_RETENTION'
+
+#Retention of the default store in the temporary directory (1 day, in seconds)
+DEFAULT_RETENTION = 24 * 60 * 60
+
+#Chunk size used when fingerprinting artifacts on disk
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def is_artifact_ref(obj):
+	'''
+	Determines whether or not obj is a reference
+	to an artifact held in an artifact store.
+
+	Args:
+		obj:			Potential artifact reference pulled from XCom
+
+	'''
+	return isinstance(obj, dict) and ARTIFACT_KEY in obj
+
+
+def is_view_ref(obj):
+	'''
+	Determines whether or not obj is a view: a
+	reference to rows of a stored frame.
+
+	Args:
+		obj:			Potential view pulled from XCom
+
+	'''
+	return isinstance(obj, dict) and VIEW_KEY in obj
+
+
+def artifact_refs(obj):
+	'''
+	Artifact references held by a value pushed to XCom,
+	including the references a view is built on.
+
+	Args:
+		obj:			Value pushed to XCom
+
+	Returns:
+		refs:			List of artifact references
+
+	'''
+	if is_artifact_ref(obj):
+		return [obj]
+
+	if is_view_ref(obj):
+		return artifact_refs(obj['data']) + artifact_refs(obj['index'])
+
+	return []
+
+#####################################################################################
+# Class and Constructor
+#####################################################################################
+
+class ArtifactStore:
+	'''
+	Base artifact store. Stores DataFrames and Series outside of the
+	Airflow metadata database and hands back a small, JSON serializable
+	reference that can be passed through XCom in their place.
+
+	Subclasses must implement put, get, exists, size, and delete.
+	'''
+
+	def stores(self, value):
+		'''
+		Determines whether a value should be written to the store
+		or passed through XCom as-is.
+
+		Args:
+			value:				Value an operator wants to push
+
+		'''
+		return isinstance(value, (pd.DataFrame, pd.Series))
+
+	def put(self, value):
+		raise NotImplementedError("Artifact stores must implement put")
+
+	def get(self, ref, columns = None):
+		raise NotImplementedError("Artifact stores must implement get")
+
+	def exists(self, ref):
+		raise NotImplementedError("Artifact stores must implement exists")
+
+	def size(self, ref):
+		raise NotImplementedError("Artifact stores must implement size")
+
+	def delete(self, ref):
+		raise NotImplementedError("Artifact stores must implement delete")
+
+
+class LocalArtifactStore(ArtifactStore):
+	'''
+	Content-addressed artifact store on a local (or shared) filesystem.
+	Frames are written as Arrow IPC files or Parquet files and are
+	memory-mapped when they are read back.
+
+	With a retention, prune removes artifacts that have not been
+	written or read for longer than the retention.
+
+	Args:
+		root:					Directory holding all artifacts
+
+	Kwargs:
+		fmt:					Storage format. One of 'arrow', 'parquet', 'pickle'
+		retention:				Seconds an unused artifact is kept by prune. Kept forever if None
+
+	'''
+
+	formats = {'arrow': '.arrow',
+			   'parquet': '.parquet',
+			   'pickle': '.pkl'}
+
+	def __init__(self, root, fmt = 'arrow', retention = None):
+
+		if fmt not in self.formats:
+			raise ValueError("Invalid artifact format: {}. Choose one of: {}"\
+				.format(fmt, ", ".join(self.formats)))
+
+		if retention is not None and retention <= 0:
+			raise ValueError("Artifact retention must be positive, got {}".format(retention))
+
+		#Arrow backed formats require pyarrow
+		if fmt != 'pickle' and pa is None:
+			fmt = 'pickle'
+
+		self.root = os.path.abspath(root)
+		self.fmt = fmt
+		self.retention = retention
+		os.makedirs(self.root, exist_ok = True)
+
+#####################################################################################
+# Public Methods
+#####################################################################################
+
+	def put(self, value):
+		'''
+		Write a DataFrame or Series to the store. The artifact is named
+		by the hash of its contents, so identical data is only stored once.
+		Other picklable values are stored as pickled objects.
+
+		Args:
+			value:				DataFrame, Series, or picklable object to store
+
+		Returns:
+			ref:				Small reference to the stored artifact
+
+		'''
+
+		kind = 'frame'
+		name = None
+		frame = value
+		fmt = self.fmt
+		if isinstance(value, pd.Series):
+			kind = 'series'
+			name = value.name
+			frame = value.to_frame(name = '__series__')
+
+		#Any other value (large task params) is pickled as-is
+		elif not isinstance(value, pd.DataFrame):
+			kind = 'object'
+			fmt = 'pickle'
+
+		#Write to a temporary file, then hash it into place
+		fd, tmp_path = tempfile.mkstemp(dir = self.root, suffix = '.tmp')
+		os.close(fd)
+		try:
+			try:
+				self.__write(frame, tmp_path, fmt)
+			except Exception:
+				#Arrow cannot represent every frame (mixed object columns)
+				if fmt == 'pickle':
+					raise
+				fmt = 'pickle'
+				self.__write(frame, tmp_path, fmt)
+
+			digest = self.__fingerprint(tmp_path)
+			path = self.path(digest, fmt)
+
+			if os.path.exists(path):
+				os.remove(tmp_path)
+				os.utime(path)
+			else:
+				os.makedirs(os.path.dirname(path), exist_ok = True)
+				os.replace(tmp_path, path)
+
+		except Exception:
+			if os.path.exists(tmp_path):
+				os.remove(tmp_path)
+			raise
+
+		return {ARTIFACT_KEY: digest,
+				'format': fmt,
+				'kind': kind,
+				'name': name}
+
+	def get(self, ref, columns = None):
+		'''
+		Read an artifact back from the store. Arrow and Parquet artifacts
+		are memory-mapped rather than read into a separate buffer, and
+		only the requested columns are converted to pandas.
+
+		Args:
+			ref:				Artifact reference returned by put
+
+		Kwargs:
+			columns:			Optional list of frame columns to read
+
+		Returns:
+			value:				DataFrame, Series, or stored object
+
+		'''
+
+		path = self.path(ref[ARTIFACT_KEY], ref['format'])
+		if not os.path.exists(path):
+			raise FileNotFoundError("Artifact {} not found in store at {}"\
+				.format(ref[ARTIFACT_KEY], self.root))
+
+		#Reads count as use, for retention
+		os.utime(path)
+
+		#Series are stored as single-column frames. Objects are read whole
+		if ref['kind'] in ('series', 'object'):
+			columns = None
+
+		frame = self.__read(path, ref['format'], columns)
+
+		if ref['kind'] == 'series':
+			series = frame.iloc[:, 0]
+			series.name = ref['name']
+			return series
+
+		return frame
+
+	def exists(self, ref):
+		'''
+		Determines whether a referenced artifact is still held by the store.
+
+		Args:
+			ref:				Artifact reference returned by put
+
+		'''
+		return os.path.exists(self.path(ref[ARTIFACT_KEY], ref['format']))
+
+	def size(self, ref):
+		'''
+		Bytes a referenced artifact takes up in the store. 
+		Zero if it is no longer held by the store.
+
+		Args:
+			ref:				Artifact reference returned by put
+
+		'''
+		try:
+			return os.path.getsize(self.path(ref[ARTIFACT_KEY], ref['format']))
+		except FileNotFoundError:
+			return 0
+
+	def delete(self, ref):
+		'''
+		Remove a referenced artifact from the store, if it is still held.
+		Artifacts are shared by equal data: every reference to the
+		same content is invalidated.
+
+		Args:
+			ref:				Artifact reference returned by put
+
+		'''
+		try:
+			os.remove(self.path(ref[ARTIFACT_KEY], ref['format']))
+		except FileNotFoundError:
+			pass
+
+	def copy_from(self, store, ref):
+		'''
+		Add an artifact held by another LocalArtifactStore, under the same
+		reference. The file is hard linked when both stores share a
+		filesystem, and copied otherwise. Either way, deleting it from
+		one store leaves it in the other.
+
+		Args:
+			store:				LocalArtifactStore holding the artifact
+			ref:				Artifact reference returned by put
+
+		Raises:
+			FileNotFoundError:	If the other store does not hold the artifact
+
+		'''
+		path = self.path(ref[ARTIFACT_KEY], ref['format'])
+		source = store.path(ref[ARTIFACT_KEY], ref['format'])
+		os.makedirs(os.path.dirname(path), exist_ok = True)
+
+		try:
+			os.link(source, path)
+		except FileExistsError:
+			pass
+		except FileNotFoundError:
+			raise FileNotFoundError("Artifact {} not found in store at {}".format(ref[ARTIFACT_KEY], store.root))
+		except OSError:
+			#Different filesystems: copy, then move into place
+			fd, tmp_path = tempfile.mkstemp(dir = self.root, suffix = '.tmp')
+			os.close(fd)
+			try:
+				shutil.copyfile(source, tmp_path)
+				os.replace(tmp_path, path)
+			except Exception:
+				if os.path.exists(tmp_path):
+					os.remove(tmp_path)
+				raise
+
+		os.utime(path)
+
+	def prune(self, retention = None):
+		'''
+		Remove artifacts, and temporary files left by interrupted
+		writes, that have not been written or read within the retention.
+
+		Kwargs:
+			retention:			Seconds an unused artifact is kept. Defaults to the store retention
+
+		Returns:
+			removed:			Number of files removed
+
+		'''
+		retention = self.retention if retention is None else retention
+		if retention is None:
+			return 0
+
+		cutoff = time.time() - retention
+		extensions = tuple(self.formats.values()) + ('.tmp',)
+
+		removed = 0
+		for path, _, filenames in os.walk(self.root):
+			for filename in filenames:
+				filepath = os.path.join(path, filename)
+				if not filename.endswith(extensions):
+					continue
+
+				try:
+					if os.path.getmtime(filepath) < cutoff:
+						os.remove(filepath)
+						removed += 1
+				#Removed by a concurrent prune
+				except FileNotFoundError:
+					pass
+
+		return removed
+
+	def path(self, digest, fmt):
+		'''
+		Location of an artifact in the store. Artifacts are sharded
+		by the first two characters of their digest.
+
+		Args:
+			digest:				Content hash of the artifact
+			fmt:				Storage format of the artifact
+
+		'''
+		return os.path.join(self.root, digest[:2], digest + self.formats[fmt])
+
+#####################################################################################
+# Private Methods
+#####################################################################################
+
+	def __write(self, frame, path, fmt):
+
+		if fmt == 'pickle':
+			with open(path, 'wb') as file:
+				pickle.dump(frame, file, protocol = pickle.HIGHEST_PROTOCOL)
+			return
+
+		table = pa.Table.from_pandas(frame, preserve_index = True)
+
+		if fmt == 'arrow':
+			with pa.OSFile(path, 'wb') as sink:
+				with pa.ipc.new_file(sink, table.schema) as writer:
+					writer.write_table(table)
+		else:
+			pq.write_table(table, path)
+
+	def __read(self, path, fmt, columns):
+
+		if fmt == 'pickle':
+			with open(path, 'rb') as file:
+				frame = pickle.load(file)
+			if columns is not None:
+				frame = frame.loc[:, columns]
+			return frame
+
+		if fmt == 'arrow':
+			#Reading a memory-mapped IPC file does not touch column buffers,
+			#so projecting afterwards only pages in the selected columns
+			source = pa.memory_map(path, 'r')
+			table = pa.ipc.open_file(source).read_all()
+			if columns is not None:
+				table = table.select(list(columns) + self.__index_columns(table.schema))
+		else:
+			table = pq.read_table(path, 
+								  columns = columns, 
+								  memory_map = True,
+								  use_pandas_metadata = True)
+
+		return table.to_pandas(split_blocks = True)
+
+	def __index_columns(self, schema):
+
+		#Serialized index levels are stored as regular columns
+		metadata = schema.pandas_metadata or {}
+		return [col for col in metadata.get('index_columns', []) 
+					if isinstance(col, str)]
+
+	def __fingerprint(self, path):
+
+		sha = hashlib.sha256()
+		with open(path, 'rb') as file:
+			for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+				sha.update(chunk)
+
+		return sha.hexdigest()
+
+#####################################################################################
+# Store Registry
+#####################################################################################
+
+#Active store. Built lazily from the environment on first use
+_UNSET = object()
+_store = _UNSET
+
+
+def get_artifact_store():
+	'''
+	Returns the active artifact store. Unless one has been set
+	explicitly, a LocalArtifactStore is created from the
+	AIRBENDER_ARTIFACT_ROOT, AIRBENDER_ARTIFACT_FORMAT and
+	AIRBENDER_ARTIFACT_RETENTION (seconds) environment variables. Every
+	worker must see the same root directory.
+
+	Without a root, artifacts are kept in the temporary directory for
+	a day after their last use. Older artifacts are pruned when the
+	store is created.
+
+	Returns:
+		store:				Active ArtifactStore, or None if disabled
+
+	'''
+	global _store
+
+	if _store is _UNSET:
+		root = os.environ.get(ARTIFACT_ROOT_ENV)
+		retention = os.environ.get(ARTIFACT_RETENTION_ENV)
+		retention = float(retention) if retention else None
+
+		if root is None:
+			root = os.path.join(tempfile.gettempdir(), 'airbender_artifacts')
+			retention = retention or DEFAULT_RETENTION
+
+		fmt = os.environ.get(ARTIFACT_FORMAT_ENV, 'arrow')
+		_store = LocalArtifactStore(root, fmt = fmt, retention = retention)
+		_store.prune()
+
+	return _store
+
+
+def set_artifact_store(store):
+	'''
+	Replace the active artifact store. Passing None disables the
+	store, and all data is pushed through XCom directly.
+
+	Args:
+		store:				ArtifactStore instance or None
+
+	'''
+	global _store
+	_store = store
+
+
+def store_data(value):
+	'''
+	Writes value to the active store if it holds data that should
+	not travel through XCom, and returns what should be pushed instead.
+
+	Args:
+		value:				Value an operator wants to push
+
+	Returns:
+		value:				Artifact reference, or value unchanged
+
+	'''
+	store = get_artifact_store()
+	if store is not None and store.stores(value):
+		return store.put(value)
+
+	return value
+
+
+def store_view(data, index = None, column = None, exclude = None):
+	'''
+	Stores a view of the rows and columns of a frame. Only the row
+	positions are stored: many views (train and test splits, folds,
+	features and target) share one stored base frame.
+
+	Args:
+		data:				Artifact reference of the base frame, the frame itself, or another view
+
+	Kwargs:
+		index:				Integer row positions of the view. All rows if None
+		column:				Single column of the view, which makes the view a Series
+		exclude:			Column left out of the view
+
+	Returns:
+		view:				View reference, resolved by load_data
+
+	'''
+	if index is not None:
+		index = np.asarray(index, dtype = np.int64)
+
+		store = get_artifact_store()
+		if store is not None:
+			index = store.put(index)
+
+	return {VIEW_KEY: True,
+			'data': data,
+			'index': index,
+			'column': column,
+			'exclude': exclude}
+
+
+def load_data(value, columns = None):
+	'''
+	Resolves any artifact references found in a value pulled from XCom.
+	Views are resolved to the rows and columns of their base frame.
+	Tuples and lists (from multi-task pulls) are resolved element-wise.
+
+	Args:
+		value:				Value pulled from XCom
+
+	Kwargs:
+		columns:			Optional list of frame columns to read
+
+	Returns:
+		value:				Resolved value
+
+	'''
+	if is_artifact_ref(value):
+		store = get_artifact_store()
+		if store is None:
+			raise ValueError("Found an artifact reference, but no artifact store is active")
+		return store.get(value, columns = columns)
+
+	if is_view_ref(value):
+		return _load_view(value, columns)
+
+	if isinstance(value, (list, tuple)):
+		return type(value)(load_data(item, columns) for item in value)
+
+	return value
+
+
+def _load_view(view, columns):
+
+	#Columns are selected before rows, so only the selected columns are copied
+	if view['column'] is not None:
+		data = load_data(view['data'], columns = [view['column']])[view['column']]
+	else:
+		if columns is not None:
+			columns = [col for col in columns if col != view['exclude']]
+		data = load_data(view['data'], columns = columns)
+		if view['exclude'] is not None:
+			data = data.drop(columns = [view['exclude']])
+
+	index = load_data(view['index'])
+	if index is None:
+		return data
+
+	#Contiguous rows are sliced, without a copy
+	if len(index) and index[-1] - index[0] + 1 == len(index) and np.all(np.diff(index) == 1):
+		return data.iloc[index[0]:index[-1] + 1]
+
+	return data.iloc[index]
@@ -0,0 +1,343 @@
+#####################################################################################
+#
+#
+# 	Task Result Cache: Reuse Outputs of Unchanged Tasks Across Runs
+#
+#
+#####################################################################################
+
+
+#####################################################################################
+# External Library and Module Imports
+#####################################################################################
+
+# System and OS
+import os
+import json
+import pickle
+import hashlib
+import tempfile
+
+#Least recently used ordering of cache entries
+from collections import OrderedDict
+
+#Airbender
+from airbender.dag.utils import callable_name, canonicalize
+from airbender.airflow.artifacts import LocalArtifactStore, get_artifact_store, artifact_refs, ARTIFACT_KEY
+
+#Environment variables for the default cache
+CACHE_ROOT_ENV = 'AIRBENDER_CACHE_ROOT'
+CACHE_MAX_BYTES_ENV = 'AIRBENDER_CACHE_MAX_BYTES'
+
+#Default size bound of the cache (1 GB)
+DEFAULT_MAX_BYTES = 1 << 30
+
+#Directory of the cache's own copies of artifacts, within the cache root
+ARTIFACTS_DIR = 'artifacts'
+
+#####################################################################################
+# Class and Constructor
+#####################################################################################
+
+class TaskResultCache:
+	'''
+	Persistent, size-bounded cache of task results on local disk.
+	Each entry holds everything a task pushed to XCom. Entries are
+	keyed by the task's callable, its params, and the keys of its
+	upstream tasks, so a change anywhere upstream invalidates every
+	task below it. Entries only hold the (small) references pushed in
+	place of data.
+
+	The artifacts entries refer to are shared with experiments, sidecars
+	and other runs in the active artifact store, so the cache never
+	deletes them there. It keeps its own copy of each artifact instead
+	(a hard link, when the cache and the store share a filesystem), and
+	restores it into the active store when an entry is used.
+
+	The size of the cache counts entries and the artifacts they refer
+	to, each artifact once. When the cache grows past max_bytes, the
+	least recently used entries are evicted, along with the cache's
+	copies of artifacts no other entry refers to.
+
+	Kwargs:
+		root:						Directory holding cache entries
+		max_bytes:					Size bound of the cache, in bytes
+
+	'''
+
+	def __init__(self, root = None, max_bytes = None):
+
+		if root is None:
+			root = os.environ.get(CACHE_ROOT_ENV,
+								  os.path.join(tempfile.gettempdir(), 'airbender_cache'))
+		if max_bytes is None:
+			max_bytes = int(os.environ.get(CACHE_MAX_BYTES_ENV, DEFAULT_MAX_BYTES))
+
+		if max_bytes <= 0:
+			raise ValueError("Cache size bound must be positive, got {}".format(max_bytes))
+
+		self.root = os.path.abspath(root)
+		self.max_bytes = max_bytes
+		os.makedirs(self.root, exist_ok = True)
+
+		#Copies of the artifacts entries refer to, owned by the cache
+		self.store = LocalArtifactStore(os.path.join(self.root, ARTIFACTS_DIR))
+
+		#Entry sizes and artifact references, least recently used first
+		self.entries = OrderedDict()
+
+		#Artifacts referred to by entries: (digest, format) -> [ref, bytes, entry count]
+		self.artifacts = {}
+		self.size = 0
+		self.__load_index()
+
+		#Cache statistics
+		self.hits = 0
+		self.misses = 0
+
+#####################################################################################
+# Public Methods
+#####################################################################################
+
+	def key(self, operator, upstream_keys):
+		'''
+		Cache key of an operator. Combines the op_converter callable,
+		the operator params (which embed the wrapped callable), and the
+		keys of all upstream tasks as a fingerprint of the task's inputs.
+		Source files read by the task are fingerprinted by size and
+		modification time.
+
+		Tasks whose params have no canonical form (objects without a
+		stable representation) cannot be keyed, and neither can tasks
+		downstream of them.
+
+		Args:
+			operator:				DagOperator to key
+			upstream_keys:			Cache keys of the operator's upstream tasks
+
+		Returns:
+			key:					Hex digest identifying the task result, or None if uncacheable
+
+		'''
+
+		if any(upstream_key is None for upstream_key in upstream_keys):
+			return None
+
+		try:
+			params = canonicalize(operator.params, strict = True)
+		except TypeError:
+			return None
+
+		fingerprint = {'callable': callable_name(operator.callable),
+					   'params': params,
+					   'upstream': sorted(upstream_keys)}
+
+		filepath = operator.params.get('filepath') if isinstance(operator.params, dict) else None
+		if isinstance(filepath, str) and os.path.exists(filepath):
+			stat = os.stat(filepath)
+			fingerprint['source'] = [stat.st_size, stat.st_mtime_ns]
+
+		return hashlib.sha256(json.dumps(fingerprint, sort_keys = True)\
+								.encode('utf-8')).hexdigest()
+
+	def get(self, key):
+		'''
+		Look up a task result. Artifacts of the entry that are missing
+		from the active artifact store are restored from the cache.
+		Entries whose artifacts the cache no longer holds are dropped
+		and reported as misses.
+
+		Args:
+			key:					Cache key from key()
+
+		Returns:
+			pushes:					List of (xcom_key, value) pushed by the task, or None
+
+		'''
+
+		if key not in self.entries:
+			self.misses += 1
+			return None
+
+		try:
+			with open(self.path(key), 'rb') as file:
+				pushes = pickle.load(file)
+		except (OSError, pickle.UnpicklingError, EOFError):
+			pushes = None
+
+		refs = [] if pushes is None else self.__refs(pushes)
+		if pushes is None or not all(self.store.exists(ref) for ref in refs):
+			self.__remove(key)
+			self.misses += 1
+			return None
+
+		#Without an artifact store, references cannot be restored
+		store = get_artifact_store()
+		if refs and not isinstance(store, LocalArtifactStore):
+			self.misses += 1
+			return None
+
+		for ref in refs:
+			if not store.exists(ref):
+				store.copy_from(self.store, ref)
+
+		#Mark the entry as most recently used
+		self.entries.move_to_end(key)
+		os.utime(self.path(key))
+
+		self.hits += 1
+		return pushes
+
+	def put(self, key, pushes):
+		'''
+		Store a task result, then evict least recently used
+		entries until the cache fits in max_bytes. Results that
+		cannot be pickled are not cached, and neither are results
+		that (with their artifacts) are larger than the whole cache,
+		or that refer to artifacts the active store does not hold.
+
+		Args:
+			key:					Cache key from key()
+			pushes:					List of (xcom_key, value) pushed by the task
+
+		Returns:
+			stored:					Whether or not the result was cached
+
+		'''
+
+		try:
+			payload = pickle.dumps(list(pushes), protocol = pickle.HIGHEST_PROTOCOL)
+		except (pickle.PicklingError, AttributeError, TypeError):
+			return False
+
+		refs = self.__refs(pushes)
+		store = get_artifact_store()
+		if refs and not (isinstance(store, LocalArtifactStore) and all(store.exists(ref) for ref in refs)):
+			return False
+
+		#Results larger than the whole cache are never stored
+		new_refs = [ref for ref in refs if (ref[ARTIFACT_KEY], ref['format']) not in self.artifacts]
+		if len(payload) + sum(store.size(ref) for ref in new_refs) > self.max_bytes:
+			return False
+
+		for ref in new_refs:
+			self.store.copy_from(store, ref)
+
+		path = self.path(key)
+		os.makedirs(os.path.dirname(path), exist_ok = True)
+
+		#Write to a temporary file, then move it into place
+		fd, tmp_path = tempfile.mkstemp(dir = self.root, suffix = '.tmp')
+		with os.fdopen(fd, 'wb') as file:
+			file.write(payload)
+		os.replace(tmp_path, path)
+
+		#Count new artifacts before releasing the old entry, so shared ones are kept
+		self.__add(key, len(payload), refs)
+
+		self.__evict()
+		return True
+
+	def clear(self):
+		'''
+		Remove every entry from the cache, and the
+		cache's copies of the artifacts entries refer to.
+		'''
+		for key in list(self.entries):
+			self.__remove(key)
+
+	def path(self, key):
+		'''
+		Location of a cache entry. Entries are sharded
+		by the first two characters of their key.
+
+		Args:
+			key:					Cache key from key()
+
+		'''
+		return os.path.join(self.root, key[:2], key + '.pkl')
+
+#####################################################################################
+# Private Methods
+#####################################################################################
+
+	def __load_index(self):
+
+		#Recover recency from modification times left by earlier runs
+		found = []
+		for shard in os.listdir(self.root):
+			shard_path = os.path.join(self.root, shard)
+			if shard == ARTIFACTS_DIR or not os.path.isdir(shard_path):
+				continue
+
+			for filename in os.listdir(shard_path):
+				if filename.endswith('.pkl'):
+					stat = os.stat(os.path.join(shard_path, filename))
+					found.append((stat.st_mtime_ns, filename[:-len('.pkl')], stat.st_size))
+
+		for _, key, size in sorted(found):
+			try:
+				with open(self.path(key), 'rb') as file:
+					refs = self.__refs(pickle.load(file))
+			except (OSError, pickle.UnpicklingError, EOFError):
+				os.remove(self.path(key))
+				continue
+
+			self.__add(key, size, refs)
+
+		self.__evict()
+
+	def __evict(self):
+
+		while self.size > self.max_bytes and self.entries:
+			self.__remove(next(iter(self.entries)))
+
+	def __add(self, key, size, refs):
+
+		for ref in refs:
+			artifact = self.artifacts.get((ref[ARTIFACT_KEY], ref['format']))
+			if artifact is None:
+				artifact = [ref, self.store.size(ref), 0]
+				self.artifacts[(ref[ARTIFACT_KEY], ref['format'])] = artifact
+				self.size += artifact[1]
+			artifact[2] += 1
+
+		#Replacing an entry releases its previous artifacts
+		self.__release(key)
+		self.entries[key] = (size, refs)
+		self.size += size
+
+	def __remove(self, key):
+
+		self.__release(key)
+		try:
+			os.remove(self.path(key))
+		except FileNotFoundError:
+			pass
+
+	def __release(self, key):
+
+		if key not in self.entries:
+			return
+
+		size, refs = self.entries.pop(key)
+		self.size -= size
+
+		#Copies no other entry refers to are removed. The active store is never touched
+		for ref in refs:
+			artifact = self.artifacts[(ref[ARTIFACT_KEY], ref['format'])]
+			artifact[2] -= 1
+			if artifact[2] == 0:
+				del self.artifacts[(ref[ARTIFACT_KEY], ref['format'])]
+				self.size -= artifact[1]
+				self.store.delete(ref)
+
+	def __refs(self, pushes):
+
+		#Each artifact once per entry
+		refs = OrderedDict()
+		for _, value in pushes:
+			for ref in artifact_refs(value):
+				refs.setdefault((ref[ARTIFACT_KEY], ref['format']), ref)
+
+		return list(refs.values())
@@ -0,0 +1,279 @@
+#####################################################################################
+#
+#
+# 	Local Executor: Run Generated Experiments In-Process
+#
+#
+#####################################################################################
+
+
+#####################################################################################
+# External Library and Module Imports
+#####################################################################################
+
+# System and OS
+import time
+import types
+
+#Parallel execution
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+#Preserve order of tasks
+from collections import OrderedDict
+
+#Airbender XCom stand-in and artifact store
+from airbender.airflow import artifacts
+from airbender.airflow.xcom import LocalXComBackend, LocalTaskInstance, XCOM_RETURN_KEY
+
+#####################################################################################
+# Class and Constructor
+#####################################################################################
+
+class LocalExecutor:
+	'''
+	Executes the experiment described by a DagGenerator without Airflow.
+	The op_converter callables of every task in the generator's graph are
+	run directly, in dependency order, on a thread or process pool.
+	Independent operator families run in parallel. XCom is replaced by a 
+	LocalXComBackend.
+
+	Args:
+		generator:					DagGenerator for the experiment
+
+	Kwargs:
+		max_workers:				Size of the worker pool. Defaults to the pool default
+		processes:					Run tasks in a process pool instead of a thread pool
+		cache:						Optional TaskResultCache. Tasks with a cached result are skipped
+
+	'''
+
+	def __init__(self, generator, max_workers = None, processes = False, cache = None):
+
+		self.generator = generator
+		self.max_workers = max_workers
+		self.processes = processes
+		self.cache = cache
+
+		#Cache key of each task, and tasks restored from the cache
+		self.cache_keys = {}
+		self.cached_tasks = []
+
+		#Operators keyed by task id, and their upstream task ids
+		self.operators = OrderedDict()
+		self.upstream = OrderedDict()
+
+		#XCom stand-in shared by every task
+		self.xcom = LocalXComBackend()
+
+		#Execution statistics
+		self.task_timings = OrderedDict()
+		self.wall_time = None
+
+#####################################################################################
+# Public Methods
+#####################################################################################
+
+	def run(self):
+		'''
+		Build the experiment graph (if the generator has not been built)
+		and execute every task once its upstream tasks have finished.
+		If a cache is set, tasks with a cached result are not executed;
+		their stored XCom values are restored instead.
+
+		Raises:
+			RuntimeError:			If any task fails. No new tasks are started
+
+		Returns:
+			xcom:					LocalXComBackend holding every task's output
+
+		'''
+
+		if not self.generator.built:
+			self.generator.build()
+
+		self.collect_graph()
+
+		#Remaining upstream count and downstream tasks for each task
+		remaining = {task_id: len(upstream) for task_id, upstream in self.upstream.items()}
+		downstream = {task_id: [] for task_id in self.upstream}
+		for task_id, upstream in self.upstream.items():
+			for upstream_id in upstream:
+				downstream[upstream_id].append(task_id)
+
+		pool_type = ProcessPoolExecutor if self.processes else ThreadPoolExecutor
+		start = time.perf_counter()
+
+		self.cache_keys.clear()
+		self.task_timings.clear()
+		self.cached_tasks = []
+		finished = set()
+
+		ready = deque(task_id for task_id, count in remaining.items() if count == 0)
+
+		def release(task_id):
+			#Queue downstream tasks whose upstream tasks are all done
+			finished.add(task_id)
+			for downstream_id in downstream[task_id]:
+				remaining[downstream_id] -= 1
+				if remaining[downstream_id] == 0:
+					ready.append(downstream_id)
+
+		with pool_type(max_workers = self.max_workers) as pool:
+
+			running = {}
+
+			while ready or running:
+
+				while ready:
+					task_id = ready.popleft()
+					if self.__restore(task_id):
+						release(task_id)
+					else:
+						running[self.__submit(pool, task_id)] = task_id
+
+				if not running:
+					break
+
+				done, _ = wait(running, return_when = FIRST_COMPLETED)
+
+				for future in done:
+					task_id = running.pop(future)
+
+					try:
+						pushes, timing = future.result()
+					except Exception as e:
+						for pending in running:
+							pending.cancel()
+						raise RuntimeError("Task {} failed during local execution".format(task_id)) from e
+
+					#Process pool workers return their pushes to the shared XCom
+					for key, value in pushes:
+						self.xcom.push(task_id, key, value)
+					self.task_timings[task_id] = timing
+
+					if self.cache is not None and self.cache_keys[task_id] is not None:
+						self.cache.put(self.cache_keys[task_id],
+									   [(key, value) for _, key, value in self.xcom.records(task_id)])
+
+					release(task_id)
+
+		self.wall_time = time.perf_counter() - start
+
+		if len(finished) != len(self.operators):
+			raise RuntimeError("Dependency cycle detected. Tasks never run: {}"\
+				.format(", ".join(set(self.operators) - finished)))
+
+		return self.xcom
+
+
+	def collect_graph(self):
+		'''
+		Collect every task in the generator's graph and the upstream
+		tasks of each. These are the same dependencies that are 
+		emitted to the generated DAG file.
+
+		'''
+
+		graph = self.generator.graph
+
+		self.operators = OrderedDict(graph.tasks)
+		self.upstream = OrderedDict((task_id, set(upstream)) 
+										for task_id, upstream in graph.upstream.items())
+
+#####################################################################################
+# Private Methods
+#####################################################################################
+
+	def __restore(self, task_id):
+
+		if self.cache is None:
+			return False
+
+		#Upstream keys are known once every upstream task is done
+		key = self.cache.key(self.operators[task_id],
+							 [self.cache_keys[upstream_id] for upstream_id in self.upstream[task_id]])
+		self.cache_keys[task_id] = key
+		if key is None:
+			return False
+
+		pushes = self.cache.get(key)
+		if pushes is None:
+			return False
+
+		for xcom_key, value in pushes:
+			self.xcom.push(task_id, xcom_key, value)
+		self.cached_tasks.append(task_id)
+
+		return True
+
+	def __submit(self, pool, task_id):
+
+		operator = self.operators[task_id]
+
+		if self.processes:
+			return pool.submit(_execute_in_process,
+							   operator.callable,
+							   operator.params,
+							   task_id,
+							   self.xcom.records(),
+							   artifacts.get_artifact_store())
+
+		return pool.submit(_execute, operator.callable, operator.params, task_id, self.xcom)
+
+#####################################################################################
+# Task Execution
+#####################################################################################
+
+def _execute(p_callable, params, task_id, xcom):
+	'''
+	Run one op_converter callable the way Airflow's PythonOperator
+	would, with the task context passed as keyword arguments.
+	Return values are pushed to XCom under the default key.
+
+	Args:
+		p_callable:					op_converter callable
+		params:						Operator params
+		task_id:					Task being executed
+		xcom:						LocalXComBackend the task reads and writes
+
+	Returns:
+		pushes:						Pushes to forward to the shared XCom (always empty)
+		timing:						Wall time of the task, in seconds
+
+	'''
+
+	ti = LocalTaskInstance(task_id, xcom)
+
+	start = time.perf_counter()
+	result = p_callable(params = params,
+						dag = None,
+						ti = ti,
+						task = types.SimpleNamespace(task_id = task_id))
+	if result is not None:
+		ti.xcom_push(key = XCOM_RETURN_KEY, value = result)
+
+	return [], time.perf_counter() - start
+
+
+def _execute_in_process(p_callable, params, task_id, xcom_records, store):
+	'''
+	Process pool entry point. Rebuilds XCom from a snapshot, runs the
+	task, and returns whatever the task pushed so the parent process can
+	merge it into the shared XCom. Frames travel through the artifact
+	store, so the snapshot usually holds only small references.
+
+	'''
+
+	artifacts.set_artifact_store(store)
+
+	xcom = LocalXComBackend()
+	for pushed_by, key, value in xcom_records:
+		xcom.push(pushed_by, key, value)
+
+	_, timing = _execute(p_callable, params, task_id, xcom)
+
+	pushes = [(key, value) for pushed_by, key, value in xcom.records()
+								if pushed_by == task_id]
+
+	return pushes, timing
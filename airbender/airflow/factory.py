@@ -0,0 +1,112 @@
+#####################################################################################
+#
+#
+# 	DAG Factory: Build Airflow DAGs from Serialized Experiment Specs
+#
+#
+#####################################################################################
+
+
+#####################################################################################
+# External Library and Module Imports
+#####################################################################################
+
+#Imported by every spec-based DAG file. Like the lazy task runner,
+#this module must stay light: Airflow is the only heavy import
+import os
+import copy
+import json
+import threading
+
+#Datetime information
+from datetime import datetime
+
+#Airbender lazy task runner
+from airbender.airflow.lazy import run_lazy_task
+
+#Version of the spec format written by the DagEmitter
+SPEC_VERSION = 1
+
+#Parsed specs keyed by path, with the modification time they were read at
+_SPEC_CACHE = {}
+_SPEC_LOCK = threading.Lock()
+
+#####################################################################################
+# DAG Factory
+#####################################################################################
+
+def build_dag(spec_path):
+	'''
+	Builds the Airflow DAG of an experiment from its spec. Every task
+	runs run_lazy_task with its lazy params, so neither the spec nor
+	the tasks' callables are imported while the scheduler parses.
+
+	Args:
+		spec_path:					Path of the experiment spec
+
+	Returns:
+		dag:						Airflow DAG
+
+	'''
+
+	from airflow import DAG
+	from airflow.operators.python_operator import PythonOperator
+
+	spec = load_spec(spec_path)
+
+	dag = DAG(spec['dag_name'],
+			  default_args = copy.deepcopy(spec['default_args']),
+			  start_date = datetime.today(),
+			  schedule_interval = '@once')
+
+	tasks = {}
+	for task in spec['tasks']:
+		tasks[task['task_id']] = PythonOperator(task_id = task['task_id'],
+												provide_context = True,
+												python_callable = run_lazy_task,
+												params = copy.deepcopy(task['params']),
+												dag = dag)
+
+	for task_id, upstream in spec['upstream'].items():
+		for upstream_id in upstream:
+			tasks[upstream_id] >> tasks[task_id]
+
+	return dag
+
+
+def load_spec(spec_path):
+	'''
+	Reads an experiment spec. Specs are parsed once and cached until the
+	file's modification time changes, so repeated parses of the same
+	DAG file only stat the spec.
+
+	Args:
+		spec_path:					Path of the experiment spec
+
+	Raises:
+		ValueError:					If the spec was written in another format version
+
+	Returns:
+		spec:						Parsed spec. Must not be modified
+
+	'''
+
+	spec_path = os.path.abspath(spec_path)
+	mtime = os.stat(spec_path).st_mtime_ns
+
+	with _SPEC_LOCK:
+		cached = _SPEC_CACHE.get(spec_path)
+		if cached is not None and cached[0] == mtime:
+			return cached[1]
+
+	with open(spec_path, 'r') as spec_file:
+		spec = json.load(spec_file)
+
+	if spec.get('version') != SPEC_VERSION:
+		raise ValueError("Experiment spec {} has format version {}, expected {}. Regenerate the experiment."\
+			.format(spec_path, spec.get('version'), SPEC_VERSION))
+
+	with _SPEC_LOCK:
+		_SPEC_CACHE[spec_path] = (mtime, spec)
+
+	return spec
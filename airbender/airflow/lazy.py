@@ -0,0 +1,156 @@
+#####################################################################################
+#
+#
+# 	Lazy Task Execution: Resolve Callables Inside the Task
+#
+#
+#####################################################################################
+
+
+#####################################################################################
+# External Library and Module Imports
+#####################################################################################
+
+#This module is imported by generated DAG files when imports are lazy.
+#It must stay light: nothing heavier than the standard library is imported here
+import importlib
+import functools
+
+from airbender.dag.utils import is_callable, callable_name
+
+#Key of a callable reference in lazy task params
+CALLABLE_KEY = '__callable__'
+
+#####################################################################################
+# Task Execution
+#####################################################################################
+
+def run_lazy_task(params, dag, **kwargs):
+	'''
+	Airflow callable for tasks generated with lazy imports. The
+	operation and every callable in its params are referenced by
+	dotted path, and are only imported when the task runs. The
+	scheduler therefore never imports them when parsing the DAG file.
+
+	Args:
+		params:						Lazy params, holding the operation and its params
+		dag:						Airflow DAG
+
+	Kwargs:
+		kwargs:						Task context, passed on to the operation
+
+	Returns:
+		result:						Return value of the operation
+
+	'''
+
+	operation = resolve_callable(params['operation'])
+
+	return operation(params = resolve_params(params['params']), dag = dag, **kwargs)
+
+#####################################################################################
+# Lazy Params
+#####################################################################################
+
+def lazy_params(p_callable, params):
+	'''
+	Converts an operation and its params into lazy params. Callables
+	in the params are replaced by references to their dotted path.
+
+	Args:
+		p_callable:					op_converter callable of the task
+		params:						Params of the task
+
+	Returns:
+		lazy:						Params for run_lazy_task
+
+	'''
+	return {'operation': callable_name(p_callable),
+			'params': _to_references(params)}
+
+
+def resolve_params(params):
+	'''
+	Replaces callable references in lazy params with the
+	callables they refer to.
+
+	Args:
+		params:						Params, or a nested dict or list within them
+
+	Returns:
+		resolved:					Params with callables imported
+
+	'''
+	if isinstance(params, dict):
+		if list(params) == [CALLABLE_KEY]:
+			return resolve_callable(params[CALLABLE_KEY])
+		return {k: resolve_params(v) for k,v in params.items()}
+
+	if isinstance(params, (list, tuple)):
+		return type(params)(resolve_params(item) for item in params)
+
+	return params
+
+
+@functools.lru_cache(maxsize = None)
+def resolve_callable(name):
+	'''
+	Imports a callable from its dotted path, in the form module:qualname.
+
+	Args:
+		name:						Dotted path of the callable
+
+	Raises:
+		ImportError:				If the callable cannot be found
+
+	Returns:
+		obj:						Callable
+
+	'''
+
+	module_name, _, qualname = name.partition(':')
+
+	obj = importlib.import_module(module_name)
+	for attr in qualname.split('.'):
+		try:
+			obj = getattr(obj, attr)
+		except AttributeError:
+			raise ImportError("Cannot resolve lazy callable {}".format(name))
+
+	return obj
+
+
+def unwrap_lazy(p_callable, params):
+	'''
+	Operation and params a task runs, whether or not it is lazy.
+
+	Args:
+		p_callable:					op_converter callable of the task
+		params:						Params of the task
+
+	Returns:
+		operation:					op_converter callable the task runs
+		params:						Params of that operation. Callables in lazy params stay references
+
+	'''
+	if p_callable is run_lazy_task:
+		return resolve_callable(params['operation']), params['params']
+
+	return p_callable, params
+
+#####################################################################################
+# Private Helpers
+#####################################################################################
+
+def _to_references(params):
+
+	if is_callable(params):
+		return {CALLABLE_KEY: callable_name(params)}
+
+	if isinstance(params, dict):
+		return {k: _to_references(v) for k,v in params.items()}
+
+	if isinstance(params, (list, tuple)):
+		return type(params)(_to_references(item) for item in params)
+
+	return params
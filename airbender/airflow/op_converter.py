@@ -18,6 +18,7 @@ import os
 import sys
 
 #Operator converter
+import numpy as np
 import pandas as pd
 
 #Time 
@@ -27,59 +28,199 @@ from datetime import datetime, timedelta
 import json
 import inspect
 
+#Preserve order of merged columns
+from collections import OrderedDict
+
+#Decorating operations
+import functools
+
+#Out-of-band storage for data passed between tasks
+from airbender.airflow.artifacts import store_data, store_view, load_data, is_artifact_ref
+
+#Evaluation of every metric of one or many models at once
+from airbender.static.evaluation import evaluate_model, evaluate_models
+
+#Splits of the data, and the split of tasks that fit on the train
+#split and apply the fitted result to the test split (fused splits)
+SPLITS = ['train', 'test']
+FUSED_SPLIT = 'train_test'
+
+#####################################################################################
+# Splits
+#####################################################################################
+
+def task_splits(split):
+	'''
+	Splits of the data a task handles.
+
+	Args:
+		split:						Split param of the task
+
+	Returns:
+		splits:						Both splits for fused tasks, otherwise [split]
+
+	'''
+	return SPLITS if split == FUSED_SPLIT else [split]
+
+#####################################################################################
+# Sidecar Params
+#####################################################################################
+
+def sidecar_params(operation):
+	'''
+	Decorator for operations. Large literal params can be stored in the
+	artifact store at generation time (sidecars), leaving only a reference
+	in the DAG file. References are loaded when the task runs.
+
+	Args:
+		operation:					op_converter callable
+
+	'''
+	@functools.wraps(operation)
+	def load_sidecars(params, dag, **kwargs):
+		return operation(load_params(params), dag, **kwargs)
+
+	return load_sidecars
+
+
+def load_params(params):
+	'''
+	Replaces sidecar references in task params with the values
+	they refer to.
+
+	Args:
+		params:						Task params, or a nested dict or list within them
+
+	Returns:
+		params:						Params with sidecars loaded
+
+	'''
+	if is_artifact_ref(params):
+		return load_data(params)
+
+	if isinstance(params, dict):
+		return {k: load_params(v) for k,v in params.items()}
+
+	if isinstance(params, list):
+		return [load_params(item) for item in params]
+
+	return params
+
 #####################################################################################
 # Class and Constructor
 #####################################################################################
 
 
+@sidecar_params
 def evaluation_operation(params, dag, **kwargs):
 
 	ti = kwargs['ti']
 
 	preds = ti.xcom_pull(task_ids = params['model_id'])
-	y_test = ti.xcom_pull(key = 'y_test')
+	y_test = load_data(ti.xcom_pull(key = 'y_test', task_ids = _source(params, 'y_test')))
 
 	return params['func'](y_test, preds, **params['params'])
 
+@sidecar_params
+def model_evaluation_operation(params, dag, **kwargs):
+	"""
+	Evaluates every metric of one model in a single task. The
+	predictions and y_test are pulled once, and metrics are
+	derived from a confusion matrix built once.
+	"""
+	ti = kwargs['ti']
+
+	preds = ti.xcom_pull(task_ids = params['model_id'])
+	y_test = load_data(ti.xcom_pull(key = 'y_test', task_ids = _source(params, 'y_test')))
+
+	return {params['model_id']: evaluate_model(y_test, preds, params['metrics'])}
+
+@sidecar_params
+def stacked_evaluation_operation(params, dag, **kwargs):
+	"""
+	Evaluates every metric of many models in a single task. The
+	predictions of all models are pulled in one query and stacked,
+	and each metric is computed for all models in one NumPy pass.
+	"""
+	ti = kwargs['ti']
+
+	preds = ti.xcom_pull(task_ids = params['model_ids'])
+	y_test = load_data(ti.xcom_pull(key = 'y_test', task_ids = _source(params, 'y_test')))
+
+	return evaluate_models(y_test, preds, params['model_ids'], params['metrics'])
+
+@sidecar_params
 def merge_metrics_operation(params, dag, **kwargs):
 
 	ti = kwargs['ti']
 
-	metrics_dict = {params['model']: {}}
+	#Fetch every metric in one batched pull
+	metrics = ti.xcom_pull(task_ids = params['merge_ids'])
 
-	for task_id in params['merge_ids']:
-		metric = ti.xcom_pull(task_ids = task_id)
-		metrics_dict[params['model']][task_id] = metric
+	#Model evaluation tasks return many metrics, by model and metric task id
+	merged = OrderedDict()
+	for task_id, value in zip(params['merge_ids'], metrics):
+		if task_id in params.get('evaluations', []):
+			merged.update(value[params['model']])
+		else:
+			merged[task_id] = value
+
+	metrics_dict = {params['model']: dict(merged)}
 		
 	return metrics_dict
 
+@sidecar_params
 def merge_data_operation(params, dag, **kwargs):
 
 	ti = kwargs['ti']
-	data = ti.xcom_pull(key = params['split'])
 
-	persist_cols = []
+	#Collect every engineered column, in one batched pull, before building 
+	#the output. Fused tasks return the result of each split, by split
+	results = list(ti.xcom_pull(task_ids = params['merge_ids'], key = 'return_value'))
+
+	for split in task_splits(params['split']):
+		split_results = [result[split] if params['split'] == FUSED_SPLIT and isinstance(result, dict) 
+							else result for result in results]
+		data = _merge_split(params, ti, split, load_data(split_results))
+		ti.xcom_push(key = split, value = store_data(data))
+
+def _merge_split(params, ti, split, results):
+
+	#Only the pass-through columns (and the index) are read from the split
+	base = load_data(ti.xcom_pull(key = split, task_ids = _source(params, split)),
+					 columns = params['pass_through_cols'])
+	base = base.loc[:, params['pass_through_cols']]
 
-	for task_id in params['merge_ids']:
-		task_data = ti.xcom_pull(task_ids = task_id, key = 'return_value')
+	#Results are aligned by position, as transforms may reset the index
+	merged_cols = OrderedDict()
 
-		if isinstance(task_data, pd.DataFrame):
-			persist_cols += list(task_data.columns)
-			data = pd.concat([data, task_data], axis = 1)
-		elif isinstance(task_data, pd.Series):
+	for task_id, task_data in zip(params['merge_ids'], results):
 
-			persist_cols.append(task_data.name)
-			data[task_data.name] = task_data.values
+		if not isinstance(task_data, (pd.DataFrame, pd.Series)):
+			continue
 
-	#Only persist mentioned
-	data = data.loc[:,persist_cols + params['pass_through_cols']]
+		if len(task_data) != len(base):
+			raise ValueError("Merged task {} returned {} rows, expected {}"\
+				.format(task_id, len(task_data), len(base)))
 
-	ti.xcom_push(key = params['split'], value = data)
+		if isinstance(task_data, pd.Series):
+			merged_cols[task_data.name] = task_data.array
+		else:
+			for col, values in task_data.items():
+				merged_cols[col] = values.array
+
+	for col, values in base.items():
+		merged_cols[col] = values.array
+
+	#Build the output frame in a single allocation
+	return pd.DataFrame(merged_cols, index = base.index)
 
+@sidecar_params
 def bulk_data_operation(params, dag, **kwargs):
 	ti = kwargs['ti']
 
-	data = ti.xcom_pull(key = params['split'])
+	if params['split'] != FUSED_SPLIT:
+		data = load_data(ti.xcom_pull(key = params['split'], task_ids = _source(params, params['split'])))
 
 	if params['split'] == 'train':
 		data = params['func'](data, **params['params'])
@@ -90,7 +231,7 @@ def bulk_data_operation(params, dag, **kwargs):
 			
 		
 		ti.xcom_push(key = 'artifact', value = artifact)
-		ti.xcom_push(key = params['split'], value = data)
+		ti.xcom_push(key = params['split'], value = store_data(data))
 
 
 	elif params['split'] == 'test':
@@ -100,83 +241,212 @@ def bulk_data_operation(params, dag, **kwargs):
 												.replace('test','train'))
 		if train_artifacts:
 			ti.xcom_push(key = params['split'],
-						 value = params['func'](data, 
+						 value = store_data(params['func'](data, 
 									prefit = train_artifacts, 
-									**params['params']))
+									**params['params'])))
 		else:
 			ti.xcom_push(key = params['split'], 
-							value = params['func'](data,
-								**params['params']))
+							value = store_data(params['func'](data,
+								**params['params'])))
+
+	elif params['split'] == FUSED_SPLIT:
+		train, test = [load_data(ti.xcom_pull(key = split, task_ids = _source(params, split))) 
+							for split in SPLITS]
+		train, test = _fit_apply(params, train, test)
+
+		ti.xcom_push(key = 'train', value = store_data(train))
+		ti.xcom_push(key = 'test', value = store_data(test))
 
 	else:
 		raise ValueError("Invalid data source: {}. Check your inputs".format(params['split']))
 	
 
 
+@sidecar_params
 def col_data_operation(params, dag, **kwargs):
 	ti = kwargs['ti']
-	data = None
 
-	#Get data based on inheritance or not
-	#Data pulled in is either train or test slice
-	if not params['inherits']:
-		data = ti.xcom_pull(key = params['split'])
-		data = data.loc[:, params['column_data_id']]
-	else:
-		data = ti.xcom_pull(task_ids = params['column_data_id'], 
-								 key = 'return_value') 
+	data = _col_data_input(params, ti, params.get('sources'))
 
 	if params['split'] == 'train':
-		res =  params['func'](data, **params['params'])
-		artifact = None
-		if isinstance(res, tuple):
-			artifact = res[1]
-			res = res[0]
-			
+		res, artifact = _apply_col_func(params, data)
 		ti.xcom_push(key = 'artifact', value = artifact)
-		return res
+		return store_data(res)
+
+	elif params['split'] == FUSED_SPLIT:
+		return _store_splits(_fit_apply(params, data['train'], data['test']))
 
 	elif params['split'] == 'test':
 		train_artifacts = ti.xcom_pull(key = 'artifact', task_ids = kwargs['task']\
 																.task_id\
 																.replace('test','train'))
-		if train_artifacts:
-			return params['func'](data, 
-									prefit = train_artifacts, 
-									**params['params'])
-		else:
-			return params['func'](data, 
-									**params['params'])
+		res, _ = _apply_col_func(params, data, train_artifacts)
+		return store_data(res)
+
+	else:
+		raise ValueError("Invalid data source: {}. Check your inputs".format(params['split']))
+
+@sidecar_params
+def fused_col_data_operation(params, dag, **kwargs):
+	"""
+	Applies a whole feature engineering family in one task.
+	Each step's artifact is kept, so that the matching test
+	task can apply every step with its fitted artifact.
+	"""
+	ti = kwargs['ti']
+
+	data = _col_data_input(params['steps'][0], ti, params.get('sources'))
+
+	return _store_result(params, _apply_col_steps(params, data, ti, kwargs['task'].task_id))
+
+@sidecar_params
+def block_data_operation(params, dag, **kwargs):
+	"""
+	Applies a shared chain of block functions to a group of
+	columns at once, as a single 2-D block.
+	"""
+	ti = kwargs['ti']
+
+	data = OrderedDict()
+	for split in task_splits(params['split']):
+		data[split] = load_data(ti.xcom_pull(key = split, task_ids = _source(params, split)),
+								columns = params['columns'])
+		data[split] = data[split].loc[:, params['columns']]
+
+	if params['split'] != FUSED_SPLIT:
+		data = data[params['split']]
+
+	return _store_result(params, _apply_col_steps(params, data, ti, kwargs['task'].task_id))
+
+def _col_data_input(params, ti, sources = None):
+
+	#Get data based on inheritance or not
+	#Data pulled in is either train or test slice, or both (by split)
+	#for fused splits. Only the named column is read from the stored split
+	if not params['inherits']:
+		data = OrderedDict()
+		for split in task_splits(params['split']):
+			data[split] = load_data(ti.xcom_pull(key = split, task_ids = (sources or {}).get(split)),
+									columns = [params['column_data_id']])
+			data[split] = data[split].loc[:, params['column_data_id']]
+
+		return data if params['split'] == FUSED_SPLIT else data[params['split']]
+
+	data = ti.xcom_pull(task_ids = params['column_data_id'], key = 'return_value')
+	if params['split'] == FUSED_SPLIT:
+		return OrderedDict((split, load_data(data[split])) for split in SPLITS)
+
+	return load_data(data)
+
+def _source(params, key):
+
+	#Task that writes key, when dataflow dependencies are generated.
+	#Otherwise the most recent value for key is pulled
+	return params.get('sources', {}).get(key)
+
+def _apply_col_steps(params, data, ti, task_id):
+
+	steps = params['steps']
+
+	if params['split'] == 'train':
+		step_artifacts = []
+		for step in steps:
+			data, artifact = _apply_col_func(step, data)
+			step_artifacts.append(artifact)
+
+		ti.xcom_push(key = 'artifact', value = step_artifacts)
+		return data
+
+	elif params['split'] == 'test':
+		train_artifacts = ti.xcom_pull(key = 'artifact', 
+									   task_ids = task_id.replace('test','train'))
+		if not train_artifacts:
+			train_artifacts = [None]*len(steps)
+
+		for step, artifact in zip(steps, train_artifacts):
+			data, _ = _apply_col_func(step, data, artifact)
+
+		return data
+
+	elif params['split'] == FUSED_SPLIT:
+		train, test = data['train'], data['test']
+		for step in steps:
+			train, test = _fit_apply(step, train, test)
+
+		return train, test
 
 	else:
 		raise ValueError("Invalid data source: {}. Check your inputs".format(params['split']))
+
+def _fit_apply(params, train, test):
+
+	#Fused splits: fit on the train split, then apply the fitted
+	#artifact to the test split, without passing it between tasks
+	res = params['func'](train, **params['params'])
+
+	artifact = None
+	if isinstance(res, tuple):
+		res, artifact = res[0], res[1]
+
+	if artifact:
+		return res, params['func'](test, prefit = artifact, **params['params'])
+
+	return res, params['func'](test, **params['params'])
+
+def _store_result(params, data):
+
+	#Fused tasks return the result of each split, by split
+	if params['split'] == FUSED_SPLIT:
+		return _store_splits(data)
+
+	return store_data(data)
+
+def _store_splits(data):
+
+	train, test = data
+	return {'train': store_data(train), 'test': store_data(test)}
+
+def _apply_col_func(params, data, train_artifacts = None):
+
+	#Test splits reuse artifacts fit on the train split
+	if train_artifacts:
+		return params['func'](data, prefit = train_artifacts, **params['params']), None
+
+	res = params['func'](data, **params['params'])
+	if params['split'] == 'train' and isinstance(res, tuple):
+		return res[0], res[1]
+
+	return res, None
 	
 
+@sidecar_params
 def fit_operation(params, dag, **kwargs):
 	#if not _is_fitted(params['model']):
 	ti = kwargs['ti']
 
-	X_train = ti.xcom_pull(key = "X_train")
-	y_train = ti.xcom_pull(key = "y_train")
+	X_train = load_data(ti.xcom_pull(key = "X_train", task_ids = _source(params, "X_train")))
+	y_train = load_data(ti.xcom_pull(key = "y_train", task_ids = _source(params, "y_train")))
 
 	model = params['model'](**params['params'])
 	model.fit(X_train, y_train)
 
 	return model
 
+@sidecar_params
 def read_data_operation(params, dag, **kwargs):
 
 	ti = kwargs['ti']
 
 	data = params['func'](params['filepath'], **params['params'])
 
-	ti.xcom_push(key = 'data', value = data)
+	ti.xcom_push(key = 'data', value = store_data(data))
 
 
+@sidecar_params
 def predict_operation(params, dag, **kwargs):
 	ti = kwargs['ti']
 
-	X_test = ti.xcom_pull(key = "X_test")
+	X_test = load_data(ti.xcom_pull(key = "X_test", task_ids = _source(params, "X_test")))
 
 	model = ti.xcom_pull(task_ids = params['model'])
 	
@@ -185,42 +455,150 @@ def predict_operation(params, dag, **kwargs):
 	return predictions
 
 
+@sidecar_params
 def split_operation(params, dag, **kwargs):
-
+	"""
+	Splits data into train and test splits. Splitting functions
+	may return row positions, stored as views over the stored
+	data, or the split frames themselves.
+	"""
 	ti = kwargs['ti']
 
-	data = ti.xcom_pull(key = 'data')
+	data_ref = ti.xcom_pull(key = 'data', task_ids = _source(params, 'data'))
+	data = load_data(data_ref)
 
 	train, test, target = params['func'](data, **params['params'])
 
-	ti.xcom_push(key = 'train', value = train)
-	ti.xcom_push(key = 'test', value = test)
+	ti.xcom_push(key = 'train', value = _split_data(data_ref, data, train))
+	ti.xcom_push(key = 'test', value = _split_data(data_ref, data, test))
 	ti.xcom_push(key = 'target', value = target)
 	ti.xcom_push(key = 'split_method', value = params['func'].__name__)
 
+@sidecar_params
 def model_split_operation(params, dag, **kwargs):
 	"""
-	splits model based on target later
+	Splits train and test into features and target. Features and
+	target are views of the splits, so no data is copied or stored.
+	"""
+	ti = kwargs['ti']
+
+	target = ti.xcom_pull(key = 'target', task_ids = _source(params, 'target'))
+
+	for split in ['train', 'test']:
+		data = ti.xcom_pull(key = split, task_ids = _source(params, split))
+
+		ti.xcom_push(key = 'X_' + split, value = store_view(data, exclude = target))
+		ti.xcom_push(key = 'y_' + split, value = store_view(data, column = target))
+
+@sidecar_params
+def k_fold_operation(params, dag, **kwargs):
+	"""
+	Splits data into folds. Folds are stored as integer row
+	positions over the stored data, so the dataset is not
+	copied once per fold.
+	"""
+	ti = kwargs['ti']
+
+	data_ref = ti.xcom_pull(key = 'data', task_ids = _source(params, 'data'))
+	data = load_data(data_ref)
+
+	folds, target = params['func'](data, **params['params'])
+
+	ti.xcom_push(key = 'folds', value = OrderedDict((fold, {split: _split_data(data_ref, data, rows) 
+																for split, rows in splits.items()})
+														for fold, splits in folds.items()))
+	ti.xcom_push(key = 'target', value = target)
+	ti.xcom_push(key = 'split_method', value = params['func'].__name__)
+
+def _split_data(data_ref, data, rows):
+
+	if isinstance(rows, (pd.DataFrame, pd.Series)):
+		return store_data(rows)
+
+	#Views share the stored data. Without a store, they share the frame
+	return store_view(data_ref if is_artifact_ref(data_ref) else data, rows)
+
+@sidecar_params
+def fold_operation(params, dag, **kwargs):
+	"""
+	Selects one fold of a k-fold split. Its train and test
+	views are pushed as the splits every downstream task of
+	the fold reads.
+	"""
+	ti = kwargs['ti']
+
+	folds = ti.xcom_pull(key = 'folds', task_ids = _source(params, 'folds'))
+
+	for split, view in folds[params['fold']].items():
+		ti.xcom_push(key = split, value = view)
+
+@sidecar_params
+def fold_metrics_operation(params, dag, **kwargs):
+	"""
+	Averages the metrics of one model over every fold. The output
+	has the shape of merge_metrics_operation, keyed by the model
+	and metric task ids without their fold prefix.
 	"""
 	ti = kwargs['ti']
 
-	train = ti.xcom_pull(key = 'train')
-	test = ti.xcom_pull(key = 'test')
-	target = ti.xcom_pull(key = 'target')
+	#Fetch the metrics of every fold in one batched pull
+	results = ti.xcom_pull(task_ids = params['merge_ids'])
+
+	fold_metrics = OrderedDict()
+	for fold, result in zip(params['folds'], results):
+		for model_metrics in result.values():
+			for task_id, value in model_metrics.items():
+				fold_metrics.setdefault(_unfold(task_id, fold), []).append(value)
+
+	metrics = OrderedDict()
+	for task_id, values in fold_metrics.items():
+		mean = np.mean(values, axis = 0)
+		metrics[task_id] = float(mean) if np.ndim(mean) == 0 else mean
 
-	X_train = train.loc[:,train.columns != target]
-	y_train = train.loc[:,target]
-	X_test = test.loc[:,test.columns != target]
-	y_test = test.loc[:,target]
+	return {params['model']: dict(metrics)}
 
-	ti.xcom_push(key = 'X_train', value = X_train)
-	ti.xcom_push(key = 'y_train', value = y_train)
-	ti.xcom_push(key = 'X_test', value = X_test)
-	ti.xcom_push(key = 'y_test', value = y_test)
+def _unfold(task_id, fold):
 
-def k_fold_operation(func, params, dag, **kwargs):
-	pass
+	#Fold tasks are named after the task they were fanned out from
+	prefix = fold + '_'
+	return task_id[len(prefix):] if task_id.startswith(prefix) else task_id
 
 def void_operation(func, params, dag, **kwargs):
 
-	return func(data, **params)
\ No newline at end of file
+	return func(data, **params)
+
+#####################################################################################
+# Operation Dataflow Declarations
+#####################################################################################
+
+#XCom keys read and written by each operation. '{split}'
+#stands for the split param of the operation
+OPERATION_IO = {
+	read_data_operation:		{'reads': [], 'writes': ['data']},
+	split_operation:			{'reads': ['data'], 'writes': ['train', 'test', 'target', 'split_method']},
+	bulk_data_operation:		{'reads': ['{split}'], 'writes': ['{split}']},
+	col_data_operation:			{'reads': ['{split}'], 'writes': []},
+	fused_col_data_operation:	{'reads': ['{split}'], 'writes': []},
+	block_data_operation:		{'reads': ['{split}'], 'writes': []},
+	merge_data_operation:		{'reads': ['{split}'], 'writes': ['{split}']},
+	model_split_operation:		{'reads': ['train', 'test', 'target'], 
+								 'writes': ['X_train', 'y_train', 'X_test', 'y_test']},
+	fit_operation:				{'reads': ['X_train', 'y_train'], 'writes': []},
+	predict_operation:			{'reads': ['X_test'], 'writes': []},
+	evaluation_operation:		{'reads': ['y_test'], 'writes': []},
+	model_evaluation_operation:	{'reads': ['y_test'], 'writes': []},
+	stacked_evaluation_operation:	{'reads': ['y_test'], 'writes': []},
+	merge_metrics_operation:	{'reads': [], 'writes': []},
+	k_fold_operation:			{'reads': ['data'], 'writes': ['folds', 'target', 'split_method']},
+	fold_operation:				{'reads': ['folds'], 'writes': ['train', 'test']},
+	fold_metrics_operation:		{'reads': [], 'writes': []}
+}
+
+#Params that may hold the ids of tasks whose return values are pulled
+TASK_ID_PARAMS = ['column_data_id', 'merge_ids', 'model', 'model_id', 'model_ids']
+
+#Operations whose test split pulls artifacts from the matching train task
+TRAIN_ARTIFACT_OPERATIONS = [bulk_data_operation,
+							 col_data_operation,
+							 fused_col_data_operation,
+							 block_data_operation]
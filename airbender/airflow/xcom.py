@@ -0,0 +1,134 @@
+#####################################################################################
+#
+#
+# 	Local XCom Backend: In-Memory Stand-In for Airflow XCom
+#
+#
+#####################################################################################
+
+
+#####################################################################################
+# External Library and Module Imports
+#####################################################################################
+
+# System and OS
+import threading
+
+#Airflow default XCom key for operator return values
+XCOM_RETURN_KEY = 'return_value'
+
+#####################################################################################
+# Class and Constructor
+#####################################################################################
+
+class LocalXComBackend:
+	'''
+	In-memory stand-in for the Airflow XCom table. Every pull counts as
+	one query, whether it asks for one task or many, which mirrors the
+	number of metadata database round trips a pull costs in Airflow.
+
+	This backend is thread safe so that it can be shared by tasks
+	executing concurrently.
+	'''
+
+	def __init__(self):
+
+		#Values keyed by (task_id, key), and the push order of each key
+		self.values = {}
+		self.order = {}
+
+		#Number of pulls served
+		self.query_count = 0
+
+		self.lock = threading.Lock()
+
+	def push(self, task_id, key, value):
+		'''
+		Store a value for a task and key. Later pushes
+		to the same task and key overwrite earlier ones.
+
+		Args:
+			task_id:				Task pushing the value
+			key:					XCom key
+			value:					Value to store
+
+		'''
+		with self.lock:
+			self.values[(task_id, key)] = value
+
+			#Track which task pushed this key most recently
+			pushers = self.order.setdefault(key, [])
+			if task_id in pushers:
+				pushers.remove(task_id)
+			pushers.append(task_id)
+
+	def pull(self, task_ids = None, key = XCOM_RETURN_KEY):
+		'''
+		Pull values in a single query. Follows Airflow semantics:
+		without task_ids the most recent value for the key is returned,
+		and a list of task_ids returns values in the same order.
+
+		Kwargs:
+			task_ids:				None, a task id, or a list of task ids
+			key:					XCom key
+
+		Returns:
+			value:					Value, or tuple of values for a list of task ids
+
+		'''
+		with self.lock:
+			self.query_count += 1
+
+			if task_ids is None:
+				pushers = self.order.get(key)
+				if not pushers:
+					return None
+				return self.values[(pushers[-1], key)]
+
+			if isinstance(task_ids, str):
+				return self.values.get((task_ids, key))
+
+			return tuple(self.values.get((task_id, key)) for task_id in task_ids)
+
+	def records(self, task_id = None):
+		'''
+		All stored values as (task_id, key, value) tuples. For each
+		key, records are listed in push order, so pushing them into
+		another backend reproduces this one.
+
+		Kwargs:
+			task_id:				Only return values pushed by this task
+
+		'''
+		with self.lock:
+			return [(pushed_by, key, self.values[(pushed_by, key)])
+						for key, pushers in self.order.items()
+						for pushed_by in pushers
+						if task_id is None or pushed_by == task_id]
+
+	def reset_query_count(self):
+		with self.lock:
+			self.query_count = 0
+
+
+class LocalTaskInstance:
+	'''
+	Task instance bound to a LocalXComBackend. Provides the subset
+	of the Airflow TaskInstance interface used by op_converter.
+
+	Args:
+		task_id:					Task the instance executes
+		backend:					Shared LocalXComBackend
+
+	'''
+
+	def __init__(self, task_id, backend):
+
+		self.task_id = task_id
+		self.backend = backend
+
+	def xcom_push(self, key, value, **kwargs):
+		self.backend.push(self.task_id, key, value)
+
+	def xcom_pull(self, task_ids = None, key = XCOM_RETURN_KEY, **kwargs):
+		return self.backend.pull(task_ids = task_ids, key = key)
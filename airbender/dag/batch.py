@@ -0,0 +1,132 @@
+#####################################################################################
+#
+#
+# 	Batch Generation of Many Experiment DAGs
+#
+#
+#####################################################################################
+
+
+#####################################################################################
+# External Library and Module Imports
+#####################################################################################
+
+# System and OS
+import time
+import traceback
+
+#Parallel generation
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+#Airbender
+from airbender.dag import generator
+from airbender.dag.generator import DagGenerator
+
+#Modules every worker imports once, before any config is generated
+WORKER_IMPORTS = ['airbender.airflow.op_converter',
+				  'airbender.static.feature_engineering',
+				  'airbender.dag.passes']
+
+#Whether this process has loaded what its configs share
+_worker_ready = False
+
+#####################################################################################
+# Batch Generation
+#####################################################################################
+
+def generate_batch(configs, dags_folder = None, max_workers = None, processes = True):
+	'''
+	Generates the DAG files of many experiment configurations in
+	parallel. Each worker loads the dag template and execution
+	hierarchy, and imports airbender's heavy modules, once; every
+	config it generates reuses them. A failing config does not stop
+	the batch: its error is returned with its result.
+
+	Configs must be picklable to be sent to a process pool (callables
+	and DagLayers in a config must be importable at module level).
+
+	Args:
+		configs:					Iterable of experiment configurations
+
+	Kwargs:
+		dags_folder:				Folder the dags are written to
+		max_workers:				Size of the worker pool. Defaults to the pool default
+		processes:					Generate in a process pool instead of a thread pool
+
+	Returns:
+		results:					List of dicts, one per config, in input order, with
+									dag_name, filepath, seconds, written, and error (None on success)
+
+	'''
+
+	configs = list(configs)
+	if not configs:
+		return []
+
+	#Process workers load shared state on their first config
+	if processes:
+		pool = ProcessPoolExecutor(max_workers = max_workers)
+	else:
+		init_worker()
+		pool = ThreadPoolExecutor(max_workers = max_workers)
+
+	with pool:
+		futures = [pool.submit(generate_one, config, dags_folder) for config in configs]
+		return [future.result() for future in futures]
+
+
+def init_worker():
+	'''
+	Loads everything shared by all configs of a worker: the dag
+	template, the execution hierarchy, and heavy modules. Runs
+	once per process; later calls return immediately.
+	'''
+	global _worker_ready
+	if _worker_ready:
+		return
+
+	generator.load_template()
+	generator.load_hierarchy()
+
+	for module in WORKER_IMPORTS:
+		__import__(module)
+
+	_worker_ready = True
+
+
+def generate_one(config, dags_folder = None):
+	'''
+	Generates the DAG file for a single configuration, timing it
+	and capturing any error. The first config of a worker loads
+	what every config shares (see init_worker) before it is timed.
+
+	Args:
+		config:						Experiment configuration
+
+	Kwargs:
+		dags_folder:				Folder the dag is written to
+
+	Returns:
+		result:						Dict with dag_name, filepath, seconds, written, and error
+
+	'''
+
+	result = {'dag_name': config.get('dag_name') if isinstance(config, dict) else None,
+			  'filepath': None,
+			  'seconds': None,
+			  'written': False,
+			  'error': None}
+
+	init_worker()
+
+	start = time.perf_counter()
+	try:
+		dg = DagGenerator(config)
+		result['filepath'] = dg.generate_file(dags_folder = dags_folder)
+		result['written'] = dg.written
+	except Exception as e:
+		result['error'] = "{}: {}\n{}".format(type(e).__name__, e, traceback.format_exc())
+
+	result['seconds'] = time.perf_counter() - start
+
+	return result
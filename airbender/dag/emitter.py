@@ -0,0 +1,372 @@
+#####################################################################################
+#
+#
+# 	DAG Emitter: Final Code Generation Pass over the Graph IR
+#
+#
+#####################################################################################
+
+
+#####################################################################################
+# External Library and Module Imports
+#####################################################################################
+
+import json
+import pprint
+
+#Preserve order of emitted dependencies
+from collections import OrderedDict
+
+from airbender.airflow.factory import SPEC_VERSION
+from airbender.airflow.lazy import run_lazy_task, lazy_params
+from airbender.dag.utils import is_callable
+
+#####################################################################################
+# Class and Constructor
+#####################################################################################
+
+class DagEmitter:
+	'''
+	Emits the Airflow DAG file for a built DagGenerator. This is the last
+	pass over the generator's graph IR, and the only place where Python
+	source for the experiment is produced. Operators, operator families,
+	sublayer groups, and dependencies are all rendered from the graph, so
+	any pass that rewrites the graph is reflected in the output.
+
+	Args:
+		generator:					Built DagGenerator
+
+	'''
+
+	#Template for python operator
+	operator_template = '''PythonOperator(
+							task_id='{}',
+							provide_context=True,
+							python_callable={},
+							params = {},
+							dag = dag)\n
+					'''
+
+	#Template for layer partitions
+	section_template = '''
+\n###########################################################
+# {} pertaining to {} dag layer with tag {}
+###########################################################\n'''
+
+	#Template for DAG files built from an experiment spec
+	spec_loader_template = '''#####################################################################################
+#
+#
+# 	Airbender Generated DAG Experiment: {} 
+#  
+#	Author: {} 
+#	Config Hash: {}
+#
+#####################################################################################
+
+# System and OS
+import os
+import sys
+
+#Delete this once package matures
+#For now, change to your own path
+sys.path.append(os.path.abspath(os.path.join(__file__, "../../../repos/airbender/")))
+
+#Airbender DAG factory
+from airbender.airflow.factory import build_dag
+
+#Experiment spec, written next to this file
+dag = build_dag(os.path.join(os.path.dirname(os.path.abspath(__file__)), '{}'))
+'''
+
+	def __init__(self, generator):
+
+		self.generator = generator
+		self.graph = generator.graph
+
+#####################################################################################
+# Public Methods
+#####################################################################################
+
+	def emit(self):
+		'''
+		Render the full DAG file from the generator's template.
+
+		Returns:
+			output_dag:				Python source of the Airflow DAG
+
+		'''
+
+		return self.generator.output_template.format(self.generator.dag_name,
+													 self.generator.author,
+													 self.generator.config_hash,
+													 self.generator.imports,
+													 self.generator.dag_args,
+													 "'" + self.generator.dag_name + "'",
+													 self.emit_operators(),
+													 self.emit_op_families(),
+													 self.emit_layers(),
+													 self.emit_structure())
+
+	def emit_spec(self):
+		'''
+		Serialize the graph as an experiment spec, rebuilt into a DAG
+		at parse time by airbender.airflow.factory. Tasks reference
+		their callables by dotted path, so the spec is plain JSON.
+
+		Raises:
+			ValueError:				If task params cannot be serialized
+
+		Returns:
+			spec:					JSON string of the experiment spec
+
+		'''
+
+		tasks = []
+		for task_id, node in self.graph.tasks.items():
+			params = node.params
+			if node.callable is not run_lazy_task:
+				params = lazy_params(node.callable, node.params)
+			tasks.append({'task_id': task_id, 'params': params})
+
+		spec = {'version': SPEC_VERSION,
+				'dag_name': self.generator.dag_name,
+				'author': self.generator.author,
+				'config_hash': self.generator.config_hash,
+				'default_args': self.generator.default_args,
+				'tasks': tasks,
+				'upstream': OrderedDict((task_id, upstream) 
+											for task_id, upstream in self.graph.upstream.items()
+											if upstream)}
+
+		try:
+			return json.dumps(spec, separators = (',', ':'))
+		except TypeError as e:
+			raise ValueError("Experiment spec cannot be serialized to JSON: {}. "
+							 "Task params must be JSON types or callables.".format(e))
+
+	def emit_spec_loader(self, spec_filename):
+		'''
+		Render the DAG file that builds the experiment from its spec.
+
+		Args:
+			spec_filename:			File name of the spec, in the same folder
+
+		Returns:
+			output_dag:				Python source of the Airflow DAG
+
+		'''
+
+		return self.spec_loader_template.format(self.generator.dag_name,
+												self.generator.author,
+												self.generator.config_hash,
+												spec_filename)
+
+	def emit_operators(self):
+		'''
+		Write a PythonOperator for every task in the graph,
+		partitioned by the layer that owns it.
+		'''
+
+		operators = ''''''
+		for tag, section in self.graph.sections.items():
+			operators += self.section_template.format('Operators', section['parent'].upper(), tag.upper())
+
+			for task_id, node in self.graph.tasks.items():
+				if node.section == tag:
+					operators += "\n{} = {}".format(task_id,
+													self.operator_template.format(task_id,
+																				  node.callable.__name__,
+																				  self.__parse_parameters(node.params)))
+
+		return operators
+
+	def emit_op_families(self):
+		'''
+		Write out operator families, with the sequential
+		association of their members.
+		'''
+
+		op_families = ''''''
+		for tag, section in self.graph.sections.items():
+			op_families += self.section_template.format('Operator families', section['parent'].upper(), tag.upper())
+
+			for family_id in section['families']:
+				members = self.graph.families[family_id]
+				if members:
+					op_families += "\n{} = {}".format(family_id, " >> ".join(members))
+
+		return op_families
+
+	def emit_layers(self):
+		'''
+		Write the head and tail groups of every sublayer, and the
+		dependencies between tasks of the same layer.
+		'''
+
+		layers = ''''''
+		for tag, section in self.graph.sections.items():
+			layers += self.section_template.format('Sublayer', section['parent'].upper(), tag.upper())
+
+			#Groups identical to an earlier group are written as a reference to it
+			emitted = OrderedDict()
+			for name in section['groups']:
+				members = self.graph.groups[name]
+				if not members:
+					continue
+
+				layers += "\n## Generating {} sublayer group for {} dag layer".format(name.upper(), tag.upper())
+				if tuple(members) in emitted:
+					layers += "\n{} = {}\n".format(name, emitted[tuple(members)])
+				else:
+					layers += "\n{} = {}\n".format(name, self.__format_ids(members))
+					emitted[tuple(members)] = name
+
+			dependencies = self.__dependencies(tag, internal = True)
+			if dependencies:
+				layers += "\n## Connecting all sublayers (if > 1) for {} dag layer with tag {}"\
+													.format(section['parent'].upper(), tag.upper())
+				layers += dependencies
+
+		return layers
+
+	def emit_structure(self):
+		'''
+		Write the dependencies between layers.
+		'''
+
+		structure = ''''''
+		for tag in self.graph.sections:
+			structure += self.__dependencies(tag, internal = False)
+
+		return structure
+
+#####################################################################################
+# Private Methods
+#####################################################################################
+
+	def __dependencies(self, tag, internal):
+
+		#Downstream tasks of the section, grouped by identical upstream tasks.
+		#Edges between consecutive family members are written with the family
+		grouped = OrderedDict()
+		for task_id, node in self.graph.tasks.items():
+			if node.section != tag:
+				continue
+
+			upstream = tuple(upstream_id for upstream_id in self.graph.upstream[task_id]
+								if (self.graph.tasks[upstream_id].section == tag) == internal
+								and not self.__family_edge(upstream_id, task_id))
+			if upstream:
+				grouped.setdefault(upstream, []).append(task_id)
+
+		dependencies = ''''''
+		for upstream, downstream in grouped.items():
+			upstream_ref = self.__group_ref(upstream, '_head')
+			downstream_ref = self.__group_ref(downstream, '_tail')
+
+			if len(upstream) > 1 and len(downstream) > 1:
+				dependencies += "\ncross_downstream({}, {})".format(upstream_ref, downstream_ref)
+			else:
+				dependencies += "\n{} >> {}".format(upstream_ref, downstream_ref)
+
+		return dependencies
+
+	def __family_edge(self, upstream_id, downstream_id):
+
+		family_id = self.graph.tasks[downstream_id].family_id
+		members = self.graph.families.get(family_id, [])
+		if upstream_id not in members or downstream_id not in members:
+			return False
+
+		return members.index(downstream_id) == members.index(upstream_id) + 1
+
+	def __group_ref(self, task_ids, suffix):
+
+		#Use a named group when one holds exactly these tasks
+		if len(task_ids) > 1:
+			matches = [name for name, members in self.graph.groups.items()
+							if set(members) == set(task_ids)]
+			if matches:
+				preferred = [name for name in matches if name.endswith(suffix)]
+				return (preferred or matches)[0]
+
+		return self.__format_ids(task_ids)
+
+	def __format_ids(self, task_ids):
+
+		#To prevent list collision issues in Airflow, single tasks are not lists
+		if len(task_ids) == 1:
+			return task_ids[0]
+
+		return pprint.pformat(list(task_ids))\
+					.replace("'", "")\
+					.replace("\n", "\n" + "\t"*6)
+
+	def __parse_parameters(self, params):
+		'''
+		Parent function for parsing parameters. Recursively dives into dictionaries and sub_dictionaries
+		in the configuration. It then detects callables, documents them, and replaces them with their
+		correct format so they are deemed functions when written as a final DAG.
+
+		Args:
+			params:								Full parameter set for a specific operator
+
+		Child_Functions:
+			__parse_param_callables:			Updates the provided slice of configuration with correct format
+
+		Returns:
+			params_str:							String version of all parameters
+
+		'''
+
+		#Initial creation of the final parameter string.
+		#Includes formatting changes
+		params_str = pprint.pformat(params).replace("\n", "\n" + "\t"*7)
+
+		#Object dictionary
+		obj_dict = {}
+		self.__parse_param_callables(params, obj_dict)
+
+		#For key in the object dictionary
+		#Replace the function with the correct name
+		for key in obj_dict:
+		    params_str = params_str.replace(key, obj_dict[key].__name__)
+
+		#Return final parameter string
+		return params_str
+
+	def __parse_param_callables(self, params, obj_dict):
+		'''
+		Recursive function to parse parameters for callable
+		function so that they are writte correctly in the
+		final Python file. It documents any function objects
+		and their string format. It then replaces their format
+		after the entire configuration is converted to string format.
+		This ensures that the functions are represented as functions in
+		the final file.
+
+		Args:
+			params:						Sub-dict of parameters, including numbers, strings, and callables
+			obj_dict:					Reference object dictionary with string and correct object formats
+
+		'''
+		if isinstance(params, dict):
+
+			for k,v in params.items():
+				if is_callable(k):
+					obj_dict[str(k)] = k
+				if is_callable(v):
+					obj_dict[str(v)] = v
+
+				if isinstance(v, (dict, list)):
+					self.__parse_param_callables(v, obj_dict)
+
+		elif isinstance(params, list):
+
+			for item in params:
+				if is_callable(item):
+					obj_dict[str(item)] = item
+
+				if isinstance(item, (dict, list)):
+					self.__parse_param_callables(item, obj_dict)
@@ -17,20 +17,89 @@
 import os
 import sys
 import pprint
+import functools
 
 #Time 
 from datetime import datetime, timedelta
 
 #String conversion for dictionaries
+import ast
 import json
 import inspect
 
 #Preserve order of inputs python
 from collections import OrderedDict
 
+#Copy cached configuration
+import copy
+
+#Content hashing and atomic writes
+import hashlib
+import tempfile
+
 # DAG information package specific information
 from airbender.dag.layers import DagLayer
-from airbender.dag.utils import is_callable
+from airbender.dag.graph import DagGraph
+from airbender.dag.emitter import DagEmitter
+from airbender.dag.passes import (fuse_families, 
+								  group_columns, 
+								  group_metrics,
+								  stack_models,
+								  fan_out_folds,
+								  dataflow_dependencies, 
+								  externalize_params,
+								  lazy_imports,
+								  DEFAULT_BLOCK_BYTES)
+from airbender.dag.profiling import GenerationProfile, unprofiled
+from airbender.dag.stages import HIERARCHY_PATH, read_hierarchy
+from airbender.airflow.op_converter import SPLITS, FUSED_SPLIT
+from airbender.dag.utils import is_callable, canonicalize
+from airbender.airflow import artifacts
+
+#Default path to the dag template
+TEMPLATE_PATH = os.path.abspath(os.path.join(__file__, '../../config/dag_template.txt'))
+
+#Default folder, relative to the working directory, for generated dags
+DEFAULT_DAGS_FOLDER = "../../../airflow/dags/"
+
+#Label of the configuration hash in the dag header, and header length
+HASH_LABEL = "Config Hash:"
+HEADER_LINES = 12
+
+#####################################################################################
+# Cached Generation Resources
+#####################################################################################
+
+@functools.lru_cache(maxsize = None)
+def load_template(path = TEMPLATE_PATH):
+	'''
+	Reads the dag template. The file is read once per process
+	and shared by every generator.
+
+	Kwargs:
+		path:				Path to the dag template
+
+	Returns:
+		template:			Template string
+
+	'''
+	with open(path, 'r') as template:
+		return template.read()
+
+
+def load_hierarchy(path = HIERARCHY_PATH):
+	'''
+	Reads the execution hierarchy. The file is parsed once per
+	process; each caller gets its own copy.
+
+	Kwargs:
+		path:				Path to the execution hierarchy configuration
+
+	Returns:
+		hierarchy:			Execution hierarchy dictionary
+
+	'''
+	return copy.deepcopy(read_hierarchy(path))
 
 
 #####################################################################################
@@ -65,9 +134,6 @@ class DagGenerator():
 		except:
 			raise AttributeError("DAG Name not specified. Please specify a dag name and try again.")
 
-		#Date of execution
-		self.date = datetime.now().strftime("%m-%d-%Y--%H.%M.%S")
-
 		#Package import information
 		self.import_dict = {}
 		self.import_check = set()
@@ -80,41 +146,40 @@ class DagGenerator():
 		#Collection of operator families
 		self.op_family_ids = set()
 
-		#OPerator and op_family strings
-		self.operators = ''''''
-		self.op_families = ''''''
+		#Graph IR populated by all layers, and the
+		#passes run over it before code is emitted
+		self.graph = DagGraph()
+		self.graph_passes = []
 		
 		#Dag layers information
 
 		self.layerbag = []
 		self.layer_tags = []
-		self.layers = ''''''
-		self.structure = ''''''
 		
 		#Dag models information (for informing evaluation)
 		self.models = {}
+
+		#Whether all generation phases have run
+		self.built = False
 		
 		
 		# Output dag information
 		self.output_dag = None
-		with open(
-				os.path.abspath(
-					os.path.join(__file__, 
-						'../../config/dag_template.txt')), 'r') as template:
-			self.output_dag = template.read()
+		self.output_template = load_template()
 
 		#Default configuration hierarchy (config driven)
-		self.execution_hierarchy_config_path = os.path.abspath(
-											os.path.join(__file__, 
-												'../../config/dag_hierarchy.cfg'))
+		self.execution_hierarchy_config_path = HIERARCHY_PATH
 
 		#Update execution hierarchy with hierarchy at provided filepath above
-		self.execution_hierarchy = None
-		with open(self.execution_hierarchy_config_path) as exec_config:
-			self.execution_hierarchy = json.load(exec_config)
+		self.execution_hierarchy = load_hierarchy(self.execution_hierarchy_config_path)
 
 		self.validate_dag_config()
 
+		#Canonical hash of the configuration and template. Computed before
+		#any layer is parsed, as parsing rewrites the configuration in place
+		self.config_hash = self.hash_config()
+		self.written = False
+
 		#Dag argument defaults
 		self.dag_args = {
 						    'owner': 'airflow',
@@ -137,46 +202,122 @@ class DagGenerator():
 		for key in self.config['dag']:
 			self.dag_args[key] = self.config['dag'][key]
 
+		#Keep the dag arguments for experiment specs
+		self.default_args = copy.deepcopy(self.dag_args)
+
 		#Convert dag arguments dictionary to a string
 		self.dag_args = json.dumps(self.dag_args, indent = 4)\
 							.replace('false', 'False')\
 							.replace('true','True')\
 							.replace('null', 'None')
 
+		#Generation option defaults
+		self.generation_args = {
+								'fuse_families': False,
+								'fuse_splits': False,
+								'group_columns': False,
+								'group_block_bytes': DEFAULT_BLOCK_BYTES,
+								'group_metrics': False,
+								'stack_models': False,
+								'dataflow': False,
+								'lazy_imports': False,
+								'spec': False,
+								'sidecar_bytes': None,
+								'profile': False
+							   }
+
+		#Update generation options that are provided by user
+		for key in self.config.get('generation', {}):
+			if key not in self.generation_args:
+				raise AttributeError("""Unrecognized generation option: {}
+Valid generation options are:\n - {}""".format(key, "\n - ".join(self.generation_args)))
+			self.generation_args[key] = self.config['generation'][key]
+
+		#Group columns sharing an op chain into block tasks
+		if self.generation_args['group_columns']:
+			self.graph_passes.append(functools.partial(group_columns, 
+								block_bytes = self.generation_args['group_block_bytes']))
+
+		#Fuse sequential operator families into single tasks
+		if self.generation_args['fuse_families']:
+			self.graph_passes.append(fuse_families)
+
+		#Evaluate every metric of a model in one task, or every model of a layer in one task
+		if self.generation_args['stack_models']:
+			self.graph_passes.append(stack_models)
+		elif self.generation_args['group_metrics']:
+			self.graph_passes.append(group_metrics)
+
+		#Run every task downstream of a k-fold split once per fold
+		self.graph_passes.append(fan_out_folds)
+
+		#Record timings, allocations, and graph statistics of the build
+		self.profile = GenerationProfile() if self.generation_args['profile'] else None
+
+		#Store large literal params outside of the generated code
+		if self.generation_args['sidecar_bytes'] is not None:
+			self.graph_passes.append(functools.partial(externalize_params,
+								threshold_bytes = self.generation_args['sidecar_bytes']))
+
+		#Replace layer barriers with true data dependencies.
+		#Follows every pass that adds or replaces tasks. Folds
+		#are told apart by their dataflow, so folds always use it
+		if self.generation_args['dataflow']:
+			self.graph_passes.append(dataflow_dependencies)
+		else:
+			self.graph_passes.append(functools.partial(dataflow_dependencies, folds_only = True))
+
+		#Resolve callables inside tasks instead of at DAG file import.
+		#Must follow every pass that inspects task callables
+		if self.generation_args['lazy_imports']:
+			self.graph_passes.append(lazy_imports)
+
 #####################################################################################
 # Orchestration Method, Executing all Logic
 #####################################################################################
 
-	def generate_file(self):
+	def generate_file(self, dags_folder = None, force = False):
 		'''
 		Orchestration function for the entire dag. This method calls all of the necessary
 		auxiliary methods for created the DAG experiment as a Python file.
 
-		'''
+		The file name is derived from the dag name and author, and the file
+		is stamped with the hash of the configuration. If the file already
+		holds the same hash, and its spec and sidecars still exist, nothing
+		is generated or written. Otherwise the file is written to a temporary
+		file and renamed in place. With the spec generation option, the
+		experiment is written as a JSON spec, and the dag file only builds
+		the dag from it.
 
-		#Parse the user-provided dag configuration
-		self.parse_dag_config()
+		Kwargs:
+			dags_folder:			Folder the dag is written to. Defaults to the
+									airflow dags folder relative to the working directory
+			force:					Regenerate even if the configuration is unchanged
 
-		#Detect external imports
-		self.detect_external_imports()
-
-		#Determine lineage for each layer
-		#And flatten into single sequence
-		self.determine_layer_lineage()
-		self.flatten_layers()
-
-		#Parse all layers in the dag
-		self.parse_layers()
+		Returns:
+			filepath:				Path of the generated dag file
 
-		#Write all layer information to dag output
-		self.write_layers()
+		'''
 
-		# #Connect all of the layers
-		self.connect_layers()
+		#Generate the dag filename
+		self.dag_filename = "_".join([self.dag_name.replace(" ","-"), 
+									  self.author.replace(" ","-")]) + ".py"
+		
+		#Write the dag configuration
+		self.file_root = os.path.join(dags_folder or DEFAULT_DAGS_FOLDER, "")
+		filepath = self.file_root + self.dag_filename
 
-		#Write all imports to dag output
-		self.write_imports()
+		#Unchanged experiments are not regenerated, unless files they load are gone
+		if (not force and 
+			self.__written_hash(filepath) == self.config_hash and
+			self.__dependencies_exist(filepath)):
+			print("\nAirflow file {} is up to date".format(self.dag_filename))
+			self.written = False
+			return filepath
 
+		#Build all layers, operators, and their connections, unless already built
+		if not self.built:
+			self.build()
 
 		#Debugging statement. Can be commented out or removed
 		print("\nDisplaying Ordered Dag Layers with Tags:\n")
@@ -185,35 +326,96 @@ class DagGenerator():
 				print(item.exec_order,
 					  item.lineage)
 
-		#Create output dag string
-		self.output_dag = self.output_dag.format(self.dag_name,
-												 self.author,
-												 self.date,
-												 self.imports,
-												 self.dag_args,
-												 "'" + self.dag_name + "'",
-												 self.operators,
-												 self.op_families,
-												 self.layers,
-												 self.structure)
-
-		#Generate the dag filename
-		self.dag_filename = "_".join([self.dag_name.replace(" ","-"), 
-									  self.author.replace(" ","-"), 
-									  self.date]) + ".py"
-		
-		#Write the dag configuration
-		print(os.getcwd())
-		self.file_root = "../../../airflow/dags/"
+		#Create output dag string from the graph. Spec-based dags
+		#only hold a loader, and the spec is written next to them
+		emitter = DagEmitter(self)
+		if self.generation_args['spec']:
+			self.spec_filename = self.dag_filename[:-len(".py")] + ".json"
+			self.output_spec = emitter.emit_spec()
+			self.output_dag = emitter.emit_spec_loader(self.spec_filename)
+			self.__write_atomic(self.file_root + self.spec_filename, self.output_spec)
+		else:
+			self.output_dag = emitter.emit()
 
 		#Used for debugging, can be removed
-		print("\nGenerated airflow file with name: {}"\
-			.format(os.path.abspath(self.dag_filename).split("/")[-1]))
+		print("\nGenerated airflow file with name: {}".format(self.dag_filename))
+
+		#Written last, so the dag never refers to a missing or stale spec
+		self.__write_atomic(filepath, self.output_dag)
+
+		self.written = True
+		return filepath
+
+	def hash_config(self):
+		'''
+		Canonical hash of the experiment. Equal configurations hash
+		equally across runs and processes: callables are hashed by
+		qualified name and DagLayers by their configuration. The dag
+		template is part of the hash.
+
+		Returns:
+			config_hash:			Hex digest of the configuration
+
+		'''
+
+		canonical = canonicalize([self.__canonical_config(self.config), self.output_template])
+		return hashlib.sha256(json.dumps(canonical).encode('utf-8')).hexdigest()
+
+	def build(self):
+		'''
+		Runs every generation phase short of writing the output file. After
+		a build, the graph holds every operator and dependency of the 
+		experiment, so it can be inspected or executed locally.
 
-		#Write the file
-		with open(self.file_root + self.dag_filename, 'w') as file:
-			file.write(self.output_dag)
-			file.close()
+		'''
+
+		if self.profile is not None:
+			self.profile.start()
+
+		try:
+			#Parse the user-provided dag configuration
+			with self.__profiled('parse_dag_config'):
+				self.parse_dag_config()
+
+			#Detect external imports
+			with self.__profiled('detect_external_imports'):
+				self.detect_external_imports()
+
+			#Determine lineage for each layer
+			#And flatten into single sequence
+			with self.__profiled('determine_layer_lineage'):
+				self.determine_layer_lineage()
+			with self.__profiled('flatten_layers'):
+				self.flatten_layers()
+
+			#Parse all layers in the dag
+			with self.__profiled('parse_layers'):
+				self.parse_layers()
+
+			#Add all layer information to the graph
+			with self.__profiled('write_layers'):
+				self.write_layers()
+
+			# #Connect all of the layers
+			with self.__profiled('connect_layers'):
+				self.connect_layers()
+
+			#Run optimization passes over the graph
+			with self.__profiled('graph_passes'):
+				self.graph.apply(self.graph_passes)
+
+			#Write all imports to dag output
+			with self.__profiled('write_imports'):
+				self.write_imports()
+
+		finally:
+			if self.profile is not None:
+				self.profile.stop()
+
+		if self.profile is not None:
+			self.profile.record_graph(self.graph)
+
+		self.built = True
 
 #####################################################################################
 # Supplemental Public Methods
@@ -383,53 +585,51 @@ Type of object that was found = {}""".format(key, type(self.dag_config[key])))
 
 		'''
 		for layer in self.layerbag:
-			layer.parse_layer()
+			with self.__profiled('parse_layers', layer):
+				layer.parse_layer()
 
 
 	def write_layers(self):
 		'''
-		Writes the logic for all layers in the
-		dag to the dag itself. This is one of the final
-		steps before the final output file for the 
-		airflow dag is generated.
+		Adds the operators, operator families, and sublayers
+		of all layers to the graph. The graph is emitted
+		as the final output file for the airflow dag.
 
 		'''
 		for layer in self.layerbag:
 
 			#Write everything related to layer
-			layer.write_operators()
-			layer.write_op_families()
-			layer.write_sublayers()
+			with self.__profiled('write_layers', layer):
+				layer.write_operators()
+				layer.write_op_families()
+				layer.write_sublayers()
 
 
 	def connect_layers(self):
 		'''
-		Connect all layers of the graph together, including 
-		any complicated sublayer connections or unrolling of previous
-		layers. 
+		Connect all layers of the graph together. The head of each
+		layer runs before the tail of the next. When the next layer
+		is conditionally mapped, each of its conditional sublayers
+		depends only on the matching task of the previous head.
 		'''
 
-		#Template for generating connected layer
-		connected_layer = "\n{}"
-
-		#Add layers to the final dag.
-		#TODO: This will need to be changed to fix Airflow dependency issues
 		for layer_index in range(len(self.layerbag) - 1):
 
-				if isinstance(self.layerbag[layer_index + 1].tail, dict):
-					chain_items = list(self.layerbag[layer_index + 1].tail.values())
-					self.structure += "\nchain({}, {})".format(
-														self.layerbag[layer_index].head,
-														pprint.pformat(chain_items)).replace("'", "")
+			head = self.layerbag[layer_index].sublayer_order[-1]
+			tail = self.layerbag[layer_index + 1].sublayer_order[0]
 
-				else:
-					self.structure += connected_layer\
-											.format(" >> "\
-												.join([self.layerbag[layer_index]\
-																	.head,
-													   self.layerbag[layer_index + 1]\
-													   				.tail])\
-																		.replace("'", ""))
+			if isinstance(head, dict):
+				head_ids = [task_id for cond_sublayer in head.values()
+									for task_id in cond_sublayer.head]
+			else:
+				head_ids = head.head
+
+			if isinstance(tail, dict):
+				for head_task, cond_sublayer in zip(head_ids, tail.values()):
+					self.graph.connect([head_task], cond_sublayer.tail)
+
+			else:
+				self.graph.connect(head_ids, tail.tail)
 
 
 	def write_imports(self):
@@ -440,6 +640,18 @@ Type of object that was found = {}""".format(key, type(self.dag_config[key])))
 
 		'''
 
+		#With lazy imports, tasks import their own callables.
+		#Callables detected in the configuration are not imported
+		if self.generation_args['lazy_imports']:
+			self.import_dict = {}
+			self.import_check = set()
+
+		#Import the callables of every task left in the graph,
+		#including callables that passes placed in task params
+		for node in self.graph.tasks.values():
+			self.import_dynamically(node.callable)
+			self.__import_param_callables(node.params)
+
 		#Partition the imports section
 		self.imports += '''##############################################################################
 # External Package Imports Automagically Detected
@@ -496,6 +708,144 @@ Type of object that was found = {}""".format(key, type(self.dag_config[key])))
 # Supplemental Private Methods
 #####################################################################################
 
+	def __profiled(self, phase, layer = None):
+		'''
+		Measures a generation phase, or one layer within it,
+		when the build is profiled.
+
+		Args:
+			phase:					Name of the phase
+
+		Kwargs:
+			layer:					DagLayer being processed
+
+		'''
+		if self.profile is None:
+			return unprofiled()
+
+		return self.profile.phase(phase, layer = None if layer is None else layer.tag)
+
+
+	def __canonical_config(self, obj):
+		'''
+		Replaces DagLayers with their configuration, and orders sets,
+		so the configuration can be canonicalized.
+
+		Args:
+			obj:					Configuration slice
+
+		'''
+		if isinstance(obj, DagLayer):
+			return {'__layer__': self.__canonical_config(obj.config)}
+
+		if isinstance(obj, dict):
+			return {k: self.__canonical_config(v) for k,v in obj.items()}
+
+		if isinstance(obj, (list, tuple)):
+			return [self.__canonical_config(item) for item in obj]
+
+		if isinstance(obj, (set, frozenset)):
+			return sorted([self.__canonical_config(item) for item in obj],
+						  key = lambda item: json.dumps(canonicalize(item)))
+
+		return obj
+
+
+	def __write_atomic(self, filepath, content):
+		'''
+		Write a file atomically, so the scheduler never parses a partial
+		file: the content is written to a temporary file in the same
+		folder, then renamed in place.
+
+		Args:
+			filepath:				Path of the file
+			content:				File content
+
+		'''
+		fd, temp_path = tempfile.mkstemp(dir = os.path.dirname(os.path.abspath(filepath)), 
+										 prefix = ".", suffix = ".tmp")
+		try:
+			with os.fdopen(fd, 'w') as file:
+				file.write(content)
+			os.chmod(temp_path, 0o644)
+			os.replace(temp_path, filepath)
+		except:
+			os.remove(temp_path)
+			raise
+
+
+	def __written_hash(self, filepath):
+		'''
+		Configuration hash stamped in an existing dag file.
+
+		Args:
+			filepath:				Path of the dag file
+
+		Returns:
+			config_hash:			Hash in the file header, or None
+
+		'''
+		if not os.path.exists(filepath):
+			return None
+
+		with open(filepath, 'r') as dag_file:
+			for line, _ in zip(dag_file, range(HEADER_LINES)):
+				if line.strip('#\t ').startswith(HASH_LABEL):
+					return line.split(HASH_LABEL, 1)[1].strip()
+
+		return None
+
+
+	def __dependencies_exist(self, filepath):
+		'''
+		Determines whether every file an existing dag file loads when it
+		runs is still there: its spec, and the sidecars its params refer to.
+
+		Args:
+			filepath:				Path of the dag file
+
+		Returns:
+			exist:					Whether or not the dag file can still run
+
+		'''
+
+		#Spec-based dags keep their tasks, and sidecar references, in the spec
+		source = filepath
+		if self.generation_args['spec']:
+			source = filepath[:-len(".py")] + ".json"
+			if not os.path.exists(source):
+				return False
+
+		if self.generation_args['sidecar_bytes'] is None:
+			return True
+
+		with open(source, 'r') as source_file:
+			text = source_file.read()
+		if artifacts.ARTIFACT_KEY not in text:
+			return True
+
+		#References are JSON objects in specs, and dict literals in dag files
+		if self.generation_args['spec']:
+			refs = []
+			pending = [json.loads(text)]
+			while pending:
+				value = pending.pop()
+				if artifacts.is_artifact_ref(value):
+					refs.append(value)
+				elif isinstance(value, dict):
+					pending.extend(value.values())
+				elif isinstance(value, list):
+					pending.extend(value)
+		else:
+			refs = [ast.literal_eval(node) for node in ast.walk(ast.parse(text))
+						if isinstance(node, ast.Dict) and 
+						any(getattr(key, 'value', getattr(key, 's', None)) == artifacts.ARTIFACT_KEY
+							for key in node.keys)]
+
+		store = artifacts.get_artifact_store()
+		return store is not None and all(store.exists(ref) for ref in refs)
+
+
 	def __rec_dag_config(self, config_section):
 		'''
 		Recursively locks in order of input configuration 
@@ -512,6 +862,25 @@ Type of object that was found = {}""".format(key, type(self.dag_config[key])))
 					self.__rec_dag_config(config_section[key])
 
 	
+	def __import_param_callables(self, params):
+		'''
+		Recursively imports callables found in task parameters.
+
+		Args:
+			params:					Task params, or a nested dict or list within them
+
+		'''
+		if isinstance(params, dict):
+			params = list(params.keys()) + list(params.values())
+
+		if isinstance(params, (list, tuple)):
+			for item in params:
+				if is_callable(item):
+					self.import_dynamically(item)
+				else:
+					self.__import_param_callables(item)
+
+	
 	def __layer_lineage(self, subsection, lineage):
 		'''
 		Conceptual layer lineage function, recursively executed. 
@@ -586,6 +955,11 @@ Type of object that was found = {}""".format(key, type(self.dag_config[key])))
 		layer_order = self.execution_hierarchy[lineage[0]]['order']
 		conditional_mapping = self.execution_hierarchy[lineage[0]]['map']
 		split = self.execution_hierarchy[lineage[0]]['split']
+
+		#Fused splits fit on train and apply to test within one task
+		if self.generation_args['fuse_splits'] and split == SPLITS:
+			split = [FUSED_SPLIT]
+
 		subsection.delineate(lineage, 
 					  order = layer_order, subrank = subrank, 
 					  conditional_mapping = conditional_mapping,
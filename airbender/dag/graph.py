@@ -0,0 +1,361 @@
+#####################################################################################
+#
+#
+# 	Graph Intermediate Representation for Generated DAGs
+#
+#
+#####################################################################################
+
+
+#####################################################################################
+# External Library and Module Imports
+#####################################################################################
+
+#Preserve order of tasks, edges, and groups
+from collections import OrderedDict, deque
+
+#Immutable task params
+from airbender.dag.utils import freeze
+
+#####################################################################################
+# Class and Constructor
+#####################################################################################
+
+class TaskNode:
+	'''
+	Single task in the graph IR. Holds everything needed to emit or
+	execute the task, plus payload metadata (layer, family, split, ...)
+	that optimization passes may use.
+
+	Args:
+		task_id:					Unique task identifier
+		p_callable:					op_converter callable executed by the task
+		params:						Params for the callable, including the true callable.
+									Frozen, so tasks and passes can share them without copying
+
+	Kwargs:
+		section:					Tag of the layer that owns the task
+		family_id:					Operator family the task belongs to
+		meta:						Additional payload metadata
+
+	'''
+
+	__slots__ = ('task_id', 'callable', 'params', 'section', 'family_id', 'meta')
+
+	def __init__(self, task_id, p_callable, params, section = None, family_id = None, meta = None):
+
+		self.task_id = task_id
+		self.callable = p_callable
+		self.params = freeze(params)
+		self.section = section
+		self.family_id = family_id
+		self.meta = meta if meta is not None else {}
+
+	def __repr__(self):
+		return "TaskNode({})".format(self.task_id)
+
+
+class DagGraph:
+	'''
+	Intermediate representation of a generated experiment. Layers populate
+	the graph with tasks and edges; code emission is a separate, final pass
+	over the graph. Passes registered with the generator can inspect or
+	rewrite the graph in between (fusion, pruning, cost estimation).
+
+	Besides tasks and edges, the graph records:
+
+	- sections:		Layers, in execution order, with the families and groups they own
+	- families:		Operator families, as ordered lists of task ids
+	- groups:		Named lists of task ids (sublayer heads and tails)
+
+	Families and groups only carry naming for emission. Edges are the
+	single source of truth for dependencies.
+	'''
+
+	def __init__(self):
+
+		#Tasks keyed by task id, and the upstream task ids of each
+		self.tasks = OrderedDict()
+		self.upstream = OrderedDict()
+
+		#Naming information used for emission
+		self.sections = OrderedDict()
+		self.families = OrderedDict()
+		self.groups = OrderedDict()
+
+#####################################################################################
+# Public Methods for Populating the Graph
+#####################################################################################
+
+	def add_section(self, tag, parent):
+		'''
+		Register a layer section. Sections are emitted in the order
+		they are added.
+
+		Args:
+			tag:					Layer tag
+			parent:					Parent concept of the layer (feature_engineering, ...)
+
+		'''
+		self.sections.setdefault(tag, {'parent': parent,
+									   'families': [],
+									   'groups': []})
+
+	def add_task(self, node):
+		'''
+		Add a task to the graph.
+
+		Args:
+			node:					TaskNode to add
+
+		Raises:
+			ValueError:				If a task with the same id exists
+
+		'''
+		if node.task_id in self.tasks:
+			raise ValueError("Task with the same name (task_id = {}) already exists in the graph"\
+				.format(node.task_id))
+
+		self.tasks[node.task_id] = node
+		self.upstream[node.task_id] = []
+
+	def add_edge(self, upstream_id, downstream_id):
+		'''
+		Add a dependency between two tasks. Duplicate edges are ignored.
+
+		Args:
+			upstream_id:			Task that must finish first
+			downstream_id:			Task that depends on it
+
+		Raises:
+			KeyError:				If either task is not in the graph
+
+		'''
+		for task_id in (upstream_id, downstream_id):
+			if task_id not in self.tasks:
+				raise KeyError("Task {} is not in the graph".format(task_id))
+
+		if upstream_id not in self.upstream[downstream_id]:
+			self.upstream[downstream_id].append(upstream_id)
+
+	def connect(self, upstream_ids, downstream_ids):
+		'''
+		Make every downstream task depend on every upstream task.
+
+		Args:
+			upstream_ids:			Iterable of upstream task ids
+			downstream_ids:			Iterable of downstream task ids
+
+		'''
+		for downstream_id in downstream_ids:
+			for upstream_id in upstream_ids:
+				self.add_edge(upstream_id, downstream_id)
+
+	def add_family(self, family_id, task_ids, section):
+		'''
+		Register an operator family. Members run in sequence,
+		so they are chained together.
+
+		Args:
+			family_id:				Unique family identifier
+			task_ids:				Ordered task ids of the family members
+			section:				Tag of the layer that owns the family
+
+		'''
+		self.families[family_id] = list(task_ids)
+		self.sections[section]['families'].append(family_id)
+
+		for task_id in task_ids:
+			self.tasks[task_id].family_id = family_id
+
+		for upstream_id, downstream_id in zip(task_ids[:-1], task_ids[1:]):
+			self.add_edge(upstream_id, downstream_id)
+
+	def add_group(self, name, task_ids, section):
+		'''
+		Register a named group of tasks (a sublayer head or tail).
+
+		Args:
+			name:					Variable name of the group in the emitted file
+			task_ids:				Task ids in the group
+			section:				Tag of the layer that owns the group
+
+		'''
+		self.groups[name] = list(task_ids)
+		self.sections[section]['groups'].append(name)
+
+#####################################################################################
+# Public Methods for Rewriting the Graph
+#####################################################################################
+
+	def replace_tasks(self, task_ids, node):
+		'''
+		Replace a set of tasks with a single task. Edges into and out of the
+		set are moved to the new task, and families and groups refer to it
+		in place of the replaced tasks. The new task takes the position of
+		the first replaced task.
+
+		Args:
+			task_ids:				Task ids to replace
+			node:					TaskNode replacing them
+
+		'''
+		self.replace_task_sets([(task_ids, node)])
+
+	def replace_task_sets(self, replacements):
+		'''
+		Replace many disjoint sets of tasks at once, each with a single
+		task, as replace_tasks does for one set. Tasks, edges, families
+		and groups are rebuilt once for the whole batch, so passes that
+		replace many sets stay linear in the size of the graph.
+
+		Args:
+			replacements:			List of (task ids to replace, TaskNode replacing them)
+
+		Raises:
+			ValueError:				If a task is replaced twice, or a new task id is
+									already taken by a task that is not replaced
+
+		'''
+
+		#Task id each replaced task maps to, and the replacement at each position
+		mapping = {}
+		firsts = {}
+		for task_ids, node in replacements:
+			for task_id in task_ids:
+				if task_id in mapping:
+					raise ValueError("Task {} is replaced more than once".format(task_id))
+				mapping[task_id] = node.task_id
+			firsts[task_ids[0]] = (task_ids, node)
+
+		new_ids = set()
+		for _, node in replacements:
+			if (node.task_id in self.tasks and node.task_id not in mapping) or node.task_id in new_ids:
+				raise ValueError("Task with the same name (task_id = {}) already exists in the graph"\
+					.format(node.task_id))
+			new_ids.add(node.task_id)
+
+		#Rebuild tasks, keeping order
+		tasks = OrderedDict()
+		edges = OrderedDict()
+		for task_id, task in self.tasks.items():
+			if task_id in firsts:
+				task_ids, node = firsts[task_id]
+				replaced = set(task_ids)
+				upstream = [upstream_id for member_id in task_ids
+										for upstream_id in self.upstream[member_id]
+										if upstream_id not in replaced]
+
+				tasks[node.task_id] = node
+				edges[node.task_id] = self.__substitute(upstream, mapping)
+			elif task_id not in mapping:
+				tasks[task_id] = task
+				edges[task_id] = self.__substitute(self.upstream[task_id], mapping)
+
+		self.tasks = tasks
+		self.upstream = edges
+
+		for family_id, members in self.families.items():
+			self.families[family_id] = self.__substitute(members, mapping)
+		for name, members in self.groups.items():
+			self.groups[name] = self.__substitute(members, mapping)
+
+	def remove_task(self, task_id):
+		'''
+		Remove a task. Its downstream tasks inherit its upstream
+		dependencies, so ordering is preserved.
+
+		Args:
+			task_id:				Task to remove
+
+		'''
+
+		upstream = self.upstream.pop(task_id)
+		del self.tasks[task_id]
+
+		for downstream_id, downstream_upstream in self.upstream.items():
+			if task_id in downstream_upstream:
+				downstream_upstream.remove(task_id)
+				for upstream_id in upstream:
+					if upstream_id not in downstream_upstream:
+						downstream_upstream.append(upstream_id)
+
+		for family_id, members in self.families.items():
+			self.families[family_id] = [member for member in members if member != task_id]
+		for name, members in self.groups.items():
+			self.groups[name] = [member for member in members if member != task_id]
+
+#####################################################################################
+# Public Methods for Inspecting the Graph
+#####################################################################################
+
+	def downstream(self):
+		'''
+		Downstream task ids of every task, in task order.
+
+		Returns:
+			downstream:				OrderedDict of task_id -> list of downstream task ids
+
+		'''
+		downstream = OrderedDict((task_id, []) for task_id in self.tasks)
+		for task_id, upstream in self.upstream.items():
+			for upstream_id in upstream:
+				downstream[upstream_id].append(task_id)
+
+		return downstream
+
+	def topological_order(self):
+		'''
+		Task ids in an order that respects every edge. Ties are
+		broken by the order in which tasks were added.
+
+		Raises:
+			ValueError:				If the graph has a cycle
+
+		Returns:
+			order:					List of task ids
+
+		'''
+		remaining = {task_id: len(upstream) for task_id, upstream in self.upstream.items()}
+		downstream = self.downstream()
+		ready = deque(task_id for task_id, count in remaining.items() if count == 0)
+
+		order = []
+		while ready:
+			task_id = ready.popleft()
+			order.append(task_id)
+			for downstream_id in downstream[task_id]:
+				remaining[downstream_id] -= 1
+				if remaining[downstream_id] == 0:
+					ready.append(downstream_id)
+
+		if len(order) != len(self.tasks):
+			raise ValueError("Dependency cycle detected among tasks: {}"\
+				.format(", ".join(task_id for task_id in self.tasks if task_id not in order)))
+
+		return order
+
+	def apply(self, passes):
+		'''
+		Run optimization passes over the graph, in order. A pass is
+		any callable that takes the graph and rewrites it in place.
+
+		Args:
+			passes:					Iterable of graph passes
+
+		'''
+		for graph_pass in passes:
+			graph_pass(self)
+
+#####################################################################################
+# Private Methods
+#####################################################################################
+
+	def __substitute(self, task_ids, mapping):
+
+		#Replaced task ids are mapped to their replacement, without duplicates
+		substituted = OrderedDict()
+		for task_id in task_ids:
+			substituted[mapping.get(task_id, task_id)] = None
+
+		return list(substituted)
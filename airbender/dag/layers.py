@@ -34,7 +34,8 @@ from airbender.airflow.op_converter import *
 from airbender.dag.sublayers import DagSubLayer
 from airbender.dag.op_families import OpFamily 
 from airbender.dag.operators import DagOperator
-from airbender.dag.utils import is_callable
+from airbender.dag.utils import is_callable, freeze
+from airbender.dag.stages import get_stage
 
 #####################################################################################
 # Class and Constructor
@@ -81,10 +82,6 @@ class DagLayer:
 		#Holistic order of the sublayers
 		self.holistic_order = -1
 
-		#Operator router (defined in function below)
-		#TODO: Find a better place for it
-		self.op_router = None
-
 		#Conditional mapping for dynamic splitting
 		self.conditional_mapping = None
 
@@ -124,15 +121,11 @@ class DagLayer:
 		'''
 
 		#Determine if holistic parsing needs to be run for a layer
-		self.__route()
-		holistic = self.op_router[self.parent].get('holistic', None)
-		if holistic is None or holistic.get(order, None) is None:
+		holistic = get_stage(self.parent).holistic.get(order, None)
+		if holistic is None:
 			return
 
-		
-
-		#For each operation in the holistic dictionary found in the op_router
-		holistic = holistic[order]
+		#For each operation in the holistic dictionary of the stage
 		for op in holistic:
 
 			#Increment holistic order
@@ -182,27 +175,56 @@ class DagLayer:
 													split = split)
 
 
+	def get_merge_ids(self, return_type, parent, conditional_mapping = None, split = None):
+		'''
+		Ids a holistic merge stage needs from the sublayer it merges.
+		Only called by the arguments of merge stages.
+
+		Args:
+			return_type:			Sublayer attribute to return (head or pass_through_cols)
+			parent:					Holistic parent of the merge
+
+		Kwargs:
+			conditional_mapping:	Conditional mapping of the merged sublayer
+			split:					Split of the merged sublayer
+
+		Returns:
+			merge_ids:				Requested attribute of the merged sublayer
+		'''
+
+		split_str = ""
+		if split is not None:
+			split_str = "_" + split
+
+		if 'merge' in parent:
+			if conditional_mapping is not None and split is not None:
+				return getattr(self.sublayers['core' + split_str][conditional_mapping], return_type)
+
+			elif conditional_mapping:
+				return getattr(self.sublayers['core' + split_str][conditional_mapping], return_type)
+
+			elif split is not None:
+				return getattr(self.sublayers['core' + split_str], return_type)
+
+			else:
+				return getattr(self.sublayers[self.merge_head], return_type)
+
+
 #####################################################################################
 # Public Methods for Writing Dag Layer
 #####################################################################################
 
 	def write_operators(self):
 		'''
-		Write all operators owned by later to the parent DAG
-		These are all stored as strings
+		Add all operators owned by the layer to the parent DAG's graph,
+		in a section for this layer.
 		'''
 
-		#Add section tag for operators in provided layer
-		self.dag.operators += \
-		'''
-\n###########################################################
-# Operators pertaining to {} dag layer with tag {}
-###########################################################\n'''\
-		.format(self.parent.upper(), self.tag.upper())
+		#Register a section for operators in provided layer
+		self.dag.graph.add_section(self.tag, self.parent)
 
-		#For each operator string in the list of operators
-		#Add the operator to the parent dag
-		#Write families for each sublayer
+		#For each operator in the layer
+		#Add the operator to the parent dag's graph
 		for sublayer_name, sublayer in self.sublayers.items():
 			if isinstance(sublayer, dict):
 				for cond_sublayer_name, cond_sublayer in sublayer.items():
@@ -213,56 +235,32 @@ class DagLayer:
 
 	def write_op_families(self):
 		'''
-		Write all operator families belonging to layer to parent DAG.
-
-		Sub_Function:
-			__write_op_family:			Write operator family for one family
+		Add all operator families belonging to layer to the parent DAG's graph.
 
 		'''
 
-		#Partition python file to describe operator families
-		self.dag.op_families += \
-		'''
-\n###########################################################
-# Operator families pertaining to {} dag layer with tag {}
-###########################################################\n'''\
-		.format(self.parent.upper(), self.tag.upper())
-
 		#Write families for each sublayer
 		for sublayer_name, sublayer in self.sublayers.items():
 			if isinstance(sublayer, dict):
 				for cond_sublayer_name, cond_sublayer in sublayer.items():
-					self.dag.op_families += \
-					"\n\n## Families pertaining to {} conditional sublayer\n".format(cond_sublayer_name)
 					cond_sublayer.write_op_families()
 			else:
 				sublayer.write_op_families()
 
-			
-
 
 	def write_sublayers(self):
 		'''
-		Write all sublayers to owning DAG. A sublayer is defined by 
+		Write all sublayers to owning DAG's graph. A sublayer is defined by 
 		whether or not is can be run in parallel with other tasks in
 		a layer, or involves the output from the previous sublayer. As
 		of now, the only time you have more than one sublayer is if
 		you are merging columns back into the dataset
 
 		Sub_Function:
-			__write_sublayer:				Writes sublayer for specific sublayer
 			write_sublayer_associations:	Connect sublayers into a single layer
 
 		'''
 
-		#Partition for sublayer for organization in final DAG .py file
-		self.dag.layers += \
-		'''
-\n###########################################################
-# Sublayer pertaining to {} dag layer with tag {}
-###########################################################\n'''\
-		.format(self.parent.upper(), self.tag.upper())
-
 		#Iterate through all sublayers, in order
 		for sublayer_name, sublayer in self.sublayers.items():
 			if isinstance(sublayer, dict):
@@ -273,12 +271,6 @@ class DagLayer:
 				sublayer.write(head = True)
 				sublayer.write(head = False)
 
-		if len(self.sublayer_order) > 1:
-			#Partition final DAG file before establishing connections
-			#TODO: Make more intelligent
-			self.dag.layers += "\n## Connecting all sublayers (if > 1) for {} dag layer with tag {}"\
-																.format(self.parent.upper(),
-																		self.tag.upper())
 		#Write sublayer associations
 		self.write_sublayer_associations()
 
@@ -315,8 +307,8 @@ class DagLayer:
 
 	def write_sublayer_associations(self):
 		'''
-		Write assocations for sublayers and give to full layer variable.
-		This is the final step before connecting all DAG layers.
+		Connect sublayers in the parent DAG's graph. This is the 
+		final step before connecting all DAG layers.
 
 		'''
 
@@ -326,11 +318,8 @@ class DagLayer:
 		if self.conditional_mapping:
 
 			for conditional_mapping in self.head:
-				self.dag.layers += "\n\n## Printing conditional associations for {}".format(conditional_mapping)
-				sublayer = copy.deepcopy(self.sublayer_order)
-				for i in range(len(sublayer)):
-					sublayer[i] = sublayer[i][conditional_mapping]
-				self.__write_sublayer_associations(sublayer)
+				self.__write_sublayer_associations([sublayer[conditional_mapping] 
+														for sublayer in self.sublayer_order])
 		else:
 			self.__write_sublayer_associations(self.sublayer_order)
 
@@ -731,106 +720,6 @@ The value was found to be: {}"""\
 									conditional_mapping,
 									split)
 
-	def __route(self, parent = 'init', 
-						family = 'init', 
-						family_upstream_task = 'init',
-						op = 'init', 
-						params = 'init',
-						inherits = False,
-						conditional_mapping = None,
-						split = None):
-		
-		#Holistic or custom operators may come in as strings
-		op_name = op.__name__ if is_callable(op) else op
-
-		#Operator router
-		#TODO: Find a better place to put this
-		self.op_router = \
-			{'splitting': 
-							{'operator': split_operation, 
-							'args': {'func': op,
-									'params': params},
-							 'task_tag': [family, op_name]},
-             'data_sources': 
-             				{'operator':read_data_operation, 
-             				'args': {'func': op, 
-             						'params': params,
-             						'filepath': family},
-             				'task_tag': [family, 
-             							op_name]},
-             'preprocessing': 
-             				{'operator':bulk_data_operation, 
-             				'args': {'func': op,
-             						'split': split,
-             						'params': params},
-             				'task_tag':[family, split, op_name]},
-             'evaluation': 
-             				{'operator':evaluation_operation, 
-             				'args': {'func': op,
-             						 'params': params,
-             						 #Figure out model id generation for eval tasks
-             						 'model_id': conditional_mapping},
-             				'holistic': {
-             							"post":
-             								{'merge_metrics': #Parent
-             								{'merge_metrics': {}}}},
-             				'task_tag': [conditional_mapping, family]},
-             # Will wait to do any EDA design patterns
-             # 'eda': 
-             # 				{'operator':bulk_data_operation, 
-             # 				'args': {'func'},
-             # 				'task_tag':[]},
-
-             'modeling': 
-             				{'operator':[('fit',fit_operation), 
-             							 ('predict',predict_operation)], 
-
-             				#Registers model for evaluation functions later
-             				'args': {'model': op, 
-             						'params': params},
-             				'holistic': {'pre':
-             								{'model_data_split':
-             									{'model_data_split': {}}}},
-             				'arg_xcom_update': ['model'],
-             				'task_tag':[family]},
-
-             'feature_engineering': 
-             				#Airflows op_converter needs to be determined
-             				{'operator': col_data_operation, 
-             				'args': {'func': op,
-             						 'params': params,
-             						 'split': split,
-             						 'inherits': inherits,
-             						 'column_data_id': family_upstream_task},
-             				'holistic': {"post":
-             								{'merge_layer': #Parent
-             								{'merge_cols': {}}}},
-             				'task_tag': [family, split, op_name]},
-
-             #HOLISTIC LAYER OPERATIONS START HERE
-             'merge_layer': 
-             				{'operator': merge_data_operation, 
-             				'args': {'params': params,
-             				'merge_ids': self.__get_merge_ids('head',parent, conditional_mapping, split),
-             				'pass_through_cols': self.__get_merge_ids('pass_through_cols',
-             															parent, conditional_mapping, split),
-             				'split': split},
-             				'task_tag': [self.tag, split, 'merge_layer']},
-
-             'merge_metrics': 
-             				{'operator': merge_metrics_operation, 
-             				'args': {'params': params,
-             				'merge_ids': self.__get_merge_ids('head', parent, conditional_mapping, split),
-             				'model': conditional_mapping},
-             				'task_tag': [self.tag, split, conditional_mapping, 'merge_metrics']},
-
-             'model_data_split': 
-             				{'operator': model_split_operation, 
-             				'args': {'params': params},
-             				'task_tag': ['model_data_split']}
-		}
-
-
 	def __prime_operator(self, 
 						parent, 
 						family, 
@@ -874,18 +763,19 @@ The value was found to be: {}"""\
 			return None
 
 		#Route all local vars except reference to self
-		info = locals()
-		info.pop('self')
+		route = locals()
+		route.pop('self')
 
-		#Route operation
-		self.__route(**info)
+		#Holistic or custom operators may come in as strings
+		route['op_name'] = op.__name__ if is_callable(op) else op
 
-		#Must be converted to a list to be iterated on later
-		python_callables = self.op_router[parent]['operator']
-		if isinstance(python_callables, list):
-			python_callables = python_callables
-		else:
-			python_callables = [python_callables]
+		#Look up the precompiled routing of the stage, and
+		#build the arguments and task tag of this operation only.
+		#Arguments are frozen once and shared by the stage's operators
+		stage = get_stage(parent)
+		params = freeze(stage.args(self, route))
+		task_tag = stage.task_tag(self, route)
+		python_callables = stage.operators
 
 		#Initialize the final_operator, upstream task id, and detail list
 		op_detail_list = []
@@ -896,39 +786,30 @@ The value was found to be: {}"""\
 		for p_callable in python_callables:
 
 			#Copy the initial task tag
-			task_id = copy.deepcopy(self.op_router[parent]['task_tag'])
+			task_id = list(task_tag)
 
 			#If there are upstream tasks that will update xcom arguments
-			#Replace the existing arguments with correct values
-			#TODO: Put in its own function
+			#Replace the existing arguments with correct values.
+			#Only the changed arguments are copied
 			if upstream_task_id is not None:
-				for update in self.op_router[parent]['arg_xcom_update']:
-					params[update] = upstream_task_id
+				for update in stage.arg_xcom_update:
+					params = params.set(update, upstream_task_id)
 
 			#If there are is more than one callable in router queue
 			#Update the task IDs to ensure that there is not duplication
 			if len(python_callables) > 1:
 				task_id.append(p_callable[0])
-				final_operator = p_callable[1]
-			else:
-				final_operator = p_callable
+			final_operator = p_callable[1]
 
 
 			#Generate the task id for the task
 			#And verify it is not a duplicate
 			task_id = self.__create_task_id(task_id)
 
-			#Isolate parameters that have been updated with
-			#The operator router
-			params = self.op_router[parent]['args']
-			
-			#Dictionary with all task details added to
-			#Operator detail dictionary
-
-
+			#Frozen parameters are shared, not copied
 			new_op = DagOperator(task_id,
 							   final_operator,
-							   copy.deepcopy(params))
+							   params)
 
 			#Add new operator to detail list
 			op_detail_list.append(new_op)
@@ -942,28 +823,17 @@ The value was found to be: {}"""\
 
 	def __write_sublayer_associations(self, sublayer_order):
 		"""
-		Private method that, given a sublayer order, parses through
-		the layer to determine sublayer associations
+		Private method that, given a sublayer order, makes the tail
+		of every sublayer depend on the head of the sublayer before it.
 
 		Args:
 			sublayer_order:						List of sublayers, in order
 
 		"""
 
-		#Template for generating connected layer
-		connected_layer = "\n{}"
-
-
-		#Add layers to the final dag.
-		#TODO: This will need to be changed to fix Airflow dependency issues
 		for sublayer_index in range(len(sublayer_order) - 1):
-			self.dag.layers += connected_layer\
-									.format(" >> "\
-										.join([sublayer_order[sublayer_index]\
-															.refs['head'],
-											   sublayer_order[sublayer_index + 1]\
-											   				.refs['tail']])\
-																.replace("'", ""))
+			self.dag.graph.connect(sublayer_order[sublayer_index].head,
+								   sublayer_order[sublayer_index + 1].tail)
 
 #####################################################################################
 # Private Validation Methods
@@ -1066,38 +936,7 @@ Please check your inputs, the task family in question = {}""".format(family_id))
 		#Return model object, unchanged
 		return model
 
-	def __get_merge_ids(self, return_type, parent, conditional_mapping = None, split = None):
-		'''
-		EXPERIMENTAL: May be a good way to 
-		generate all of the tasks for evaluation of 
-		Machine Learning models
-
-		Args:
-			family:					Model family
-			model:					Model object
-	
-		Returns:
-			model:					Model object, unchanged
-		'''
-
-		split_str = ""
-		if split is not None:
-			split_str = "_" + split
-
-		if 'merge' in parent:
-			if conditional_mapping is not None and split is not None:
-				return self.sublayers['core' + split_str][conditional_mapping].__dict__[return_type]
-
-			elif conditional_mapping:
-				return self.sublayers['core' + split_str][conditional_mapping].__dict__[return_type]
-
-			elif split is not None:
-				return self.sublayers['core' + split_str].__dict__[return_type]
-
-			else:
-				return self.sublayers[self.merge_head].__dict__[return_type]
 
 
 
 
-	
\ No newline at end of file
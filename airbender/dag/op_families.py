@@ -8,6 +8,8 @@
 #
 #####################################################################################
 
+import sys
+
 from airbender.dag.operators import DagOperator
 
 #####################################################################################
@@ -16,9 +18,11 @@ from airbender.dag.operators import DagOperator
 
 class OpFamily:
 
+	__slots__ = ('family_id', 'members', 'sublayer', 'head', 'tail')
+
 	def __init__(self, family_id, members, sublayer):
 
-		self.family_id = family_id
+		self.family_id = sys.intern(family_id)
 		self.members = members
 		self.sublayer = sublayer
 		self.head = members[-1].task_id
@@ -30,26 +34,15 @@ class OpFamily:
 
 	def write(self):
 		'''
-		Write out associations for an entire operator family.
-
-		Args:
-			family:						String representing family_id
-			members:					Dictionary of family members
+		Add the operator family to the owning DAG's graph. Members
+		of the family are chained in sequence.
 
 		'''
 
-		#Templated string
-		op_family_string ='''\n{} = {}'''
-
-		#Isolate the names of the members (variable name where family will be stored)
-		member_list = [op.task_id for op in self.members]
-
-		#Write out all family members and their sequential association
-		member_string = " >> ".join(member_list).replace("'", "")
-
-		#Add family to list of operator families
-		self.sublayer.layer.dag.op_families += op_family_string.format(self.family_id, 
-																		member_string)
+		layer = self.sublayer.layer
+		layer.dag.graph.add_family(self.family_id,
+								   [op.task_id for op in self.members],
+								   layer.tag)
 
 	def write_operators(self):
 		for operator in self.members:
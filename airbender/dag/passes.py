@@ -0,0 +1,677 @@
+#####################################################################################
+#
+#
+# 	Optimization Passes over the Graph IR
+#
+#
+#####################################################################################
+
+
+#####################################################################################
+# External Library and Module Imports
+#####################################################################################
+
+# System and OS
+import os
+import json
+
+#Preserve order of column groups
+from collections import OrderedDict, deque
+
+#Airbender
+from airbender.airflow.op_converter import (col_data_operation, 
+											fused_col_data_operation,
+											block_data_operation,
+											read_data_operation,
+											evaluation_operation,
+											model_evaluation_operation,
+											stacked_evaluation_operation,
+											merge_metrics_operation,
+											split_operation,
+											k_fold_operation,
+											fold_operation,
+											fold_metrics_operation,
+											OPERATION_IO,
+											TASK_ID_PARAMS,
+											TRAIN_ARTIFACT_OPERATIONS,
+											task_splits)
+from airbender.airflow import artifacts
+from airbender.airflow.lazy import run_lazy_task, lazy_params, unwrap_lazy
+from airbender.dag.graph import TaskNode
+from airbender.dag.utils import callable_name, canonicalize, is_callable, freeze
+from airbender.static.feature_engineering import BLOCK_FUNCTIONS
+from airbender.static.splitting import FOLD_FUNCTIONS
+
+#Operations whose families can be fused, and the operation that runs the fused family
+FUSIBLE_OPERATIONS = {col_data_operation: fused_col_data_operation}
+
+#Default target size of the data handled by one column group task (64 MB)
+DEFAULT_BLOCK_BYTES = 1 << 26
+
+#Default size above which literal params are stored as sidecars (4 KB)
+DEFAULT_SIDECAR_BYTES = 1 << 12
+
+#####################################################################################
+# Graph Passes
+#####################################################################################
+
+def fuse_families(graph):
+	'''
+	Fuses every sequential operator family into a single task that
+	applies the whole chain in-process. Only families of fusible
+	operations (feature engineering columns) with more than one member
+	are fused. The fused task keeps the task id of the family head, so
+	downstream tasks that pull from the head are unaffected.
+
+	Args:
+		graph:						DagGraph to rewrite in place
+
+	'''
+
+	#Fusing one family leaves the chains of every other family as they are
+	downstream = graph.downstream()
+
+	replacements = []
+	for family_id, members in graph.families.items():
+		if len(members) < 2:
+			continue
+
+		nodes = [graph.tasks[task_id] for task_id in members]
+		fused_callable = FUSIBLE_OPERATIONS.get(nodes[0].callable)
+
+		if (fused_callable is None or
+			any(node.callable is not nodes[0].callable for node in nodes)):
+			continue
+
+		#Members must form a chain, with nothing else depending on inner members
+		if any(downstream[task_id] != [next_id] for task_id, next_id in zip(members[:-1], members[1:])):
+			continue
+
+		head = nodes[-1]
+		fused = TaskNode(head.task_id,
+						 fused_callable,
+						 {'split': head.params.get('split'),
+						  'steps': [node.params for node in nodes]},
+						 section = head.section,
+						 family_id = family_id,
+						 meta = dict(head.meta, fused = list(members)))
+
+		replacements.append((list(members), fused))
+
+	graph.replace_task_sets(replacements)
+
+
+def group_columns(graph, block_bytes = DEFAULT_BLOCK_BYTES):
+	'''
+	Groups columns that share an identical chain of operations into
+	block tasks. Each block task reads all of its columns at once and
+	applies the block version of every step to the 2-D block in one
+	NumPy pass. Per-column artifacts are kept as arrays.
+
+	Task granularity is chosen from the column count and the estimated
+	size of each column: a group is split into tasks of roughly
+	block_bytes each. Columns whose chain has no block version, or that
+	end up alone in a task, are left as they are.
+
+	Args:
+		graph:						DagGraph to rewrite in place
+
+	Kwargs:
+		block_bytes:				Target size of the data handled by one block task
+
+	'''
+
+	#Families sharing a section, split and op chain can be grouped
+	groups = OrderedDict()
+	for family_id, members in graph.families.items():
+		nodes = [graph.tasks[task_id] for task_id in members]
+		if (not nodes or 
+			any(node.callable is not col_data_operation or
+				node.params['func'] not in BLOCK_FUNCTIONS for node in nodes)):
+			continue
+
+		head = nodes[-1]
+		signature = json.dumps([[callable_name(node.params['func']), canonicalize(node.params['params'])]
+									for node in nodes])
+		groups.setdefault((head.section, head.meta.get('sublayer'), head.params['split'], signature), 
+						  []).append(family_id)
+
+	column_bytes = estimate_column_bytes(graph)
+	block_counts = {}
+
+	#Blocks are collected, then swapped in with one rewrite of the graph
+	replacements = []
+	heads = {}
+
+	for (section, sublayer, split, _), family_ids in groups.items():
+
+		#Without a size estimate, each group becomes a single task
+		columns_per_task = len(family_ids)
+		if column_bytes:
+			columns_per_task = max(1, int(block_bytes // column_bytes))
+
+		for start in range(0, len(family_ids), columns_per_task):
+			chunk = family_ids[start:start + columns_per_task]
+			if len(chunk) < 2:
+				continue
+
+			index = block_counts.get((section, split), 0)
+			block_counts[(section, split)] = index + 1
+
+			task_ids, block = _column_block(graph, chunk, section, split, index)
+			replacements.append((task_ids, block))
+			heads.update((graph.families[family_id][-1], block.task_id) for family_id in chunk)
+
+	graph.replace_task_sets(replacements)
+
+	#Merge tasks now read the whole block in place of each column
+	for node in graph.tasks.values():
+		if 'merge_ids' in node.params and 'pass_through_cols' in node.params:
+			merge_ids = list(OrderedDict.fromkeys(heads.get(task_id, task_id) 
+													for task_id in node.params['merge_ids']))
+			node.params = freeze(node.params).set('merge_ids', merge_ids)
+
+
+def group_metrics(graph):
+	'''
+	Groups the metrics of each model into one model evaluation task.
+	The task pulls the model's predictions and y_test once, builds the
+	confusion matrix once, and derives every metric from it. Merge
+	tasks keep their output: results are still keyed by the task id
+	of each metric. Models with a single metric are left as they are.
+
+	Args:
+		graph:						DagGraph to rewrite in place
+
+	'''
+
+	#Metrics of the same model, in the same layer, are grouped
+	groups = OrderedDict()
+	for node in graph.tasks.values():
+		if node.callable is evaluation_operation:
+			groups.setdefault((node.section, node.params['model_id']), []).append(node)
+
+	replacements = []
+	for (section, model_id), nodes in groups.items():
+		if len(nodes) < 2:
+			continue
+
+		evaluation = TaskNode("_".join([section, model_id, 'evaluation']),
+							  model_evaluation_operation,
+							  {'model_id': model_id,
+							   'metrics': [{'task_id': node.task_id,
+											'func': node.params['func'],
+											'params': node.params['params']} for node in nodes]},
+							  section = section,
+							  family_id = nodes[0].family_id,
+							  meta = dict(nodes[0].meta, grouped = [node.task_id for node in nodes]))
+
+		replacements.append((nodes, evaluation))
+
+	_replace_evaluations(graph, replacements)
+
+
+def stack_models(graph):
+	'''
+	Evaluates every model of an evaluation layer in one task. The
+	predictions of all models are stacked into one 2-D array, and each
+	metric is computed for all models in one NumPy pass. Merge tasks
+	keep their output: results are still keyed by model, then by the
+	task id of each metric. Layers with a single evaluation task are
+	left as they are.
+
+	Args:
+		graph:						DagGraph to rewrite in place
+
+	'''
+
+	groups = OrderedDict()
+	for node in graph.tasks.values():
+		if node.callable is evaluation_operation:
+			groups.setdefault(node.section, []).append(node)
+
+	replacements = []
+	for section, nodes in groups.items():
+		if len(nodes) < 2:
+			continue
+
+		#The same metric, with the same params, is computed once for every model
+		metrics = OrderedDict()
+		for node in nodes:
+			signature = json.dumps([callable_name(node.params['func']), canonicalize(node.params['params'])])
+			metric = metrics.setdefault(signature, {'func': node.params['func'],
+													'params': node.params['params'],
+													'task_ids': {}})
+			metric['task_ids'][node.params['model_id']] = node.task_id
+
+		evaluation = TaskNode("_".join([section, 'evaluation']),
+							  stacked_evaluation_operation,
+							  {'model_ids': list(OrderedDict.fromkeys(node.params['model_id'] for node in nodes)),
+							   'metrics': list(metrics.values())},
+							  section = section,
+							  family_id = nodes[0].family_id,
+							  meta = dict(nodes[0].meta, grouped = [node.task_id for node in nodes]))
+
+		replacements.append((nodes, evaluation))
+
+	_replace_evaluations(graph, replacements)
+
+
+def fan_out_folds(graph):
+	'''
+	Runs every task downstream of a k-fold split once per fold. The
+	split task stores folds as row positions over the split data
+	(k_fold_operation), and one small task per fold (fold_operation)
+	pushes the train and test views of its fold. Downstream tasks are
+	copied per fold, named after the task with the fold as a prefix.
+	Folds share no tasks, so they run in parallel.
+
+	The metrics of each model are averaged over folds by a task that
+	takes the id of the model's merge task, so metrics keep their shape.
+	Fold tasks share XCom keys, and are told apart by the dataflow
+	dependencies traced within each fold.
+
+	Args:
+		graph:						DagGraph to rewrite in place
+
+	'''
+
+	for task_id, node in list(graph.tasks.items()):
+		if node.callable is split_operation and node.params['func'] in FOLD_FUNCTIONS:
+			_fan_out(graph, task_id, ['fold{}'.format(i) for i in range(node.params['params']['k'])])
+
+
+def dataflow_dependencies(graph, folds_only = False):
+	'''
+	Replaces layer barriers with the true data dependencies of every
+	task. Tasks are replayed in the order the layered graph runs them.
+	Each XCom key a task reads is traced to the task that last wrote
+	it, and every task it pulls return values from is found in its
+	params. Only those edges are kept, so independent columns, splits,
+	and models pipeline across conceptual layers.
+
+	Traced writers are stored in each task's params under 'sources', so
+	that key pulls target the writer instead of the latest value. If any
+	task's operation has no dataflow declaration, its reads and writes
+	cannot be traced and the graph is left unchanged.
+
+	Tasks fanned out per fold share XCom keys. Keys they write are
+	traced within their fold, so folds never read each other's data.
+
+	Args:
+		graph:						DagGraph to rewrite in place
+
+	Kwargs:
+		folds_only:					Only rewrite graphs with tasks fanned out per fold
+
+	Raises:
+		ValueError:					If the graph has folds, and a task's operation has no dataflow declaration
+
+	'''
+
+	folds = any('fold' in node.meta for node in graph.tasks.values())
+	if folds_only and not folds:
+		return
+
+	untraced = [task_id for task_id, node in graph.tasks.items() if node.callable not in OPERATION_IO]
+	if untraced:
+		if folds:
+			raise ValueError("Folds are told apart by traced dataflow, but the operations of tasks {} "
+							 "declare no dataflow".format(untraced))
+		return
+
+	writers = {}
+	upstream = OrderedDict()
+
+	for task_id in graph.topological_order():
+		node = graph.tasks[task_id]
+		io = OPERATION_IO[node.callable]
+		fold = node.meta.get('fold')
+
+		split = node.params.get('split')
+		reads = _io_keys(io['reads'], split)
+		writes = _io_keys(io['writes'], split)
+
+		#Keys written within the fold come first, then keys shared by every fold
+		sources = OrderedDict()
+		for key in reads:
+			writer = writers.get((fold, key), writers.get((None, key)))
+			if writer is not None:
+				sources[key] = writer
+		node_upstream = list(sources.values())
+
+		#Tasks whose return values are pulled directly
+		for source_id in _task_id_params(node.params):
+			if source_id in graph.tasks and source_id != task_id:
+				node_upstream.append(source_id)
+
+		#Test splits apply the artifacts fit by the matching train task
+		if split == 'test' and node.callable in TRAIN_ARTIFACT_OPERATIONS:
+			train_id = task_id.replace('test', 'train')
+			if train_id in graph.tasks:
+				node_upstream.append(train_id)
+
+		node.params = freeze(node.params).set('sources', dict(sources))
+		upstream[task_id] = list(OrderedDict.fromkeys(node_upstream))
+
+		for key in writes:
+			writers[(fold, key)] = task_id
+
+	#Keep the original task order
+	for task_id in graph.tasks:
+		graph.upstream[task_id] = upstream[task_id]
+
+
+def externalize_params(graph, threshold_bytes = DEFAULT_SIDECAR_BYTES):
+	'''
+	Moves large literal params out of the generated code. User params
+	(ordinal maps, boolean maps, category lists, ...) whose literal form
+	is larger than threshold_bytes are written once to the artifact store,
+	and only a reference is left in the task params. Operations load the
+	references when the task runs.
+
+	The artifact store active at generation time must be the store the
+	workers use, and must keep artifacts until the DAG is regenerated:
+	stores that prune unused artifacts (such as the default store in the
+	temporary directory) are refused. Values holding callables are never
+	moved, so their imports are still emitted.
+
+	Args:
+		graph:						DagGraph to rewrite in place
+
+	Kwargs:
+		threshold_bytes:			Literal size above which a param is moved
+
+	Raises:
+		ValueError:					If a param must be moved but no artifact store is active,
+									or the active store prunes unused artifacts
+
+	'''
+
+	for node in graph.tasks.values():
+		node.params = _externalize(node.params, threshold_bytes, user = False)
+
+
+def lazy_imports(graph):
+	'''
+	Makes every task resolve its callables at execution time. Tasks
+	run run_lazy_task, and their operation and every callable in their
+	params are referenced by dotted path. The emitted DAG file then 
+	imports nothing but Airflow and run_lazy_task, so the scheduler
+	does not import sklearn, pandas, etc. each time it parses the file.
+
+	Must run after every pass that inspects task callables.
+
+	Args:
+		graph:						DagGraph to rewrite in place
+
+	'''
+
+	for node in graph.tasks.values():
+		if node.callable is not run_lazy_task:
+			node.params = lazy_params(node.callable, node.params)
+			node.callable = run_lazy_task
+
+
+def estimate_source_bytes(graph):
+	'''
+	Estimates the size of the experiment's data from the
+	size of the source files its read tasks exist for.
+
+	Args:
+		graph:						DagGraph of the experiment
+
+	Returns:
+		source_bytes:				Estimated bytes of the source data, 0 if unknown
+
+	'''
+
+	tasks = [unwrap_lazy(node.callable, node.params) for node in graph.tasks.values()]
+
+	return sum(os.path.getsize(params['filepath']) 
+					for operation, params in tasks
+					if operation is read_data_operation 
+					and os.path.exists(params['filepath']))
+
+
+def estimate_column_bytes(graph):
+	'''
+	Estimates the size of a single column of the experiment's data,
+	from the size of the source files and the number of columns that
+	are engineered or passed through.
+
+	Args:
+		graph:						DagGraph of the experiment
+
+	Returns:
+		column_bytes:				Estimated bytes per column, or None if unknown
+
+	'''
+
+	source_bytes = estimate_source_bytes(graph)
+
+	columns = max([len(params['merge_ids']) + len(params['pass_through_cols'])
+						for params in (unwrap_lazy(node.callable, node.params)[1] for node in graph.tasks.values())
+						if 'pass_through_cols' in params] or [0])
+
+	if not source_bytes or not columns:
+		return None
+
+	return source_bytes / float(columns)
+
+#####################################################################################
+# Private Helpers
+#####################################################################################
+
+def _column_block(graph, family_ids, section, split, index):
+
+	families = [[graph.tasks[task_id] for task_id in graph.families[family_id]] 
+					for family_id in family_ids]
+	columns = [nodes[0].params['column_data_id'] for nodes in families]
+
+	block = TaskNode("_".join([section, split, 'block', str(index)]),
+					 block_data_operation,
+					 {'split': split,
+					  'columns': columns,
+					  'steps': [{'func': BLOCK_FUNCTIONS[node.params['func']],
+								 'params': node.params['params'],
+								 'split': split} for node in families[0]]},
+					 section = section,
+					 family_id = family_ids[0],
+					 meta = dict(families[0][-1].meta, grouped = list(family_ids), columns = columns))
+
+	return [node.task_id for nodes in families for node in nodes], block
+
+
+def _replace_evaluations(graph, replacements):
+
+	#Evaluations are swapped in with one rewrite of the graph
+	graph.replace_task_sets([([node.task_id for node in nodes], evaluation) 
+								for nodes, evaluation in replacements])
+
+	#Merge tasks now read their metrics from the evaluation tasks
+	replaced = {node.task_id: evaluation.task_id for nodes, evaluation in replacements for node in nodes}
+	for node in graph.tasks.values():
+		if node.callable is merge_metrics_operation:
+			evaluations = list(OrderedDict.fromkeys(replaced[task_id] for task_id in node.params['merge_ids']
+														if task_id in replaced))
+			if not evaluations:
+				continue
+
+			merge_ids = list(OrderedDict.fromkeys(replaced.get(task_id, task_id) 
+													for task_id in node.params['merge_ids']))
+			node.params = freeze(node.params).set('merge_ids', merge_ids)\
+											 .set('evaluations', list(node.params.get('evaluations', [])) +
+																 evaluations)
+
+
+def _fan_out(graph, split_id, folds):
+
+	#Every task downstream of the split runs once per fold
+	downstream = graph.downstream()
+	cloned = set()
+	pending = deque(downstream[split_id])
+	while pending:
+		task_id = pending.popleft()
+		if task_id not in cloned:
+			cloned.add(task_id)
+			pending.extend(downstream[task_id])
+
+	def rename(fold):
+		def fold_id(task_id):
+			if task_id in cloned or task_id == split_id:
+				return "_".join([fold, task_id])
+			return task_id
+		return fold_id
+
+	tasks = OrderedDict()
+	upstream = OrderedDict()
+	for task_id, node in graph.tasks.items():
+
+		if task_id == split_id:
+			tasks[task_id] = TaskNode(task_id, k_fold_operation, node.params, section = node.section,
+									  family_id = node.family_id, meta = node.meta)
+			upstream[task_id] = graph.upstream[task_id]
+
+			for fold in folds:
+				select_id = rename(fold)(task_id)
+				tasks[select_id] = TaskNode(select_id, fold_operation, {'fold': fold}, section = node.section,
+											meta = dict(node.meta, fold = fold))
+				upstream[select_id] = [task_id]
+
+		elif task_id in cloned:
+			for fold in folds:
+				fold_id = rename(fold)
+				tasks[fold_id(task_id)] = TaskNode(fold_id(task_id), node.callable,
+												   _refold(node.params, fold_id),
+												   section = node.section,
+												   family_id = "_".join([fold, node.family_id]) if node.family_id else None,
+												   meta = dict(node.meta, fold = fold))
+				upstream[fold_id(task_id)] = [fold_id(upstream_id) for upstream_id in graph.upstream[task_id]]
+
+			#Metrics are averaged over folds, under the id of the merge task
+			if node.callable is merge_metrics_operation:
+				merge_ids = [rename(fold)(task_id) for fold in folds]
+				tasks[task_id] = TaskNode(task_id, fold_metrics_operation,
+										  {'merge_ids': merge_ids,
+										   'folds': folds,
+										   'model': node.params['model']},
+										  section = node.section,
+										  meta = node.meta)
+				upstream[task_id] = merge_ids
+
+		else:
+			tasks[task_id] = node
+			upstream[task_id] = graph.upstream[task_id]
+
+	graph.tasks = tasks
+	graph.upstream = upstream
+
+	#Families and groups of the cloned tasks are copied per fold
+	for members_by_name, kind in [(graph.families, 'families'), (graph.groups, 'groups')]:
+		folded = OrderedDict()
+		for name, members in members_by_name.items():
+			if not any(task_id in cloned for task_id in members):
+				folded[name] = members
+				continue
+			for fold in folds:
+				folded["_".join([fold, name])] = [rename(fold)(task_id) for task_id in members]
+
+		for section in graph.sections.values():
+			section[kind] = [fold_name for name in section[kind]
+								for fold_name in ([name] if name in folded
+												  else ["_".join([fold, name]) for fold in folds])]
+
+		members_by_name.clear()
+		members_by_name.update(folded)
+
+
+def _refold(value, fold_id):
+
+	#Task ids in params are renamed to the fold's tasks. User params are left alone
+	if isinstance(value, str):
+		return fold_id(value)
+
+	elif isinstance(value, dict):
+		return {fold_id(key): (item if key == 'params' else _refold(item, fold_id))
+					for key, item in value.items()}
+
+	elif isinstance(value, list):
+		return [_refold(item, fold_id) for item in value]
+
+	return value
+
+
+def _io_keys(keys, split):
+
+	#Fused tasks read and write the keys of both splits
+	return list(OrderedDict.fromkeys(key.format(split = task_split) 
+										for key in keys for task_split in task_splits(split)))
+
+
+def _externalize(params, threshold_bytes, user):
+
+	#Only values under a 'params' key are user literals. The remaining
+	#params (task ids, splits, sources) are read by other graph passes
+	if isinstance(params, dict):
+		externalized = {}
+		for k,v in params.items():
+			child_user = user or k == 'params'
+			if (child_user and 
+				not is_callable(v) and
+				len(repr(v)) > threshold_bytes and 
+				not _holds_callables(v)):
+				externalized[k] = _store_sidecar(v)
+			else:
+				externalized[k] = _externalize(v, threshold_bytes, child_user)
+		return params.__class__(externalized)
+
+	if isinstance(params, list):
+		return params.__class__(_externalize(item, threshold_bytes, user) for item in params)
+
+	return params
+
+
+def _holds_callables(value):
+
+	if is_callable(value):
+		return True
+
+	if isinstance(value, dict):
+		return any(_holds_callables(k) or _holds_callables(v) for k,v in value.items())
+
+	if isinstance(value, (list, tuple, set, frozenset)):
+		return any(_holds_callables(item) for item in value)
+
+	return False
+
+
+def _store_sidecar(value):
+
+	store = artifacts.get_artifact_store()
+	if store is None:
+		raise ValueError("Storing large params as sidecars requires an active artifact store")
+
+	#Sidecars are read each time the dag runs, long after they are written
+	if getattr(store, 'retention', None) is not None:
+		raise ValueError("Sidecars cannot be stored in an artifact store that prunes unused artifacts "
+						 "(retention of {} seconds at {}). Set {} to a persistent directory"\
+						 .format(store.retention, store.root, artifacts.ARTIFACT_ROOT_ENV))
+
+	return store.put(value)
+
+
+def _task_id_params(params):
+
+	#Fused tasks keep the params of each step
+	param_sets = [params] + list(params.get('steps', []))
+
+	for param_set in param_sets:
+		for name in TASK_ID_PARAMS:
+			value = param_set.get(name)
+			if isinstance(value, str):
+				yield value
+			elif isinstance(value, list):
+				for item in value:
+					if isinstance(item, str):
+						yield item
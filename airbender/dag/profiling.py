@@ -0,0 +1,274 @@
+#####################################################################################
+#
+#
+# 	Generation Profiling: Phase Timings, Allocations, and Graph Statistics
+#
+#
+#####################################################################################
+
+
+#####################################################################################
+# External Library and Module Imports
+#####################################################################################
+
+# System and OS
+import json
+import time
+import tracemalloc
+import contextlib
+
+#Preserve order of phases and layers
+from collections import OrderedDict
+
+#Airbender
+from airbender.airflow.op_converter import (read_data_operation,
+											split_operation,
+											bulk_data_operation,
+											merge_data_operation,
+											model_split_operation,
+											col_data_operation,
+											fused_col_data_operation,
+											block_data_operation)
+from airbender.airflow.lazy import unwrap_lazy
+from airbender.dag.passes import estimate_source_bytes, estimate_column_bytes
+
+#Peaks can only be reset from Python 3.9
+RESET_PEAK = hasattr(tracemalloc, 'reset_peak')
+
+#Operations passing whole frames (of roughly the source size) downstream
+FRAME_OPERATIONS = [read_data_operation,
+					split_operation,
+					bulk_data_operation,
+					merge_data_operation,
+					model_split_operation]
+
+#Operations passing one column (or one block of columns) downstream
+COLUMN_OPERATIONS = [col_data_operation,
+					 fused_col_data_operation,
+					 block_data_operation]
+
+#####################################################################################
+# Class and Constructor
+#####################################################################################
+
+class GenerationProfile:
+	'''
+	Opt-in profile of a DagGenerator build. Records the wall time and
+	memory allocations of every generation phase, and of every DagLayer
+	within the layer phases. After the build, statistics of the graph are
+	recorded: task and edge counts, width, depth, and an estimate of the
+	data passed between tasks of each layer.
+
+	Allocations are measured with tracemalloc, which is started for the
+	duration of the build if it is not already tracing. Allocated bytes
+	are the net change in traced memory; peak bytes are the highest
+	traced memory above the phase's starting point. Before Python 3.9,
+	peaks that stay below an earlier peak are only measured at the start
+	and end of the phase.
+	'''
+
+	def __init__(self):
+
+		#Timings and allocations of each phase, and of each layer per phase
+		self.phases = OrderedDict()
+		self.layers = OrderedDict()
+
+		#Statistics of the built graph
+		self.graph = {}
+
+		#Whether this profile started tracemalloc, and
+		#the starting point of every phase being measured
+		self.__tracing = False
+		self.__stack = []
+
+#####################################################################################
+# Public Methods
+#####################################################################################
+
+	def start(self):
+		'''
+		Start tracing allocations, if they are not already traced.
+		'''
+		if not tracemalloc.is_tracing():
+			tracemalloc.start()
+			self.__tracing = True
+
+	def stop(self):
+		'''
+		Stop tracing allocations, if this profile started tracing.
+		'''
+		if self.__tracing:
+			tracemalloc.stop()
+			self.__tracing = False
+
+	@contextlib.contextmanager
+	def phase(self, name, layer = None):
+		'''
+		Context manager measuring one phase, or one layer within a phase.
+		Phases measured more than once are accumulated.
+
+		Args:
+			name:					Phase name
+
+		Kwargs:
+			layer:					Tag of the DagLayer being processed
+
+		'''
+
+		tracing = tracemalloc.is_tracing()
+		if tracing:
+			current, peak = tracemalloc.get_traced_memory()
+
+			#Peaks are reset for nested phases. The enclosing
+			#phase keeps the highest peak seen so far
+			if self.__stack:
+				self.__stack[-1]['peak'] = max(self.__stack[-1]['peak'], peak)
+			self.__stack.append({'start': current, 'peak': current, 'traced_peak': peak})
+			if RESET_PEAK:
+				tracemalloc.reset_peak()
+				self.__stack[-1]['traced_peak'] = current
+
+		start = time.perf_counter()
+
+		try:
+			yield
+		finally:
+			record = {'seconds': time.perf_counter() - start,
+					  'allocated_bytes': 0,
+					  'peak_bytes': 0}
+			if tracing:
+				current, peak = tracemalloc.get_traced_memory()
+				frame = self.__stack.pop()
+
+				#Without resetting, a peak older than the phase is not
+				#its own. The phase then peaked at its start or end at least
+				if peak <= frame['traced_peak']:
+					peak = current
+				peak = max(frame['peak'], peak)
+				if self.__stack:
+					self.__stack[-1]['peak'] = max(self.__stack[-1]['peak'], peak)
+
+				record['allocated_bytes'] = current - frame['start']
+				record['peak_bytes'] = peak - frame['start']
+
+			target = self.phases if layer is None else self.layers.setdefault(layer, OrderedDict())
+			self.__accumulate(target, name, record)
+
+	def record_graph(self, graph):
+		'''
+		Record statistics of a built graph.
+
+		Args:
+			graph:					DagGraph of the experiment
+
+		'''
+
+		#Level of each task: length of the longest path that reaches it
+		levels = {}
+		for task_id in graph.topological_order():
+			levels[task_id] = max([levels[upstream_id] + 1 for upstream_id in graph.upstream[task_id]] or [0])
+
+		widths = OrderedDict()
+		for level in levels.values():
+			widths[level] = widths.get(level, 0) + 1
+
+		self.graph = {'tasks': len(graph.tasks),
+					  'edges': sum(len(upstream) for upstream in graph.upstream.values()),
+					  'depth': max(widths) + 1 if widths else 0,
+					  'max_width': max(widths.values()) if widths else 0,
+					  'sections': OrderedDict((tag, sum(1 for node in graph.tasks.values() if node.section == tag))
+													for tag in graph.sections),
+					  'estimated_xcom_bytes': estimate_xcom_bytes(graph)}
+
+	def to_dict(self):
+		'''
+		Returns:
+			profile:				Profile as a JSON serializable dict
+
+		'''
+		return OrderedDict([('phases', self.phases),
+							('layers', self.layers),
+							('graph', self.graph)])
+
+	def to_json(self, path = None):
+		'''
+		Serialize the profile as JSON, optionally writing it to a file.
+
+		Kwargs:
+			path:					Optional path to write the JSON to
+
+		Returns:
+			profile_json:			JSON string of the profile
+
+		'''
+		profile_json = json.dumps(self.to_dict(), indent = 4)
+
+		if path is not None:
+			with open(path, 'w') as profile_file:
+				profile_file.write(profile_json)
+
+		return profile_json
+
+#####################################################################################
+# Private Methods
+#####################################################################################
+
+	def __accumulate(self, target, name, record):
+
+		if name not in target:
+			target[name] = record
+			return
+
+		for key in ['seconds', 'allocated_bytes']:
+			target[name][key] += record[key]
+		target[name]['peak_bytes'] = max(target[name]['peak_bytes'], record['peak_bytes'])
+
+#####################################################################################
+# Unprofiled Builds
+#####################################################################################
+
+@contextlib.contextmanager
+def unprofiled():
+	'''
+	Stands in for a profiled phase when the build is not profiled.
+	contextlib.nullcontext needs Python 3.7.
+	'''
+	yield
+
+#####################################################################################
+# Graph Estimates
+#####################################################################################
+
+def estimate_xcom_bytes(graph):
+	'''
+	Estimates the data each layer passes downstream, through XCom or the
+	artifact store. Frame operations pass about the size of the source
+	data; column operations pass one column per column they handle.
+	Models, predictions, and metrics are not estimated. Estimates are
+	0 when the source data size is unknown.
+
+	Args:
+		graph:						DagGraph of the experiment
+
+	Returns:
+		estimates:					OrderedDict of layer tag -> estimated bytes
+
+	'''
+
+	source_bytes = estimate_source_bytes(graph)
+	column_bytes = estimate_column_bytes(graph) or 0
+
+	estimates = OrderedDict((tag, 0) for tag in graph.sections)
+	for node in graph.tasks.values():
+		operation, params = unwrap_lazy(node.callable, node.params)
+
+		if operation in FRAME_OPERATIONS:
+			estimate = source_bytes
+		elif operation in COLUMN_OPERATIONS:
+			estimate = column_bytes * len(params.get('columns', [None]))
+		else:
+			continue
+
+		estimates[node.section] = estimates.get(node.section, 0) + int(estimate)
+
+	return estimates
@@ -0,0 +1,275 @@
+#####################################################################################
+#
+#
+# 	Stage Registry: Precompiled Routing of Configured Operations to Operators
+#
+#
+#####################################################################################
+
+
+#####################################################################################
+# External Library and Module Imports
+#####################################################################################
+
+# System and OS
+import os
+import json
+import functools
+
+#Preserve order of stages
+from collections import OrderedDict
+
+#Holistic operations are shared by every layer
+from airbender.dag.utils import freeze
+
+#Operator shells
+from airbender.airflow.op_converter import (read_data_operation,
+											split_operation,
+											bulk_data_operation,
+											col_data_operation,
+											fit_operation,
+											predict_operation,
+											evaluation_operation,
+											merge_data_operation,
+											merge_metrics_operation,
+											model_split_operation)
+
+HIERARCHY_PATH = os.path.abspath(os.path.join(__file__, '../../config/dag_hierarchy.cfg'))
+
+#Registered stages, by name
+STAGES = OrderedDict()
+
+#####################################################################################
+# Class and Constructor
+#####################################################################################
+
+class Stage:
+	'''
+	Routing of one stage of the experiment: the operator shells its
+	operations run in, and how their arguments and task ids are built.
+	Stages are either parents in the execution hierarchy, or holistic
+	stages that other stages trigger (merges, for example).
+
+	Argument and task tag builders receive the DagLayer being parsed and
+	a route: a dict of the parent, family, family_upstream_task, op,
+	op_name, params, inherits, conditional_mapping, and split of the
+	operation. Builders run once per operation of their own stage only.
+	'''
+
+	def __init__(self, name, operator, args, task_tag, holistic = None, arg_xcom_update = None):
+		'''
+		Args:
+			name:						Stage name. Parent in the hierarchy, or holistic parent
+			operator:					Operator shell, or list of (task id suffix, operator shell)
+										pairs run in sequence for every operation
+			args:						Function(layer, route) -> operator arguments
+			task_tag:					Function(layer, route) -> list of task id parts
+
+		Kwargs:
+			holistic:					Dict of order ('pre' or 'post') -> {holistic parent: {op: params}}
+			arg_xcom_update:			Arguments replaced by the task id of the previous operator shell
+
+		'''
+
+		self.name = name
+		self.operators = operator if isinstance(operator, list) else [(None, operator)]
+		self.args = args
+		self.task_tag = task_tag
+		self.holistic = freeze(holistic or {})
+		self.arg_xcom_update = arg_xcom_update or []
+
+	def holistic_stages(self):
+		'''
+		Returns:
+			stages:						Names of the holistic stages this stage triggers
+
+		'''
+		return [parent for order in self.holistic.values() for parent in order]
+
+#####################################################################################
+# Registry
+#####################################################################################
+
+def register_stage(stage, replace = False):
+	'''
+	Registers a stage, making it available to every DagLayer
+	without changes to the layers themselves.
+
+	Args:
+		stage:							Stage to register
+
+	Kwargs:
+		replace:						Replace a stage of the same name, if registered
+
+	Raises:
+		ValueError:						If a stage of the same name is registered and replace is False
+
+	Returns:
+		stage:							Registered stage
+
+	'''
+
+	if stage.name in STAGES and not replace:
+		raise ValueError("A stage named '{}' is already registered. Pass replace = True to replace it."\
+			.format(stage.name))
+
+	STAGES[stage.name] = stage
+	stage_table.cache_clear()
+
+	return stage
+
+
+def unregister_stage(name):
+	'''
+	Removes a registered stage.
+
+	Args:
+		name:							Stage name
+
+	'''
+	STAGES.pop(name, None)
+	stage_table.cache_clear()
+
+
+def get_stage(name):
+	'''
+	Looks up the routing of a stage in the stage table.
+
+	Args:
+		name:							Stage name
+
+	Raises:
+		ValueError:						If no stage of that name is registered
+
+	Returns:
+		stage:							Stage
+
+	'''
+
+	stage = stage_table().get(name)
+	if stage is None:
+		raise ValueError("No stage is registered for '{}'. Registered stages:\n - {}"\
+			.format(name, "\n - ".join(stage_table().keys())))
+
+	return stage
+
+
+@functools.lru_cache(maxsize = None)
+def read_hierarchy(path = HIERARCHY_PATH):
+	'''
+	Reads the execution hierarchy. The file is parsed once per process.
+
+	Kwargs:
+		path:							Path to the execution hierarchy configuration
+
+	Returns:
+		hierarchy:						Execution hierarchy dictionary. Must not be modified
+
+	'''
+	with open(path) as exec_config:
+		return json.load(exec_config)
+
+
+@functools.lru_cache(maxsize = None)
+def stage_table(path = HIERARCHY_PATH):
+	'''
+	Compiles the registered stages into a table, once per process
+	(and again only when stages are registered). Stages of the
+	execution hierarchy come first, in hierarchy order, followed by
+	holistic stages.
+
+	Kwargs:
+		path:							Path to the execution hierarchy configuration
+
+	Raises:
+		ValueError:						If a stage is neither in the hierarchy nor triggered
+										holistically by another stage
+
+	Returns:
+		table:							OrderedDict of stage name -> Stage
+
+	'''
+
+	hierarchy = read_hierarchy(path)
+	holistic = set(parent for stage in STAGES.values() for parent in stage.holistic_stages())
+
+	unknown = [name for name in STAGES if name not in hierarchy and name not in holistic]
+	if unknown:
+		raise ValueError("Stages {} are neither in the execution hierarchy ({}) nor triggered by another stage"\
+			.format(unknown, path))
+
+	table = OrderedDict((name, STAGES[name]) for name in sorted(hierarchy, key = lambda name: hierarchy[name]['order'])
+												if name in STAGES)
+	table.update((name, stage) for name, stage in STAGES.items() if name not in table)
+
+	return table
+
+#####################################################################################
+# Built-in Stages
+#####################################################################################
+
+register_stage(Stage('data_sources', read_data_operation,
+					 args = lambda layer, route: {'func': route['op'],
+												  'params': route['params'],
+												  'filepath': route['family']},
+					 task_tag = lambda layer, route: [route['family'], route['op_name']]))
+
+register_stage(Stage('splitting', split_operation,
+					 args = lambda layer, route: {'func': route['op'],
+												  'params': route['params']},
+					 task_tag = lambda layer, route: [route['family'], route['op_name']]))
+
+register_stage(Stage('preprocessing', bulk_data_operation,
+					 args = lambda layer, route: {'func': route['op'],
+												  'split': route['split'],
+												  'params': route['params']},
+					 task_tag = lambda layer, route: [route['family'], route['split'], route['op_name']]))
+
+register_stage(Stage('feature_engineering', col_data_operation,
+					 args = lambda layer, route: {'func': route['op'],
+												  'params': route['params'],
+												  'split': route['split'],
+												  'inherits': route['inherits'],
+												  'column_data_id': route['family_upstream_task']},
+					 task_tag = lambda layer, route: [route['family'], route['split'], route['op_name']],
+					 holistic = {'post': {'merge_layer': {'merge_cols': {}}}}))
+
+#Registers model for evaluation functions later
+register_stage(Stage('modeling', [('fit', fit_operation), ('predict', predict_operation)],
+					 args = lambda layer, route: {'model': route['op'],
+												  'params': route['params']},
+					 task_tag = lambda layer, route: [route['family']],
+					 holistic = {'pre': {'model_data_split': {'model_data_split': {}}}},
+					 arg_xcom_update = ['model']))
+
+register_stage(Stage('evaluation', evaluation_operation,
+					 args = lambda layer, route: {'func': route['op'],
+												  'params': route['params'],
+												  'model_id': route['conditional_mapping']},
+					 task_tag = lambda layer, route: [route['conditional_mapping'], route['family']],
+					 holistic = {'post': {'merge_metrics': {'merge_metrics': {}}}}))
+
+#Holistic stages
+register_stage(Stage('merge_layer', merge_data_operation,
+					 args = lambda layer, route: {'params': route['params'],
+												  'merge_ids': layer.get_merge_ids('head', route['parent'],
+																				   route['conditional_mapping'],
+																				   route['split']),
+												  'pass_through_cols': layer.get_merge_ids('pass_through_cols', route['parent'],
+																						   route['conditional_mapping'],
+																						   route['split']),
+												  'split': route['split']},
+					 task_tag = lambda layer, route: [layer.tag, route['split'], 'merge_layer']))
+
+register_stage(Stage('merge_metrics', merge_metrics_operation,
+					 args = lambda layer, route: {'params': route['params'],
+												  'merge_ids': layer.get_merge_ids('head', route['parent'],
+																				   route['conditional_mapping'],
+																				   route['split']),
+												  'model': route['conditional_mapping']},
+					 task_tag = lambda layer, route: [layer.tag, route['split'], route['conditional_mapping'],
+													  'merge_metrics']))
+
+register_stage(Stage('model_data_split', model_split_operation,
+					 args = lambda layer, route: {'params': route['params']},
+					 task_tag = lambda layer, route: ['model_data_split']))
@@ -13,9 +13,9 @@
 # External Library and Module Imports
 #####################################################################################
 
-from airbender.dag.op_families import OpFamily
+import sys
 
-import pprint
+from airbender.dag.op_families import OpFamily
 
 #####################################################################################
 # Class and Constructor
@@ -24,9 +24,12 @@ import pprint
 
 class DagSubLayer:
 
+	__slots__ = ('name', 'layer', 'refs', 'order', 'op_families',
+				 'head', 'tail', 'pass_through_cols', 'num_families')
+
 	def __init__(self, name, order, layer):
 
-		self.name = layer.tag + "_" + name
+		self.name = sys.intern(layer.tag + "_" + name)
 		self.layer = layer
 		self.refs = {}
 		self.order = order
@@ -43,7 +46,7 @@ class DagSubLayer:
 
 	def add_op_family(self, family_id, family_ops):
 		new_family = OpFamily(family_id, family_ops, self)
-		self.op_families.append(OpFamily(family_id, family_ops, self))
+		self.op_families.append(new_family)
 		self.head.append(new_family.head)
 		self.tail.append(new_family.tail)
 		self.num_families += 1
@@ -51,59 +54,19 @@ class DagSubLayer:
 
 	def write(self, head = True):
 		'''
-		Function that writes sublayer and its associations
-		for a provided sublayer. 
+		Adds the head or tail of the sublayer to the owning DAG's
+		graph as a named group of tasks.
 
-		Args:
-			sublayer:				Sublayer found in DAG
+		Kwargs:
+			head:					Write the head (True) or the tail (False)
 
 		'''
 
+		ref = "head" if head else "tail"
+		sublayer_ref = self.head if head else self.tail
 
-		sublayer_ref = None
-		ref = None
-		if head:
-			ref = "head"
-			sublayer_ref = self.head
-		else:
-			ref = "tail"
-			sublayer_ref = self.tail
-
-		#Sublayer string template
-		sublayer_str = "\n{} = {}\n"
-
-		#Adding partition for generating sublayers for dag HEAD
-		self.layer.dag.layers += "\n## Generating {} of {} sublayer for {} dag layer"\
-												.format(ref.upper(),
-														self.name.upper(), 
-														self.layer.tag.upper())
-
-
-
-		if (self.head == self.tail
-			and ref == 'tail'):
-			self.refs[ref] = "_".join([self.name, ref])
-			sublayer_str = sublayer_str.format(self.refs[ref], 
-												self.refs['head'])
-
-		else:
-
-			#Generate the sublayer string with pretty formatting
-			self.refs[ref] = "_".join([self.name, ref])
-			sublayer_str = sublayer_str.format(self.refs[ref], 
-															pprint.pformat(sublayer_ref)\
-																.replace("'", "")\
-																.replace("\n", "\n" + "\t"*6))
-		
-		#To prevent list collision issues in Airflow
-		#Any sublayer that does not have more than one operator
-		#Will not be represented as a list								
-		if (len(self.op_families) == 1):
-			sublayer_str = sublayer_str.replace("[","")\
-										.replace("]", "")
-
-		#Add sublayer string to parent dag
-		self.layer.dag.layers += sublayer_str
+		self.refs[ref] = sys.intern("_".join([self.name, ref]))
+		self.layer.dag.graph.add_group(self.refs[ref], sublayer_ref, self.layer.tag)
 
 	def write_op_families(self):
 		for family in self.op_families:
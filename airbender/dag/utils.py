@@ -8,8 +8,10 @@
 #
 #####################################################################################
 
-import inspect
+import sys
 import types
+import inspect
+import hashlib
 
 #####################################################################################
 # External Library and Module Imports
@@ -29,3 +31,167 @@ def is_callable(obj):
 			   inspect.ismodule(obj),
 			   inspect.isclass(obj),
 			   isinstance(obj, types.BuiltinFunctionType)])
+
+
+def callable_name(obj):
+	'''
+	Fully qualified name of a callable, in the
+	form module:qualname.
+
+	Args:
+		obj:			Python callable
+
+	'''
+	return "{}:{}".format(getattr(obj, '__module__', None), 
+						  getattr(obj, '__qualname__', getattr(obj, '__name__', repr(obj))))
+
+
+def canonicalize(obj, strict = False):
+	'''
+	Converts a configuration slice into a canonical,
+	JSON serializable form. Dictionaries are sorted by key and 
+	callables are replaced by their qualified names, so equal
+	configurations always produce equal output. Arrays are
+	replaced by their dtype, shape, and a hash of their contents.
+
+	Args:
+		obj:			Configuration slice (params, dicts, lists, callables)
+
+	Kwargs:
+		strict:			Raise for objects with no canonical form, instead of using their repr
+
+	Raises:
+		TypeError:		If strict and obj holds an object with no canonical form
+
+	Returns:
+		canonical:		Canonical form of obj
+
+	'''
+	if is_callable(obj):
+		return {'__callable__': callable_name(obj)}
+
+	if isinstance(obj, dict):
+		items = [(canonicalize(k, strict), canonicalize(v, strict)) for k,v in obj.items()]
+		return [list(item) for item in sorted(items, key = lambda item: repr(item[0]))]
+
+	if isinstance(obj, (list, tuple)):
+		return [canonicalize(item, strict) for item in obj]
+
+	if isinstance(obj, (set, frozenset)):
+		return {'__set__': sorted([canonicalize(item, strict) for item in obj], key = repr)}
+
+	if obj is None or isinstance(obj, (bool, int, float, str)):
+		return obj
+
+	#Lazy DAG files import this module, and must not pay for importing numpy.
+	#Values cannot be numpy objects unless numpy has been imported already
+	np = sys.modules.get('numpy')
+
+	if np is not None and isinstance(obj, np.generic):
+		return canonicalize(obj.item(), strict)
+
+	#Array reprs are truncated, so equal reprs do not mean equal arrays
+	if np is not None and isinstance(obj, np.ndarray):
+		if obj.dtype.hasobject:
+			return {'__array__': [list(obj.shape), canonicalize(obj.tolist(), strict)]}
+
+		digest = hashlib.sha256(np.ascontiguousarray(obj).tobytes()).hexdigest()
+		return {'__array__': [obj.dtype.str, list(obj.shape), digest]}
+
+	#Other reprs may hold memory addresses, or leave out state
+	if strict:
+		raise TypeError("Cannot canonicalize object of type {}: {}".format(type(obj).__name__, 
+																		   repr(obj)[:100]))
+
+	return repr(obj)
+
+#####################################################################################
+# Immutable Params
+#####################################################################################
+
+class FrozenDict(dict):
+	'''
+	Dictionary that cannot be changed once built. Task params are frozen
+	so that operators, graph passes, and emitters can share them (and the
+	values nested within them) without copying. Changes are made on a
+	copy with set, which shares every value it does not change.
+
+	Frozen dicts are printed, serialized, and canonicalized as dicts.
+	'''
+
+	def __readonly(self, *args, **kwargs):
+		raise TypeError("Params are frozen and cannot be changed. Use set() to change a copy.")
+
+	__setitem__ = __delitem__ = __ior__ = __readonly
+	clear = pop = popitem = setdefault = update = __readonly
+
+	def __reduce__(self):
+		return (self.__class__, (dict(self),))
+
+	def __copy__(self):
+		return self
+
+	def __deepcopy__(self, memo):
+		return self
+
+	def set(self, key, value):
+		'''
+		Copy of the dict with one value changed.
+
+		Args:
+			key:				Key to change
+			value:				New value. Frozen if it is a dict or list
+
+		Returns:
+			frozen:				New FrozenDict sharing all other values
+
+		'''
+		changed = dict(self)
+		changed[key] = freeze(value)
+		return self.__class__(changed)
+
+
+class FrozenList(list):
+	'''
+	List that cannot be changed once built. Nested within frozen params.
+	'''
+
+	def __readonly(self, *args, **kwargs):
+		raise TypeError("Params are frozen and cannot be changed.")
+
+	__setitem__ = __delitem__ = __iadd__ = __imul__ = __readonly
+	append = extend = insert = pop = remove = reverse = sort = clear = __readonly
+
+	def __reduce__(self):
+		return (self.__class__, (list(self),))
+
+	def __copy__(self):
+		return self
+
+	def __deepcopy__(self, memo):
+		return self
+
+
+def freeze(obj):
+	'''
+	Frozen form of params. Dicts and lists are frozen recursively;
+	values that are already frozen are shared, not copied. Other
+	values (callables, numbers, strings) are kept as they are.
+
+	Args:
+		obj:			Params, or a value within them
+
+	Returns:
+		frozen:			FrozenDict, FrozenList, or obj unchanged
+
+	'''
+	if isinstance(obj, (FrozenDict, FrozenList)):
+		return obj
+
+	if type(obj) is dict:
+		return FrozenDict((k, freeze(v)) for k,v in obj.items())
+
+	if type(obj) is list:
+		return FrozenList(freeze(item) for item in obj)
+
+	return obj
@@ -0,0 +1,216 @@
+#####################################################################################
+#
+#
+# 	Airbender evaluation functionality
+#
+#
+#####################################################################################
+
+
+#####################################################################################
+# External Library and Module Imports
+#####################################################################################
+
+from collections import OrderedDict
+
+import numpy as np
+from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
+
+#####################################################################################
+# Model Evaluation: Every Metric of Many Models from Shared Intermediates
+#####################################################################################
+
+def evaluate_models(y_true, y_preds, model_ids, metrics):
+    """
+    Evaluates every metric of many models at once. Predictions are
+    stacked into one 2-D array, the confusion matrices of all models
+    are built in one pass, and each metric with a summary version is
+    derived for all models together. Other metrics, metrics whose params
+    the summary version does not support, and models whose score is
+    undefined (zero division) are computed by the metric itself.
+
+    Args:
+        y_true:                 True labels
+        y_preds:                Predicted labels of each model, in model_ids order
+        model_ids:              Model ids
+        metrics:                List of dicts with the func and params of each metric, and
+                                task_ids: dict of model id -> task id of the metric for that model.
+                                Models without a task id are not evaluated for the metric
+
+    Returns:
+        results:                Dict of model id -> dict of metric task_id -> metric value
+    """
+
+    y_preds = [np.asarray(y_pred) for y_pred in y_preds]
+
+    #Predictions of different types would be coerced to one type when stacked
+    summary = None
+    if len(set(y_pred.dtype for y_pred in y_preds)) == 1 and \
+       len(set(y_pred.shape for y_pred in y_preds)) == 1:
+        summary = confusion_summary(y_true, np.stack(y_preds))
+
+    results = OrderedDict((model_id, OrderedDict()) for model_id in model_ids)
+    for metric in metrics:
+        values = None
+        summary_func = SUMMARY_METRICS.get(metric['func'])
+        if summary is not None and summary_func is not None:
+            values = summary_func(summary, **metric['params'])
+
+        for index, model_id in enumerate(model_ids):
+            if model_id not in metric['task_ids']:
+                continue
+
+            value = None if values is None else values[index]
+            if value is None or np.any(np.isnan(value)):
+                value = metric['func'](y_true, y_preds[index], **metric['params'])
+            elif np.ndim(value) == 0:
+                value = float(value)
+
+            results[model_id][metric['task_ids'][model_id]] = value
+
+    return results
+
+def evaluate_model(y_true, y_pred, metrics):
+    """
+    Evaluates every metric of one model. See evaluate_models.
+
+    Args:
+        y_true:                 True labels
+        y_pred:                 Predicted labels
+        metrics:                List of dicts with the task_id, func, and params of each metric
+
+    Returns:
+        results:                Dict of metric task_id -> metric value
+    """
+
+    return evaluate_models(y_true, [y_pred], [None],
+                           [{'func': metric['func'],
+                             'params': metric['params'],
+                             'task_ids': {None: metric['task_id']}} for metric in metrics])[None]
+
+def confusion_summary(y_true, y_pred):
+    """
+    Confusion matrix of predictions, with the per-label counts every
+    summary metric is derived from. Predictions of many models can be
+    given as a 2-D array, one row per model. Every count then has a
+    leading model axis, and all matrices are built in one pass.
+
+    Args:
+        y_true:                 True labels
+        y_pred:                 Predicted labels, or 2-D array of predicted labels of many models
+
+    Returns:
+        summary:                Dict of labels, confusion matrix, and per-label true positives,
+                                true counts and predicted counts. None if labels cannot be sorted
+                                together (mixed types), or there are no samples.
+    """
+
+    y_true = np.asarray(y_true)
+    y_pred = np.asarray(y_pred)
+    preds = np.atleast_2d(y_pred)
+    if y_true.ndim != 1 or preds.ndim != 2 or preds.shape[1] != len(y_true) or len(y_true) == 0:
+        return None
+
+    #Numbers and strings would be coerced to one type when compared
+    kinds = set([y_true.dtype.kind, preds.dtype.kind])
+    if not (kinds <= set('biuf') or kinds <= set('OUS')):
+        return None
+
+    #Labels are encoded against the true labels, and only widened by
+    #predicted labels that never occur in y_true
+    try:
+        labels = np.unique(y_true)
+        encoded = np.searchsorted(labels, preds)
+        unseen = labels[np.minimum(encoded, len(labels) - 1)] != preds
+        if unseen.any():
+            labels = np.union1d(labels, preds[unseen])
+            encoded = np.searchsorted(labels, preds)
+        encoded_true = np.searchsorted(labels, y_true)
+    except TypeError:
+        return None
+
+    #One bincount over every model: model, true label, predicted label
+    count = len(labels)
+    models = len(preds)
+    encoded += encoded_true * count
+    encoded += (np.arange(models) * count * count)[:, None]
+    matrix = np.bincount(encoded.ravel(), minlength = models * count * count).reshape(models, count, count)
+
+    if y_pred.ndim == 1:
+        matrix = matrix[0]
+
+    return {'labels': labels,
+            'matrix': matrix,
+            'true_positives': np.diagonal(matrix, axis1 = -2, axis2 = -1),
+            'true_counts': matrix.sum(axis = -1),
+            'predicted_counts': matrix.sum(axis = -2)}
+
+#####################################################################################
+# Summary Metrics: Derived from a Confusion Summary, for One or Many Models
+#####################################################################################
+
+def accuracy_from_summary(summary, normalize = True, sample_weight = None):
+    """
+    Summary version of accuracy_score.
+    """
+    if not normalize or sample_weight is not None:
+        return None
+
+    return summary['true_positives'].sum(axis = -1) / summary['matrix'].sum(axis = (-2, -1))
+
+def precision_from_summary(summary, **params):
+    """
+    Summary version of precision_score.
+    """
+    return _label_score(summary, summary['true_positives'], summary['predicted_counts'], **params)
+
+def recall_from_summary(summary, **params):
+    """
+    Summary version of recall_score.
+    """
+    return _label_score(summary, summary['true_positives'], summary['true_counts'], **params)
+
+def f1_from_summary(summary, **params):
+    """
+    Summary version of f1_score: 2 TP / (2 TP + FP + FN) per label.
+    """
+    return _label_score(summary, 2 * summary['true_positives'],
+                        summary['true_counts'] + summary['predicted_counts'], **params)
+
+def _label_score(summary, numerator, denominator, average = 'binary', pos_label = 1,
+                 labels = None, sample_weight = None, zero_division = 'warn'):
+
+    #Weighted samples and label subsets are left to the metric itself.
+    #Undefined (zero division) scores are NaN, and left to the metric too
+    if labels is not None or sample_weight is not None:
+        return None
+
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        scores = numerator / denominator
+
+        if average == 'binary':
+            positive = np.flatnonzero(summary['labels'] == pos_label)
+            if len(summary['labels']) != 2 or len(positive) != 1:
+                return None
+            return scores[..., positive[0]]
+
+        elif average == 'micro':
+            return numerator.sum(axis = -1) / denominator.sum(axis = -1)
+
+        elif average == 'macro':
+            return scores.mean(axis = -1)
+
+        elif average == 'weighted':
+            weights = summary['true_counts']
+            return (scores * weights).sum(axis = -1) / weights.sum(axis = -1)
+
+        elif average is None:
+            return scores
+
+    return None
+
+#Metrics with a summary version derived from the confusion summary
+SUMMARY_METRICS = {accuracy_score: accuracy_from_summary,
+                   precision_score: precision_from_summary,
+                   recall_score: recall_from_summary,
+                   f1_score: f1_from_summary}
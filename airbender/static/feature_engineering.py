@@ -13,6 +13,7 @@
 # External Library and Module Imports
 #####################################################################################
 
+import numpy as np
 import pandas as pd
 from sklearn.preprocessing import LabelEncoder
 
@@ -78,9 +79,9 @@ def winsorize(data, limits = [0.05, 0.05], prefit = None):
         lower = feature.quantile(limits[0])
         upper = feature.quantile(1 - limits[1])
 
-    #Winsorize
-    feature[feature > upper] = upper
-    feature[feature < lower] = lower
+    #Winsorize without writing into the input, which may
+    #be a read-only view of a memory-mapped artifact
+    feature = feature.clip(lower = lower, upper = upper)
 
     if prefit:
         return feature
@@ -125,4 +126,60 @@ def create_ordinal_df(data, ordinal_dict):
 
     ordinal_df.name = ordinal_df.name
     
-    return ordinal_df
\ No newline at end of file
+    return ordinal_df
+
+#####################################################################################
+# Block Functions: Transform Many Columns in One NumPy Pass
+#####################################################################################
+
+def normalize_values_block(data, prefit = None):
+    """
+    Block version of normalize_values. Normalizes every column of a
+    DataFrame at once. Artifacts hold one mean and std per column.
+    """
+
+    values = data.to_numpy(dtype = float)
+
+    if prefit:
+        mean = prefit['mean']
+        std = prefit['std']
+    else:
+        mean = np.nanmean(values, axis = 0)
+        std = np.nanstd(values, axis = 0, ddof = 1)
+
+    if np.any(std == 0):
+        raise ValueError("ERROR: Columns {} are all the same value and provide no insight.\
+        Please re-create dag without these columns included.".format(list(data.columns[std == 0])))
+
+    data = pd.DataFrame((values - mean) / std, columns = data.columns, index = data.index)
+
+    if prefit:
+        return data
+    else:
+        return data, {'mean': mean, 'std': std, 'columns': list(data.columns)}
+
+def winsorize_block(data, limits = [0.05, 0.05], prefit = None):
+    """
+    Block version of winsorize. Clips every column of a DataFrame
+    at once. Artifacts hold one lower and upper bound per column.
+    """
+
+    values = data.to_numpy(dtype = float)
+
+    if prefit:
+        lower = prefit['lower']
+        upper = prefit['upper']
+    else:
+        lower = np.nanquantile(values, limits[0], axis = 0)
+        upper = np.nanquantile(values, 1 - limits[1], axis = 0)
+
+    data = pd.DataFrame(np.clip(values, lower, upper), columns = data.columns, index = data.index)
+
+    if prefit:
+        return data
+
+    return data, {'upper': upper, 'lower': lower, 'columns': list(data.columns)}
+
+#Column functions with a block version that transforms many columns at once
+BLOCK_FUNCTIONS = {normalize_values: normalize_values_block,
+                   winsorize: winsorize_block}
@@ -13,34 +13,56 @@
 # External Library and Module Imports
 #####################################################################################
 
+import numpy as np
 from sklearn.model_selection import train_test_split as sk_train_test_split
 from sklearn.model_selection import KFold
 
+#Preserve order of folds
+from collections import OrderedDict
+
 #####################################################################################
 # Class and Constructor
 #####################################################################################
 
 def train_test_split(data, target, test_ratio, random_state = 42):
+	'''
+	Train / test split of data. Splits are integer row positions into
+	data, not copies of it: both splits are views over one shared base
+	frame. Rows are the ones sklearn's train_test_split would select.
+
+	Returns:
+		train:				Row positions of the train split
+		test:				Row positions of the test split
+		target:				Target column
 
+	'''
 
-	train, test = sk_train_test_split(data, 
-										test_size = test_ratio, 
-										random_state = random_state)
+	train, test = sk_train_test_split(np.arange(len(data)), 
+									  test_size = test_ratio, 
+									  random_state = random_state)
 
 	return train, test, target
 
 
 def k_fold(data, target, k, random_state = 42, shuffle = True):
+	'''
+	K-fold split of data. Folds are integer row positions into data,
+	not copies of it: every fold is a view over one shared base frame.
+
+	Returns:
+		folds:				OrderedDict of 'fold0', 'fold1', ... -> {'train': positions, 'test': positions}
+		target:				Target column
 
-	kf = KFold(n_splits = k, random_state = random_state, shuffle = shuffle)
-	folds = {}
+	'''
 
-	i = 0
-	for train_index, test_index in kf.split(data):
-		folds['fold' + str(i)] = {}
+	kf = KFold(n_splits = k, random_state = random_state if shuffle else None, shuffle = shuffle)
+	folds = OrderedDict()
 
-		folds['fold' + str(i)]['train'] = data.loc[train_index,]
-		folds['fold' + str(i)]['X_test'] = data.loc[test_index,]
+	for i, (train_index, test_index) in enumerate(kf.split(data)):
+		folds['fold' + str(i)] = {'train': train_index,
+								  'test': test_index}
 
+	return folds, target
 
-	return folds
\ No newline at end of file
+#Splitting functions that return folds. Tasks downstream of them are fanned out per fold
+FOLD_FUNCTIONS = [k_fold]
@@ -0,0 +1,172 @@
+#####################################################################################
+#
+#
+# 	Benchmark: Evaluating Many Models
+#
+#
+#####################################################################################
+
+'''
+Times the three ways an evaluation layer can run, on the same
+predictions:
+
+	per-task:		one evaluation_operation task per (model, metric) pair
+	per-model:		one model_evaluation_operation task per model (group_metrics)
+	stacked:		one stacked_evaluation_operation task for every model (stack_models)
+
+Every path ends with one merge_metrics_operation task per model, and
+their results are checked to be identical.
+
+Usage:
+	python benchmarks/bench_evaluation.py [--rows 1000000] [--models 50]
+										  [--classes 3] [--repeat 3]
+'''
+
+#####################################################################################
+# External Library and Module Imports
+#####################################################################################
+
+# System and OS
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+#Data packages
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
+
+#Airbender
+sys.path.append(os.path.abspath(os.path.join(__file__, "../../")))
+from airbender.airflow import artifacts
+from airbender.airflow.artifacts import LocalArtifactStore, store_data
+from airbender.airflow.xcom import LocalXComBackend, LocalTaskInstance
+from airbender.airflow.op_converter import (evaluation_operation,
+											model_evaluation_operation,
+											stacked_evaluation_operation,
+											merge_metrics_operation)
+
+#Metrics of the evaluation layer
+METRICS = [('acc', accuracy_score, {}),
+		   ('precision', precision_score, {'average': 'weighted'}),
+		   ('recall', recall_score, {'average': 'weighted'}),
+		   ('f1', f1_score, {'average': 'macro'})]
+
+#####################################################################################
+# Benchmark Helpers
+#####################################################################################
+
+def build_xcom(rows, models, classes):
+	'''
+	Populate XCom with y_test and the predictions of every model.
+	Each model predicts the true label, with a model-specific error rate.
+	'''
+	rng = np.random.default_rng(42)
+	xcom = LocalXComBackend()
+
+	y_test = rng.integers(0, classes, rows)
+	xcom.push('model_data_split', 'y_test', store_data(pd.Series(y_test, name = 'label')))
+
+	model_ids = []
+	for i in range(models):
+		model_id = 'M{}_predict'.format(i)
+		errors = rng.random(rows) < 0.05 + 0.4 * i / max(models, 1)
+		xcom.push(model_id, 'return_value', np.where(errors, rng.integers(0, classes, rows), y_test))
+		model_ids.append(model_id)
+
+	return xcom, model_ids
+
+
+def run_tasks(xcom, tasks):
+	'''
+	Run (task_id, operation, params) tasks in order, pushing
+	return values as the executor would.
+	'''
+	for task_id, operation, params in tasks:
+		xcom.push(task_id, 'return_value', operation(params, None, ti = LocalTaskInstance(task_id, xcom)))
+
+
+def evaluation_paths(model_ids):
+	'''
+	Tasks of each evaluation path, and their merge tasks.
+	'''
+	task_ids = {model_id: ['{}_{}'.format(model_id, name) for name, _, _ in METRICS] for model_id in model_ids}
+
+	per_task = [(task_ids[model_id][i], evaluation_operation, {'func': func, 'params': params, 'model_id': model_id})
+					for model_id in model_ids for i, (_, func, params) in enumerate(METRICS)]
+
+	per_model = [('{}_evaluation'.format(model_id), model_evaluation_operation,
+				  {'model_id': model_id,
+				   'metrics': [{'task_id': task_ids[model_id][i], 'func': func, 'params': params}
+									for i, (_, func, params) in enumerate(METRICS)]})
+					for model_id in model_ids]
+
+	stacked = [('evaluation', stacked_evaluation_operation,
+				{'model_ids': model_ids,
+				 'metrics': [{'func': func, 'params': params,
+							  'task_ids': {model_id: task_ids[model_id][i] for model_id in model_ids}}
+								for i, (_, func, params) in enumerate(METRICS)]})]
+
+	def merges(merge_ids, grouped = True):
+		return [('{}_merge_metrics'.format(model_id), merge_metrics_operation,
+				 {'merge_ids': merge_ids(model_id), 'model': model_id, 'params': {},
+				  'evaluations': merge_ids(model_id) if grouped else []})
+					for model_id in model_ids]
+
+	return [('per-task', per_task, merges(lambda model_id: task_ids[model_id], grouped = False)),
+			('per-model', per_model, merges(lambda model_id: ['{}_evaluation'.format(model_id)])),
+			('stacked', stacked, merges(lambda model_id: ['evaluation']))]
+
+
+def time_path(xcom, tasks, merges, model_ids, repeat):
+	'''
+	Best wall time of repeated evaluations and merges, in seconds.
+	Also returns the task count and the merged metrics of every model.
+	'''
+	best = float('inf')
+	for _ in range(repeat):
+		start = time.perf_counter()
+		run_tasks(xcom, tasks)
+		run_tasks(xcom, merges)
+		best = min(best, time.perf_counter() - start)
+
+	metrics = {model_id: xcom.pull('{}_merge_metrics'.format(model_id)) for model_id in model_ids}
+
+	return best, len(tasks) + len(merges), metrics
+
+#####################################################################################
+# Main Execution
+#####################################################################################
+
+if __name__ == '__main__':
+
+	parser = argparse.ArgumentParser(description = "Benchmark evaluation of many models")
+	parser.add_argument('--rows', type = int, default = 1000000)
+	parser.add_argument('--models', type = int, default = 50)
+	parser.add_argument('--classes', type = int, default = 3)
+	parser.add_argument('--repeat', type = int, default = 3)
+	args = parser.parse_args()
+
+	with tempfile.TemporaryDirectory() as root:
+
+		artifacts.set_artifact_store(LocalArtifactStore(root))
+		xcom, model_ids = build_xcom(args.rows, args.models, args.classes)
+
+		print("Evaluating {} metrics of {} models over {} test rows ({} classes)\n"\
+			.format(len(METRICS), args.models, args.rows, args.classes))
+
+		print("{:<12}{:>10}{:>12}{:>10}".format('', 'tasks', 'time (s)', 'speedup'))
+		baseline = None
+		for name, tasks, merges in evaluation_paths(model_ids):
+			seconds, count, metrics = time_path(xcom, tasks, merges, model_ids, args.repeat)
+			if baseline is None:
+				baseline = (seconds, metrics)
+
+			for model_id in model_ids:
+				for task_id, value in baseline[1][model_id][model_id].items():
+					if not np.isclose(metrics[model_id][model_id][task_id], value):
+						raise AssertionError("{} differs from per-task for {}".format(name, task_id))
+
+			print("{:<12}{:>10}{:>12.3f}{:>9.1f}x".format(name, count, seconds, baseline[0] / seconds))
@@ -0,0 +1,247 @@
+#####################################################################################
+#
+#
+# 	Benchmark: DagGenerator Scalability
+#
+#
+#####################################################################################
+
+'''
+Times DagGenerator.generate_file end to end, and per generation phase, on
+synthetic experiments of growing size. One dimension of the experiment
+grows (feature engineering columns, models, metrics, or preprocessing
+families) while the others stay fixed. For each size, the benchmark
+records task count, wall time, time per task, the scaling exponent from
+the previous size (1.0 is linear), peak traced memory, and the size of
+the generated file.
+
+Results can be written as JSON, and checked against an earlier JSON
+result to guard against regressions.
+
+Usage:
+	python benchmarks/bench_generator.py [--scale columns] [--sizes 10,100,1000]
+										 [--repeats 3] [--json results.json]
+										 [--baseline results.json] [--tolerance 1.5]
+'''
+
+#####################################################################################
+# External Library and Module Imports
+#####################################################################################
+
+# System and OS
+import io
+import os
+import sys
+import json
+import math
+import argparse
+import tempfile
+import contextlib
+import tracemalloc
+
+#Benchmark helpers
+from common import write_dataset, experiment_config, time_call
+
+#Airbender
+from airbender.dag.generator import DagGenerator
+
+#Dimensions an experiment can grow along
+SCALES = ['columns', 'models', 'metrics', 'preprocessing']
+
+#####################################################################################
+# Synthetic Experiments
+#####################################################################################
+
+def synthetic_models(count):
+	'''
+	Model configurations, alternating model types.
+
+	Args:
+		count:						Number of models
+
+	'''
+	from sklearn.linear_model import LogisticRegression
+	from sklearn.tree import DecisionTreeClassifier
+
+	return {'M{}'.format(i): ({LogisticRegression: {'C': 1.0 + i}} if i % 2 == 0
+								else {DecisionTreeClassifier: {'max_depth': 1 + i}})
+				for i in range(count)}
+
+
+def synthetic_metrics(count):
+	'''
+	Metric configurations, cycling through classification metrics.
+
+	Args:
+		count:						Number of metrics
+
+	'''
+	from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+
+	metrics = [(accuracy_score, None),
+			   (f1_score, {'average': 'weighted'}),
+			   (precision_score, {'average': 'weighted'}),
+			   (recall_score, {'average': 'weighted'})]
+
+	return {'k{}'.format(i): {metrics[i % len(metrics)][0]: metrics[i % len(metrics)][1]}
+				for i in range(count)}
+
+
+def sized_config(dataset, scale, size, base):
+	'''
+	Experiment config with one dimension set to size.
+
+	Args:
+		dataset:					Path of the synthetic dataset
+		scale:						Dimension that grows
+		size:						Size of that dimension
+		base:						Dict of the fixed size of every dimension
+
+	'''
+	sizes = dict(base, **{scale: size})
+
+	return experiment_config(dataset,
+							 columns = sizes['columns'],
+							 models = synthetic_models(sizes['models']),
+							 metrics = synthetic_metrics(sizes['metrics']),
+							 preprocessing = sizes['preprocessing'],
+							 name = "Bench_{}_{}".format(scale, size))
+
+#####################################################################################
+# Benchmark
+#####################################################################################
+
+def measure(dataset, scale, size, base, dags_folder, repeats):
+	'''
+	Measures generation of one experiment size.
+
+	Returns:
+		result:						Dict of measurements
+
+	'''
+
+	def generate(generation = None):
+		config = sized_config(dataset, scale, size, base)
+		config['generation'] = generation or {}
+		dg = DagGenerator(config)
+		with contextlib.redirect_stdout(io.StringIO()):
+			filepath = dg.generate_file(dags_folder = dags_folder, force = True)
+		return dg, filepath
+
+	#Untraced runs for wall time, after a warm-up run
+	generate()
+	timing = time_call(generate, repeats = repeats)
+
+	#One traced, profiled run for phases and peak memory
+	tracemalloc.start()
+	try:
+		dg, filepath = generate({'profile': True})
+		peak_bytes = tracemalloc.get_traced_memory()[1]
+	finally:
+		tracemalloc.stop()
+
+	return {'scale': scale,
+			'size': size,
+			'tasks': dg.profile.graph['tasks'],
+			'edges': dg.profile.graph['edges'],
+			'seconds': timing['median'],
+			'min_seconds': timing['min'],
+			'peak_bytes': peak_bytes,
+			'file_bytes': os.path.getsize(filepath),
+			'phases': {phase: record['seconds'] for phase, record in dg.profile.phases.items()}}
+
+
+def report(results):
+
+	print("\n{:>8}{:>8}{:>12}{:>14}{:>10}{:>12}{:>12}".format(
+		"size", "tasks", "median (s)", "ms / task", "exponent", "peak (MB)", "file (KB)"))
+
+	previous = None
+	for result in results:
+		exponent = ''
+		if previous is not None and result['tasks'] > previous['tasks']:
+			exponent = "{:.2f}".format(math.log(result['seconds'] / previous['seconds']) /
+									   math.log(result['tasks'] / float(previous['tasks'])))
+
+		print("{:>8}{:>8}{:>12.3f}{:>14.3f}{:>10}{:>12.1f}{:>12.1f}".format(
+			result['size'], result['tasks'], result['seconds'],
+			1000 * result['seconds'] / result['tasks'], exponent,
+			result['peak_bytes'] / 2.0**20, result['file_bytes'] / 1024.0))
+		previous = result
+
+	#Share of time spent in each phase (traced run)
+	phases = list(results[0]['phases'])
+	print("\n{:>8}".format("size") + "".join("{:>12}".format(phase[:11]) for phase in phases))
+	for result in results:
+		total = sum(result['phases'].values()) or 1.0
+		print("{:>8}".format(result['size']) +
+			  "".join("{:>11.0%} ".format(result['phases'][phase] / total) for phase in phases))
+
+
+def check_regressions(results, baseline_path, tolerance):
+	'''
+	Compares results to an earlier run of the benchmark.
+
+	Returns:
+		regressions:				List of messages, one per regressed size
+
+	'''
+
+	with open(baseline_path) as baseline_file:
+		baseline = {(result['scale'], result['size']): result for result in json.load(baseline_file)['results']}
+
+	regressions = []
+	for result in results:
+		previous = baseline.get((result['scale'], result['size']))
+		if previous is not None and result['seconds'] > tolerance * previous['seconds']:
+			regressions.append("{} = {}: {:.3f}s, baseline {:.3f}s".format(result['scale'], result['size'],
+																		   result['seconds'], previous['seconds']))
+
+	return regressions
+
+
+def main():
+
+	parser = argparse.ArgumentParser(description = "Scalability of DAG generation")
+	parser.add_argument("--scale", choices = SCALES, default = 'columns')
+	parser.add_argument("--sizes", default = "10,100,1000")
+	parser.add_argument("--columns", type = int, default = 10)
+	parser.add_argument("--models", type = int, default = 2)
+	parser.add_argument("--metrics", type = int, default = 2)
+	parser.add_argument("--preprocessing", type = int, default = 1)
+	parser.add_argument("--repeats", type = int, default = 3)
+	parser.add_argument("--json", default = None, help = "Write results to this file")
+	parser.add_argument("--baseline", default = None, help = "Earlier results to check against")
+	parser.add_argument("--tolerance", type = float, default = 1.5)
+	args = parser.parse_args()
+
+	sizes = [int(size) for size in args.sizes.split(",")]
+	base = {scale: getattr(args, scale) for scale in SCALES}
+
+	with tempfile.TemporaryDirectory() as root:
+		dataset = write_dataset(root, rows = 100,
+								columns = max(sizes) if args.scale == 'columns' else args.columns)
+
+		results = []
+		for size in sizes:
+			results.append(measure(dataset, args.scale, size, base, root, args.repeats))
+			print("Generated {} = {} ({} tasks) in {:.3f}s".format(args.scale, size,
+																   results[-1]['tasks'], results[-1]['seconds']))
+
+	report(results)
+
+	if args.json:
+		with open(args.json, 'w') as json_file:
+			json.dump({'base': base, 'results': results}, json_file, indent = 4)
+
+	if args.baseline:
+		regressions = check_regressions(results, args.baseline, args.tolerance)
+		if regressions:
+			print("\nRegressions (more than {}x slower than baseline):\n - {}".format(args.tolerance,
+																				   "\n - ".join(regressions)))
+			sys.exit(1)
+		print("\nNo regressions against {}".format(args.baseline))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,182 @@
+#####################################################################################
+#
+#
+# 	Benchmark: DagGenerator Memory
+#
+#
+#####################################################################################
+
+'''
+Measures the memory DAG generation needs. Three measurements are made:
+
+	1. The size of one instance of each IR node type (DagOperator, OpFamily,
+	   DagSubLayer, TaskNode), including its attribute dict if it has one
+	2. The peak memory of generating one large experiment, per task
+	3. The memory kept after generating many experiments in one process,
+	   the way a long-lived service or batch job would. This should stay
+	   flat: generators must not leave state behind
+
+Usage:
+	python benchmarks/bench_memory.py [--columns 1000] [--experiments 1000]
+									  [--max-growth-kb 256]
+'''
+
+#####################################################################################
+# External Library and Module Imports
+#####################################################################################
+
+# System and OS
+import io
+import gc
+import sys
+import argparse
+import tempfile
+import contextlib
+import tracemalloc
+
+#Benchmark helpers
+from common import write_dataset, experiment_config
+
+#Airbender
+from airbender.dag.generator import DagGenerator
+from airbender.dag.operators import DagOperator
+from airbender.dag.op_families import OpFamily
+from airbender.dag.sublayers import DagSubLayer
+from airbender.dag.graph import TaskNode
+
+#####################################################################################
+# Benchmark
+#####################################################################################
+
+def instance_bytes(obj):
+	'''
+	Size of an object and of its attribute dict, if it has one.
+	Attribute values are shared with the rest of the graph
+	and are not counted.
+
+	Args:
+		obj:						Object to measure
+
+	'''
+	return sys.getsizeof(obj) + (sys.getsizeof(obj.__dict__) if hasattr(obj, '__dict__') else 0)
+
+
+def generate(config, dags_folder):
+	'''
+	Generates one experiment, silently.
+
+	Returns:
+		generator:					DagGenerator of the experiment
+
+	'''
+	dg = DagGenerator(config)
+	with contextlib.redirect_stdout(io.StringIO()):
+		dg.generate_file(dags_folder = dags_folder, force = True)
+	return dg
+
+
+def node_sizes(dataset, dags_folder):
+	'''
+	Size of one instance of each IR node type, from a generated experiment.
+
+	Returns:
+		sizes:						Dict of node type -> bytes per instance
+
+	'''
+	dg = generate(experiment_config(dataset, columns = 4, name = "Memory_Nodes"), dags_folder)
+
+	sublayer = next(sublayer for layer in dg.layerbag for sublayer in layer.sublayers.values()
+						if isinstance(sublayer, DagSubLayer) and sublayer.op_families)
+	family = sublayer.op_families[0]
+
+	return {DagOperator.__name__: instance_bytes(family.members[0]),
+			OpFamily.__name__: instance_bytes(family),
+			DagSubLayer.__name__: instance_bytes(sublayer),
+			TaskNode.__name__: instance_bytes(next(iter(dg.graph.tasks.values())))}
+
+
+def large_experiment(dataset, columns, dags_folder):
+	'''
+	Peak memory of generating one large experiment.
+
+	Returns:
+		result:						Dict with the task count and peak traced memory
+
+	'''
+	config = experiment_config(dataset, columns = columns, name = "Memory_Large")
+
+	gc.collect()
+	tracemalloc.start()
+	try:
+		dg = generate(config, dags_folder)
+		peak_bytes = tracemalloc.get_traced_memory()[1]
+	finally:
+		tracemalloc.stop()
+
+	return {'tasks': len(dg.graph.tasks), 'peak_bytes': peak_bytes}
+
+
+def long_lived(dataset, experiments, dags_folder):
+	'''
+	Memory kept after each generation, over many generations in one
+	process. The first tenth of the generations warm up caches and
+	imports; growth is measured from there.
+
+	Returns:
+		retained:					List of (generations, traced bytes kept after them)
+
+	'''
+	warm_up = max(experiments // 10, 1)
+	checkpoints = sorted(set([warm_up] + [warm_up + (experiments - warm_up) * step // 4 for step in range(1, 5)]))
+
+	retained = []
+	tracemalloc.start()
+	try:
+		for count in range(1, experiments + 1):
+			generate(experiment_config(dataset, columns = 10, name = "Memory_{}".format(count)), dags_folder)
+			if count in checkpoints:
+				gc.collect()
+				retained.append((count, tracemalloc.get_traced_memory()[0]))
+	finally:
+		tracemalloc.stop()
+
+	return retained
+
+
+def main():
+
+	parser = argparse.ArgumentParser(description = "Memory of DAG generation")
+	parser.add_argument("--columns", type = int, default = 1000, help = "Columns of the large experiment")
+	parser.add_argument("--experiments", type = int, default = 1000, help = "Generations in one process")
+	parser.add_argument("--max-growth-kb", type = float, default = 256,
+						help = "Fail if memory kept after warm-up grows by more than this")
+	args = parser.parse_args()
+
+	with tempfile.TemporaryDirectory() as root:
+		dataset = write_dataset(root, rows = 100, columns = max(args.columns, 10))
+
+		print("\n{:<14}{:>16}".format("node", "bytes / node"))
+		for node, size in node_sizes(dataset, root).items():
+			print("{:<14}{:>16}".format(node, size))
+
+		large = large_experiment(dataset, args.columns, root)
+		print("\nLarge experiment: {} tasks, peak {:.1f} MB, {:.2f} KB / task".format(
+			large['tasks'], large['peak_bytes'] / 2.0**20, large['peak_bytes'] / 1024.0 / large['tasks']))
+
+		retained = long_lived(dataset, args.experiments, root)
+
+	print("\n{:>12}{:>16}".format("generations", "kept (KB)"))
+	for count, current in retained:
+		print("{:>12}{:>16.1f}".format(count, current / 1024.0))
+
+	growth = (retained[-1][1] - retained[0][1]) / 1024.0
+	per_experiment = 1024.0 * growth / max(retained[-1][0] - retained[0][0], 1)
+	print("\nGrowth after warm-up: {:.1f} KB ({:.1f} bytes per generation)".format(growth, per_experiment))
+
+	if growth > args.max_growth_kb:
+		print("Memory grew by more than {} KB".format(args.max_growth_kb))
+		sys.exit(1)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,135 @@
+#####################################################################################
+#
+#
+# 	Benchmark: Merging Engineered Columns in merge_data_operation
+#
+#
+#####################################################################################
+
+
+#####################################################################################
+# External Library and Module Imports
+#####################################################################################
+
+# System and OS
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+#Data packages
+import numpy as np
+import pandas as pd
+
+#Airbender
+sys.path.append(os.path.abspath(os.path.join(__file__, "../../")))
+from airbender.airflow import artifacts
+from airbender.airflow.artifacts import LocalArtifactStore, store_data, load_data
+from airbender.airflow.xcom import LocalXComBackend, LocalTaskInstance
+from airbender.airflow.op_converter import merge_data_operation
+
+#####################################################################################
+# Benchmark Helpers
+#####################################################################################
+
+def legacy_merge(params, dag, **kwargs):
+	'''
+	Previous merge implementation, kept for comparison. Concatenates
+	and assigns columns one at a time into a growing frame.
+	'''
+	ti = kwargs['ti']
+	data = load_data(ti.xcom_pull(key = params['split']))
+
+	persist_cols = []
+
+	for task_id in params['merge_ids']:
+		task_data = load_data(ti.xcom_pull(task_ids = task_id, key = 'return_value'))
+
+		if isinstance(task_data, pd.DataFrame):
+			persist_cols += list(task_data.columns)
+			data = pd.concat([data, task_data], axis = 1)
+		elif isinstance(task_data, pd.Series):
+			persist_cols.append(task_data.name)
+			data[task_data.name] = task_data.values
+
+	data = data.loc[:,persist_cols + params['pass_through_cols']]
+
+	ti.xcom_push(key = params['split'], value = store_data(data))
+
+
+def build_xcom(rows, cols, pass_through):
+	'''
+	Populate XCom with a split and one engineered column per task.
+	'''
+	rng = np.random.default_rng(42)
+	xcom = LocalXComBackend()
+
+	split = pd.DataFrame(rng.standard_normal((rows, cols + pass_through)),
+						 columns = ['col_{}'.format(i) for i in range(cols + pass_through)])
+	xcom.push('split', 'train', store_data(split))
+
+	merge_ids = []
+	for i in range(cols):
+		task_id = 'col_{}_train_normalize_values'.format(i)
+		column = (split['col_{}'.format(i)] - 0.5).rename('col_{}'.format(i))
+		xcom.push(task_id, 'return_value', store_data(column))
+		merge_ids.append(task_id)
+
+	params = {'merge_ids': merge_ids,
+			  'pass_through_cols': ['col_{}'.format(i) for i in range(cols, cols + pass_through)],
+			  'split': 'train',
+			  'params': {}}
+
+	return xcom, params
+
+
+def time_merge(merge, xcom, params, repeat):
+	'''
+	Best wall time of repeated merges, and of converting the merged
+	frame to a 2-D array as a downstream model fit would, in seconds.
+	Also returns the XCom queries issued by one merge.
+	'''
+	best_merge = float('inf')
+	best_consume = float('inf')
+	for _ in range(repeat):
+		xcom.reset_query_count()
+		start = time.perf_counter()
+		merge(params, None, ti = LocalTaskInstance('merge', xcom))
+		best_merge = min(best_merge, time.perf_counter() - start)
+		queries = xcom.query_count
+
+		merged = load_data(xcom.pull(key = params['split']))
+		start = time.perf_counter()
+		merged.to_numpy()
+		best_consume = min(best_consume, time.perf_counter() - start)
+
+	return best_merge, best_consume, queries
+
+#####################################################################################
+# Main Execution
+#####################################################################################
+
+if __name__ == '__main__':
+
+	parser = argparse.ArgumentParser(description = "Benchmark merge_data_operation")
+	parser.add_argument('--rows', type = int, default = 10000)
+	parser.add_argument('--cols', type = int, default = 1000)
+	parser.add_argument('--pass-through', type = int, default = 50)
+	parser.add_argument('--repeat', type = int, default = 3)
+	parser.add_argument('--xcom', action = 'store_true',
+						help = "Disable the artifact store and pass frames through XCom")
+	args = parser.parse_args()
+
+	with tempfile.TemporaryDirectory() as root:
+
+		artifacts.set_artifact_store(None if args.xcom else LocalArtifactStore(root))
+		xcom, params = build_xcom(args.rows, args.cols, args.pass_through)
+
+		print("Merging {} engineered columns and {} pass-through columns over {} rows\n"\
+			.format(args.cols, args.pass_through, args.rows))
+
+		print("{:<14}{:>12}{:>12}{:>12}".format('', 'merge (s)', 'consume (s)', 'queries'))
+		for name, merge in [('legacy', legacy_merge),
+							('single-pass', merge_data_operation)]:
+			print("{:<14}{:>12.3f}{:>12.3f}{:>12}".format(name, *time_merge(merge, xcom, params, args.repeat)))
@@ -0,0 +1,168 @@
+#####################################################################################
+#
+#
+# 	Benchmark: Train / Test Splits as Views over One Stored Dataset
+#
+#
+#####################################################################################
+
+'''
+Measures the memory and storage of train / test splitting as the number
+of derived splits grows. Each derived split runs split_operation and
+model_split_operation over one base dataset. Stored bytes and peak traced
+memory (which includes values kept in XCom) are reported for the previous
+implementation, which keeps six copies of the data per split, and for
+views, which keep row positions only.
+
+Usage:
+	python benchmarks/bench_splits.py [--rows 100000] [--cols 50] [--splits 1,2,5,10] [--xcom]
+'''
+
+#####################################################################################
+# External Library and Module Imports
+#####################################################################################
+
+# System and OS
+import os
+import sys
+import argparse
+import tempfile
+import tracemalloc
+
+#Data packages
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split as sk_train_test_split
+
+#Airbender
+sys.path.append(os.path.abspath(os.path.join(__file__, "../../")))
+from airbender.airflow import artifacts
+from airbender.airflow.artifacts import LocalArtifactStore, store_data, load_data
+from airbender.airflow.xcom import LocalXComBackend, LocalTaskInstance
+from airbender.airflow.op_converter import split_operation, model_split_operation
+from airbender.static.splitting import train_test_split
+
+#####################################################################################
+# Benchmark Helpers
+#####################################################################################
+
+def legacy_train_test_split(data, target, test_ratio, random_state = 42):
+	'''
+	Previous train_test_split, kept for comparison. Returns copies of the rows.
+	'''
+	train, test = sk_train_test_split(data, test_size = test_ratio, random_state = random_state)
+	return train, test, target
+
+
+def legacy_split(params, dag, **kwargs):
+	'''
+	Previous split_operation, kept for comparison. Stores both splits.
+	'''
+	ti = kwargs['ti']
+	data = load_data(ti.xcom_pull(key = 'data', task_ids = 'read'))
+
+	train, test, target = params['func'](data, **params['params'])
+
+	ti.xcom_push(key = 'train', value = store_data(train))
+	ti.xcom_push(key = 'test', value = store_data(test))
+	ti.xcom_push(key = 'target', value = target)
+
+
+def legacy_model_split(params, dag, **kwargs):
+	'''
+	Previous model_split_operation, kept for comparison. Stores
+	features and target of both splits with boolean column masks.
+	'''
+	ti = kwargs['ti']
+	train = load_data(ti.xcom_pull(key = 'train', task_ids = params['split_id']))
+	test = load_data(ti.xcom_pull(key = 'test', task_ids = params['split_id']))
+	target = ti.xcom_pull(key = 'target', task_ids = params['split_id'])
+
+	ti.xcom_push(key = 'X_train', value = store_data(train.loc[:,train.columns != target]))
+	ti.xcom_push(key = 'y_train', value = store_data(train.loc[:,target]))
+	ti.xcom_push(key = 'X_test', value = store_data(test.loc[:,test.columns != target]))
+	ti.xcom_push(key = 'y_test', value = store_data(test.loc[:,target]))
+
+
+def directory_bytes(root):
+	'''
+	Bytes of every file under root.
+	'''
+	return sum(os.path.getsize(os.path.join(path, name)) for path, _, names in os.walk(root) for name in names)
+
+
+def run_splits(implementation, rows, cols, splits, store):
+	'''
+	Runs derived splits of one dataset.
+
+	Args:
+		implementation:				'legacy' or 'views'
+		rows:						Rows of the dataset
+		cols:						Feature columns of the dataset
+		splits:						Number of derived splits
+		store:						Empty LocalArtifactStore, or None to pass data through XCom
+
+	Returns:
+		stored_bytes:				Bytes written to the artifact store by splitting
+		peak_bytes:					Peak traced memory of splitting
+
+	'''
+	rng = np.random.default_rng(42)
+	data = pd.DataFrame(rng.standard_normal((rows, cols)), columns = ['col_{}'.format(i) for i in range(cols)])
+	data['target'] = rng.integers(0, 2, rows)
+
+	artifacts.set_artifact_store(store)
+	xcom = LocalXComBackend()
+	xcom.push('read', 'data', store_data(data))
+	del data
+	base_bytes = directory_bytes(store.root) if store else 0
+
+	if implementation == 'legacy':
+		split, model_split, func = legacy_split, legacy_model_split, legacy_train_test_split
+	else:
+		split, model_split, func = split_operation, model_split_operation, train_test_split
+
+	tracemalloc.start()
+	try:
+		for i in range(splits):
+			split_id = 'split_{}'.format(i)
+			params = {'func': func, 'params': {'target': 'target', 'test_ratio': 0.2, 'random_state': i},
+					  'sources': {'data': 'read'}}
+			split(params, None, ti = LocalTaskInstance(split_id, xcom))
+
+			model_split_id = 'model_data_split_{}'.format(i)
+			model_split({'params': {}, 'split_id': split_id,
+						 'sources': {key: split_id for key in ['train', 'test', 'target']}},
+						None, ti = LocalTaskInstance(model_split_id, xcom))
+
+		peak_bytes = tracemalloc.get_traced_memory()[1]
+	finally:
+		tracemalloc.stop()
+		artifacts.set_artifact_store(None)
+
+	return (directory_bytes(store.root) - base_bytes if store else 0), peak_bytes
+
+#####################################################################################
+# Main Execution
+#####################################################################################
+
+if __name__ == '__main__':
+
+	parser = argparse.ArgumentParser(description = "Benchmark train / test splits")
+	parser.add_argument('--rows', type = int, default = 100000)
+	parser.add_argument('--cols', type = int, default = 50)
+	parser.add_argument('--splits', default = "1,2,5,10")
+	parser.add_argument('--xcom', action = 'store_true',
+						help = "Disable the artifact store and pass frames through XCom")
+	args = parser.parse_args()
+
+	print("Splitting {} rows x {} columns\n".format(args.rows, args.cols + 1))
+
+	print("{:<10}{:>8}{:>14}{:>12}".format('', 'splits', 'stored (MB)', 'peak (MB)'))
+	for implementation in ['legacy', 'views']:
+		for splits in [int(splits) for splits in args.splits.split(",")]:
+			with tempfile.TemporaryDirectory() as root:
+				store = None if args.xcom else LocalArtifactStore(root)
+				stored_bytes, peak_bytes = run_splits(implementation, args.rows, args.cols, splits, store)
+			print("{:<10}{:>8}{:>14.1f}{:>12.1f}".format(implementation, splits,
+														  stored_bytes / 2.0**20, peak_bytes / 2.0**20))
@@ -0,0 +1,145 @@
+#####################################################################################
+#
+#
+# 	Benchmark Helpers: Synthetic Experiments
+#
+#
+#####################################################################################
+
+
+#####################################################################################
+# External Library and Module Imports
+#####################################################################################
+
+# System and OS
+import os
+import sys
+import time
+import statistics
+
+#Data packages
+import numpy as np
+import pandas as pd
+
+#Airbender
+sys.path.append(os.path.abspath(os.path.join(__file__, "../../")))
+from airbender.dag.layers import DagLayer
+from airbender.static.feature_engineering import normalize_values, winsorize, encode_labels
+from airbender.static.preprocessing import impute
+from airbender.static.splitting import train_test_split
+
+#####################################################################################
+# Synthetic Experiments
+#####################################################################################
+
+def write_dataset(root, rows = 1000, columns = 4, seed = 42):
+	'''
+	Writes a synthetic classification dataset as a CSV.
+
+	Args:
+		root:						Folder to write the dataset to
+
+	Kwargs:
+		rows:						Number of rows
+		columns:					Number of numeric feature columns
+		seed:						Random seed
+
+	Returns:
+		filepath:					Path of the dataset
+
+	'''
+
+	rng = np.random.default_rng(seed)
+	data = pd.DataFrame({'x{}'.format(i): rng.normal(i, 1.0, rows) for i in range(columns)})
+	data['label'] = np.where(data['x0'] + rng.normal(0, 0.5, rows) > 0, 'pos', 'neg')
+
+	filepath = os.path.join(root, 'synthetic_{}x{}.csv'.format(rows, columns))
+	data.to_csv(filepath, index = False)
+
+	return filepath
+
+
+def experiment_config(filepath, columns = 4, models = None, metrics = None, preprocessing = 0,
+					  name = "Airbender_Benchmark"):
+	'''
+	Experiment over a synthetic dataset: one split, optional preprocessing
+	families, a feature engineering family per column, and the provided
+	models and metrics.
+
+	Args:
+		filepath:					Path of a dataset written by write_dataset
+
+	Kwargs:
+		columns:					Number of numeric feature columns in the dataset
+		models:						Dict of model tag -> {model: params}. Defaults to a logistic regression
+		metrics:					Dict of metric tag -> {metric: params}. Defaults to accuracy and f1
+		preprocessing:				Number of preprocessing (imputation) families
+		name:						Dag name
+
+	Returns:
+		config:						Airbender configuration
+
+	'''
+
+	from sklearn.linear_model import LogisticRegression
+	from sklearn.metrics import accuracy_score, f1_score
+
+	if models is None:
+		models = {'LOG': {LogisticRegression: {'solver': 'lbfgs'}}}
+
+	if metrics is None:
+		metrics = {'acc': {accuracy_score: None},
+				   'f1': {f1_score: {'average': 'weighted'}}}
+
+	feature_engineering = {'x{}'.format(i): {winsorize: {'limits': [0.05, 0.05]},
+											 normalize_values: None} for i in range(columns)}
+	feature_engineering['label'] = {encode_labels: None}
+
+	config = {
+		'dag_name': name,
+		'dag': {'owner': 'airbender'},
+		'config': {
+			'data_sources': {'synthetic': DagLayer({filepath: {pd.read_csv: {'sep': ','}}})},
+			'splitting': {'split': DagLayer({'sklearn': {train_test_split: {"target": "label",
+																		   "test_ratio": 0.25,
+																		   "random_state": 42}}})},
+			'feature_engineering': {'cols': DagLayer(feature_engineering)},
+			'modeling': {'modeling': DagLayer(models)},
+			'evaluation': {'metrics': DagLayer(metrics)}
+		}
+	}
+
+	if preprocessing:
+		config['config']['preprocessing'] = {'missing_data': DagLayer({'impute_{}'.format(i): {impute: {'method': 'median'}}
+																		for i in range(preprocessing)})}
+
+	return config
+
+#####################################################################################
+# Timing
+#####################################################################################
+
+def time_call(func, repeats = 5):
+	'''
+	Times repeated calls of func.
+
+	Args:
+		func:						Callable taking no arguments
+
+	Kwargs:
+		repeats:					Number of calls
+
+	Returns:
+		timing:						Dict with the median, min, and max wall time, in seconds
+
+	'''
+
+	timings = []
+	for _ in range(repeats):
+		start = time.perf_counter()
+		func()
+		timings.append(time.perf_counter() - start)
+
+	return {'median': statistics.median(timings),
+			'min': min(timings),
+			'max': max(timings)}
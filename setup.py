@@ -33,6 +33,7 @@ REQUIRED = [
 # What packages are optional?
 EXTRAS = {
     'apache-airflow': ['apache-airflow'],
+    'arrow': ['pyarrow'],
 }
 
 # The rest you shouldn't have to touch too much :)
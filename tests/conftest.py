@@ -22,6 +22,8 @@ import sys
 import copy
 
 #Data packages
+import numpy as np
+import pandas as pd
 
 #Airbender
 import os
@@ -30,6 +32,8 @@ sys.path.append(os.path.abspath(os.path.join(__file__, "../../")))
 import airbender
 from airbender.dag.generator import DagGenerator
 from airbender.dag.layers import DagLayer
+from airbender.airflow import artifacts
+from airbender.airflow.artifacts import LocalArtifactStore
 
 
 #####################################################################################
@@ -43,4 +47,53 @@ def obtain_correct_import_validation():
 		dg.detect_external_imports()
 		return set(chain(*dg.import_dict.values()))
 
-	return _obtain_correct_import_validation
\ No newline at end of file
+	return _obtain_correct_import_validation
+
+@pytest.fixture
+def experiment_config(tmp_path):
+
+	from sklearn.metrics import accuracy_score, f1_score
+	from sklearn.linear_model import LogisticRegression
+	from sklearn.tree import DecisionTreeClassifier
+	from airbender.static.feature_engineering import normalize_values, winsorize, encode_labels
+	from airbender.static.splitting import train_test_split
+
+	artifacts.set_artifact_store(LocalArtifactStore(str(tmp_path / 'artifacts')))
+
+	rng = np.random.default_rng(42)
+	data = pd.DataFrame({'sepal_width': rng.normal(3, 0.5, 120),
+						 'sepal_length': rng.normal(5, 1.0, 120),
+						 'petal_length': rng.normal(4, 1.5, 120)})
+	data['flower_label'] = np.where(data['petal_length'] > 4, 'virginica', 'setosa')
+	data.to_csv(str(tmp_path / 'flowers.csv'), index = False)
+
+	def _experiment_config(layers = None, **generation):
+		config = {
+			'dag_name': "Airbender_Executor_Tests",
+			'dag': {'owner': 'airbender'},
+			'config': {
+				'data_sources': {'flowers': DagLayer({str(tmp_path / 'flowers.csv'): {pd.read_csv: {'sep': ','}}})},
+				'splitting': {'split': DagLayer({'sklearn': {train_test_split: {"target": "flower_label",
+																			   "test_ratio": 0.25,
+																			   "random_state": 42}}})},
+				'feature_engineering': {'cols': DagLayer({'sepal_width': {normalize_values: None},
+														  'sepal_length': None,
+														  'petal_length': {winsorize: {'limits': [0.05, 0.05]},
+																		   normalize_values: None},
+														  'flower_label': {encode_labels: None}})},
+				'modeling': {'modeling': DagLayer({'LOG': {LogisticRegression: {'solver':'lbfgs'}},
+												   'TREE': {DecisionTreeClassifier: {'max_depth': 3}}})},
+				'evaluation': {'metrics': DagLayer({'acc': {accuracy_score: None},
+													'f1': {f1_score: {'average': 'weighted'}}})}
+			}
+		}
+
+		#Layers replaced by a test, and generation options
+		config['config'].update(layers or {})
+		if generation:
+			config['generation'] = generation
+
+		return config
+
+	yield _experiment_config
+	artifacts.set_artifact_store(None)
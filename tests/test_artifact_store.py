@@ -0,0 +1,188 @@
+#####################################################################################
+#
+#
+# 	Test Script: Artifact Store
+#
+#
+#####################################################################################
+
+
+#####################################################################################
+# External Library and Module Imports
+#####################################################################################
+
+#Helper packages
+import os
+import sys
+import json
+
+#Data packages
+import pytest
+import numpy as np
+import pandas as pd
+
+#Airbender
+sys.path.append(os.path.abspath(os.path.join(__file__, "../../")))
+import airbender
+from airbender.airflow import artifacts
+from airbender.airflow.artifacts import LocalArtifactStore, store_data, store_view, load_data, is_artifact_ref, \
+									   artifact_refs
+
+#####################################################################################
+# Test Fixtures
+#####################################################################################
+
+@pytest.fixture
+def frame():
+	return pd.DataFrame({'sepal_width': np.arange(10, dtype = float),
+						 'petal_width': np.arange(10, 20, dtype = float),
+						 'flower_label': ['setosa', 'virginica'] * 5},
+						 index = np.arange(100, 110))
+
+@pytest.fixture(params = ['arrow', 'parquet', 'pickle'])
+def store(request, tmp_path):
+	store = LocalArtifactStore(str(tmp_path), fmt = request.param)
+	artifacts.set_artifact_store(store)
+	yield store
+	artifacts.set_artifact_store(None)
+
+#####################################################################################
+# Test Class: Artifact Store Round Trips
+#####################################################################################
+
+class TestLocalArtifactStore:
+
+	def test_frame_round_trip(self, store, frame):
+		ref = store_data(frame)
+
+		assert is_artifact_ref(ref)
+		pd.testing.assert_frame_equal(load_data(ref), frame)
+
+	def test_series_round_trip(self, store, frame):
+		ref = store_data(frame['petal_width'])
+
+		assert ref['kind'] == 'series'
+		pd.testing.assert_series_equal(load_data(ref), frame['petal_width'])
+
+	def test_column_projection(self, store, frame):
+		ref = store_data(frame)
+		projected = load_data(ref, columns = ['petal_width'])
+
+		assert list(projected.columns) == ['petal_width']
+		pd.testing.assert_frame_equal(projected, frame.loc[:, ['petal_width']])
+
+	def test_reference_is_small_and_json_serializable(self, store, frame):
+		ref = store_data(frame)
+
+		assert len(json.dumps(ref)) < 256
+
+	def test_content_addressed(self, store, frame):
+		first = store_data(frame)
+		second = store_data(frame.copy())
+
+		assert first == second
+		assert store_data(frame.iloc[:5]) != first
+
+	def test_non_data_values_pass_through(self, store):
+		artifact = {'mean': 1.0, 'std': 2.0}
+
+		assert store_data(artifact) is artifact
+		assert load_data(artifact) is artifact
+
+	def test_objects_stored_explicitly(self, store):
+		ordinal_dict = {'level_{}'.format(i): i for i in range(100)}
+		ref = store.put(ordinal_dict)
+
+		assert ref['kind'] == 'object' and ref['format'] == 'pickle'
+		assert store.put(dict(ordinal_dict)) == ref
+		assert load_data(ref) == ordinal_dict
+
+	def test_multi_task_pulls_resolved(self, store, frame):
+		refs = (store_data(frame['sepal_width']), store_data(frame['petal_width']))
+		resolved = load_data(refs)
+
+		assert isinstance(resolved, tuple)
+		pd.testing.assert_series_equal(resolved[1], frame['petal_width'])
+
+	def test_views_share_the_base_frame(self, store, frame):
+		ref = store_data(frame)
+		views = [store_view(ref, [0, 2, 4]), store_view(ref, [9, 1])]
+
+		pd.testing.assert_frame_equal(load_data(views[0]), frame.iloc[[0, 2, 4]])
+		pd.testing.assert_frame_equal(load_data(views[1], columns = ['sepal_width']), 
+									  frame.iloc[[9, 1]][['sepal_width']])
+
+		#Only row positions are stored per view
+		assert [view['data'] for view in views] == [ref, ref]
+		assert artifact_refs(views[1]) == [ref, views[1]['index']]
+		assert load_data(views[1]['index']).tolist() == [9, 1]
+
+	def test_missing_artifact(self, store, frame):
+		ref = store_data(frame)
+		os.remove(store.path(ref[artifacts.ARTIFACT_KEY], ref['format']))
+
+		with pytest.raises(FileNotFoundError):
+			load_data(ref)
+
+	def test_size_and_delete(self, store, frame):
+		ref = store_data(frame)
+		assert store.size(ref) == os.path.getsize(store.path(ref[artifacts.ARTIFACT_KEY], ref['format']))
+
+		store.delete(ref)
+		assert not store.exists(ref) and store.size(ref) == 0
+
+		#Deleting twice is harmless
+		store.delete(ref)
+
+	def test_prune_removes_unused_artifacts(self, store, frame):
+		old, recent = store_data(frame), store_data(frame.iloc[:5])
+		hour_ago = os.path.getmtime(store.path(old[artifacts.ARTIFACT_KEY], old['format'])) - 3600
+		os.utime(store.path(old[artifacts.ARTIFACT_KEY], old['format']), (hour_ago, hour_ago))
+
+		#No retention, nothing is pruned
+		assert store.prune() == 0
+
+		assert store.prune(retention = 60) == 1
+		assert not store.exists(old) and store.exists(recent)
+
+	def test_reads_count_as_use(self, store, frame):
+		ref = store_data(frame)
+		path = store.path(ref[artifacts.ARTIFACT_KEY], ref['format'])
+		os.utime(path, (0, 0))
+
+		load_data(ref)
+		assert store.prune(retention = 60) == 0 and store.exists(ref)
+
+	def test_default_store_has_retention(self, monkeypatch, tmp_path):
+		monkeypatch.delenv(artifacts.ARTIFACT_ROOT_ENV, raising = False)
+		monkeypatch.delenv(artifacts.ARTIFACT_RETENTION_ENV, raising = False)
+		monkeypatch.setattr(artifacts.tempfile, 'gettempdir', lambda: str(tmp_path))
+
+		stale = tmp_path / 'airbender_artifacts' / 'ab' / 'stale.arrow'
+		stale.parent.mkdir(parents = True)
+		stale.write_bytes(b'stale')
+		os.utime(str(stale), (0, 0))
+
+		artifacts.set_artifact_store(artifacts._UNSET)
+		try:
+			store = artifacts.get_artifact_store()
+			assert store.retention == artifacts.DEFAULT_RETENTION
+			assert not stale.exists()
+		finally:
+			artifacts.set_artifact_store(None)
+
+	def test_explicit_root_is_kept(self, monkeypatch, tmp_path):
+		monkeypatch.setenv(artifacts.ARTIFACT_ROOT_ENV, str(tmp_path))
+		monkeypatch.delenv(artifacts.ARTIFACT_RETENTION_ENV, raising = False)
+
+		artifacts.set_artifact_store(artifacts._UNSET)
+		try:
+			assert artifacts.get_artifact_store().retention is None
+		finally:
+			artifacts.set_artifact_store(None)
+
+	def test_disabled_store(self, frame):
+		artifacts.set_artifact_store(None)
+
+		assert store_data(frame) is frame
+		pd.testing.assert_frame_equal(load_data(store_view(frame, [3, 5])), frame.iloc[[3, 5]])
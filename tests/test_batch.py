@@ -0,0 +1,133 @@
+#####################################################################################
+#
+#
+# 	Test Script: Batch Generation
+#
+#
+#####################################################################################
+
+
+#####################################################################################
+# External Library and Module Imports
+#####################################################################################
+
+#Helper packages
+import os
+import sys
+import ast
+
+#Data packages
+import pytest
+
+#Airbender
+sys.path.append(os.path.abspath(os.path.join(__file__, "../../")))
+import airbender
+from airbender.dag import generator
+from airbender.dag.batch import generate_batch
+from airbender.dag.generator import DagGenerator
+from sklearn.tree import DecisionTreeClassifier
+
+#####################################################################################
+# Test Fixtures
+#####################################################################################
+
+@pytest.fixture
+def sweep_configs(experiment_config):
+	def _sweep_configs(count):
+		configs = []
+		for i in range(count):
+			config = experiment_config()
+			config['dag_name'] = "Airbender_Sweep_{}".format(i)
+			configs.append(config)
+		return configs
+
+	return _sweep_configs
+
+#####################################################################################
+# Test Class: Batch Generation
+#####################################################################################
+
+class TestGenerateBatch:
+
+	@pytest.mark.parametrize("processes", [False, True], ids = ["threads", "processes"])
+	def test_every_config_is_generated(self, sweep_configs, tmp_path, processes):
+		results = generate_batch(sweep_configs(3),
+								 dags_folder = str(tmp_path),
+								 max_workers = 2,
+								 processes = processes)
+
+		assert [result['dag_name'] for result in results] == ["Airbender_Sweep_{}".format(i) for i in range(3)]
+		for result in results:
+			assert result['error'] is None
+			assert result['seconds'] > 0
+			with open(result['filepath']) as dag_file:
+				ast.parse(dag_file.read())
+
+	def test_errors_are_reported_per_config(self, sweep_configs, tmp_path):
+		configs = sweep_configs(2)
+		del configs[0]['dag']
+
+		results = generate_batch(configs, dags_folder = str(tmp_path), processes = False)
+
+		assert results[0]['filepath'] is None
+		assert results[0]['error'].startswith("AttributeError")
+		assert results[1]['error'] is None
+
+	def test_resources_are_read_once(self):
+		generator.load_template()
+		generator.load_hierarchy()
+		hits = (generator.load_template.cache_info().hits, generator.read_hierarchy.cache_info().hits)
+
+		#Each generator gets its own copy of the hierarchy
+		hierarchy = generator.load_hierarchy()
+		hierarchy.clear()
+		generator.load_template()
+
+		assert generator.load_hierarchy() != {}
+		assert generator.load_template.cache_info().hits == hits[0] + 1
+		assert generator.read_hierarchy.cache_info().hits == hits[1] + 2
+
+#####################################################################################
+# Test Class: Incremental Regeneration
+#####################################################################################
+
+class TestIncrementalGeneration:
+
+	def test_filename_and_hash_are_deterministic(self, experiment_config, tmp_path):
+		first = DagGenerator(experiment_config())
+		filepath = first.generate_file(dags_folder = str(tmp_path))
+		second = DagGenerator(experiment_config())
+
+		assert os.path.basename(filepath) == "Airbender_Executor_Tests_airbender.py"
+		assert first.config_hash == second.config_hash
+		with open(filepath) as dag_file:
+			assert "Config Hash: {}".format(first.config_hash) in dag_file.read()
+
+	def test_unchanged_config_is_not_rewritten(self, experiment_config, tmp_path):
+		dags_folder = tmp_path / 'dags'
+		dags_folder.mkdir()
+		filepath = DagGenerator(experiment_config()).generate_file(dags_folder = str(dags_folder))
+		mtime = os.stat(filepath).st_mtime_ns
+
+		dg = DagGenerator(experiment_config())
+		assert dg.generate_file(dags_folder = str(dags_folder)) == filepath
+		assert not dg.written and not dg.built
+		assert os.stat(filepath).st_mtime_ns == mtime
+
+		#Forced regeneration rewrites the file without leaving temporary files
+		dg = DagGenerator(experiment_config())
+		dg.generate_file(dags_folder = str(dags_folder), force = True)
+		assert dg.written
+		assert os.listdir(str(dags_folder)) == [os.path.basename(filepath)]
+
+	def test_changed_config_is_rewritten(self, experiment_config, tmp_path):
+		filepath = DagGenerator(experiment_config()).generate_file(dags_folder = str(tmp_path))
+
+		config = experiment_config()
+		config['config']['modeling']['modeling'].config['TREE'] = {DecisionTreeClassifier: {'max_depth': 5}}
+		dg = DagGenerator(config)
+
+		assert dg.generate_file(dags_folder = str(tmp_path)) == filepath
+		assert dg.written
+		with open(filepath) as dag_file:
+			assert "'max_depth': 5" in dag_file.read()
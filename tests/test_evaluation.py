@@ -0,0 +1,118 @@
+#####################################################################################
+#
+#
+# 	Test Script: Model Evaluation
+#
+#
+#####################################################################################
+
+
+#####################################################################################
+# External Library and Module Imports
+#####################################################################################
+
+#Helper packages
+import os
+import sys
+import warnings
+
+#Data packages
+import pytest
+import numpy as np
+from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, balanced_accuracy_score
+
+#Airbender
+sys.path.append(os.path.abspath(os.path.join(__file__, "../../")))
+import airbender
+from airbender.static.evaluation import evaluate_model, evaluate_models, confusion_summary
+
+#####################################################################################
+# Test Helpers
+#####################################################################################
+
+rng = np.random.RandomState(0)
+
+LABELS = {'binary': (rng.randint(0, 2, 200), rng.randint(0, 2, 200)),
+		  'multiclass': (rng.randint(0, 4, 200), rng.randint(0, 4, 200)),
+		  'strings': (rng.choice(['setosa', 'virginica', 'versicolor'], 200),
+					  rng.choice(['setosa', 'virginica', 'versicolor'], 200))}
+
+def metric_config(funcs, averages):
+	return [{'task_id': '{}_{}'.format(func.__name__, average),
+			 'func': func,
+			 'params': {'average': average}} for func in funcs for average in averages]
+
+#####################################################################################
+# Test Class: Evaluate Model
+#####################################################################################
+
+class TestEvaluateModel:
+
+	@pytest.mark.parametrize('labels', ['binary', 'multiclass', 'strings'])
+	def test_summary_metrics_match_sklearn(self, labels):
+		y_true, y_pred = LABELS[labels]
+		averages = ['micro', 'macro', 'weighted'] + (['binary'] if labels == 'binary' else [])
+		metrics = metric_config([precision_score, recall_score, f1_score], averages) + \
+				  [{'task_id': 'acc', 'func': accuracy_score, 'params': {}}]
+
+		results = evaluate_model(y_true, y_pred, metrics)
+
+		assert list(results) == [metric['task_id'] for metric in metrics]
+		for metric in metrics:
+			expected = metric['func'](y_true, y_pred, **metric['params'])
+			assert results[metric['task_id']] == pytest.approx(expected)
+
+	def test_per_label_scores(self):
+		y_true, y_pred = LABELS['multiclass']
+		results = evaluate_model(y_true, y_pred, metric_config([f1_score], [None]))
+
+		np.testing.assert_allclose(results['f1_score_None'], f1_score(y_true, y_pred, average = None))
+
+	def test_undefined_metrics_fall_back(self):
+		y_true = np.array([0, 0, 1, 1])
+		y_pred = np.array([0, 0, 0, 0])
+		metrics = metric_config([precision_score], ['binary']) + \
+				  [{'task_id': 'precision_zero', 'func': precision_score, 'params': {'zero_division': 0}},
+				   {'task_id': 'balanced', 'func': balanced_accuracy_score, 'params': {}}]
+
+		with warnings.catch_warnings():
+			warnings.simplefilter('ignore')
+			results = evaluate_model(y_true, y_pred, metrics)
+
+		assert results == {'precision_score_binary': 0.0, 'precision_zero': 0.0,
+						   'balanced': balanced_accuracy_score(y_true, y_pred)}
+
+	def test_stacked_models_match_sklearn(self):
+		y_true, _ = LABELS['multiclass']
+		y_preds = [rng.randint(0, 4, 200) for _ in range(5)] + [np.full(200, 3)]
+		model_ids = ['model_{}'.format(i) for i in range(6)]
+		metrics = [{'func': f1_score, 'params': {'average': 'macro'},
+					'task_ids': {model_id: model_id + '_f1' for model_id in model_ids}},
+				   {'func': accuracy_score, 'params': {},
+					'task_ids': {model_id: model_id + '_acc' for model_id in model_ids[:3]}}]
+
+		with warnings.catch_warnings():
+			warnings.simplefilter('ignore')
+			results = evaluate_models(y_true, y_preds, model_ids, metrics)
+
+		assert list(results) == model_ids
+		for model_id, y_pred in zip(model_ids, y_preds):
+			expected = {model_id + '_f1': f1_score(y_true, y_pred, average = 'macro')}
+			if model_id in model_ids[:3]:
+				expected[model_id + '_acc'] = accuracy_score(y_true, y_pred)
+			assert results[model_id] == pytest.approx(expected)
+
+	def test_confusion_summary(self):
+		summary = confusion_summary(['b', 'a', 'a'], ['a', 'a', 'b'])
+
+		assert list(summary['labels']) == ['a', 'b']
+		assert summary['matrix'].tolist() == [[1, 1], [1, 0]]
+		assert confusion_summary([], []) is None
+
+		#Stacked predictions of many models
+		stacked = confusion_summary(['b', 'a', 'a'], [['a', 'a', 'b'], ['b', 'a', 'c']])
+		assert list(stacked['labels']) == ['a', 'b', 'c']
+		assert stacked['matrix'][1].tolist() == [[1, 0, 1], [0, 1, 0], [0, 0, 0]]
+		assert stacked['true_positives'].tolist() == [[1, 0, 0], [1, 1, 0]]
+		assert confusion_summary([1, 0], ['a', 'b']) is None
+		assert confusion_summary(np.array([1, 'a'], dtype = object), [1, 1]) is None
@@ -0,0 +1,137 @@
+#####################################################################################
+#
+#
+# 	Test Script: Experiment Specs and DAG Factory
+#
+#
+#####################################################################################
+
+
+#####################################################################################
+# External Library and Module Imports
+#####################################################################################
+
+#Helper packages
+import os
+import sys
+import ast
+import json
+import types
+
+#Data packages
+import pytest
+
+#Airbender
+sys.path.append(os.path.abspath(os.path.join(__file__, "../../")))
+import airbender
+from airbender.airflow import factory
+from airbender.dag.emitter import DagEmitter
+from airbender.dag.generator import DagGenerator
+
+#####################################################################################
+# Test Fixtures
+#####################################################################################
+
+@pytest.fixture
+def spec_dag(experiment_config, tmp_path):
+	config = experiment_config(spec = True)
+	dags_folder = tmp_path / 'dags'
+	dags_folder.mkdir()
+
+	dg = DagGenerator(config)
+	filepath = dg.generate_file(dags_folder = str(dags_folder))
+
+	return dg, filepath
+
+@pytest.fixture
+def airflow_modules(monkeypatch):
+
+	#Airflow is not a dependency of airbender. Records what the factory builds
+	class Operator:
+		def __init__(self, task_id, dag, **kwargs):
+			self.task_id = task_id
+			self.kwargs = kwargs
+			self.upstream = []
+			dag.tasks.append(self)
+
+		def __rshift__(self, other):
+			other.upstream.append(self.task_id)
+			return other
+
+	class DAG:
+		def __init__(self, dag_id, **kwargs):
+			self.dag_id = dag_id
+			self.tasks = []
+
+	airflow = types.ModuleType('airflow')
+	airflow.DAG = DAG
+	python_operator = types.ModuleType('airflow.operators.python_operator')
+	python_operator.PythonOperator = Operator
+
+	monkeypatch.setitem(sys.modules, 'airflow', airflow)
+	monkeypatch.setitem(sys.modules, 'airflow.operators', types.ModuleType('airflow.operators'))
+	monkeypatch.setitem(sys.modules, 'airflow.operators.python_operator', python_operator)
+
+#####################################################################################
+# Test Class: Experiment Specs
+#####################################################################################
+
+class TestExperimentSpec:
+
+	def test_spec_is_written_next_to_loader(self, spec_dag):
+		dg, filepath = spec_dag
+		spec_path = filepath[:-len(".py")] + ".json"
+
+		with open(filepath) as dag_file:
+			source = dag_file.read()
+		ast.parse(source)
+		assert "build_dag(" in source and dg.spec_filename in source
+		assert "Config Hash: {}".format(dg.config_hash) in source
+
+		spec = factory.load_spec(spec_path)
+		assert [task['task_id'] for task in spec['tasks']] == list(dg.graph.tasks)
+		assert spec['upstream']['LOG_predict_acc'] == ['LOG_predict']
+		assert spec['default_args']['owner'] == 'airbender'
+
+	def test_spec_is_smaller_than_operator_file(self, spec_dag, experiment_config):
+		dg, _ = spec_dag
+		eager = DagGenerator(experiment_config())
+		eager.build()
+		eager_output = DagEmitter(eager).emit()
+
+		assert len(dg.output_spec) + len(dg.output_dag) < len(eager_output)
+
+	def test_spec_is_cached_by_mtime(self, spec_dag):
+		_, filepath = spec_dag
+		spec_path = filepath[:-len(".py")] + ".json"
+
+		first = factory.load_spec(spec_path)
+		assert factory.load_spec(spec_path) is first
+
+		with open(spec_path) as spec_file:
+			spec = json.load(spec_file)
+		spec['dag_name'] = 'Renamed'
+		with open(spec_path, 'w') as spec_file:
+			json.dump(spec, spec_file)
+		os.utime(spec_path, ns = (0, os.stat(spec_path).st_mtime_ns + 10**9))
+
+		assert factory.load_spec(spec_path)['dag_name'] == 'Renamed'
+
+	def test_unknown_spec_version_raises(self, tmp_path):
+		spec_path = str(tmp_path / 'old.json')
+		with open(spec_path, 'w') as spec_file:
+			json.dump({'version': 0}, spec_file)
+
+		with pytest.raises(ValueError):
+			factory.load_spec(spec_path)
+
+	def test_factory_rebuilds_graph(self, spec_dag, airflow_modules):
+		dg, filepath = spec_dag
+
+		dag = factory.build_dag(filepath[:-len(".py")] + ".json")
+
+		assert dag.dag_id == dg.dag_name
+		assert [task.task_id for task in dag.tasks] == list(dg.graph.tasks)
+		for task in dag.tasks:
+			assert sorted(task.upstream) == sorted(dg.graph.upstream[task.task_id])
+			assert task.kwargs['python_callable'] is factory.run_lazy_task
@@ -0,0 +1,208 @@
+#####################################################################################
+#
+#
+# 	Test Script: Graph IR and Emitter
+#
+#
+#####################################################################################
+
+
+#####################################################################################
+# External Library and Module Imports
+#####################################################################################
+
+#Helper packages
+import os
+import sys
+import ast
+import copy
+import pickle
+import pprint
+
+#Data packages
+import pytest
+
+#Airbender
+sys.path.append(os.path.abspath(os.path.join(__file__, "../../")))
+import airbender
+from airbender.dag.emitter import DagEmitter
+from airbender.dag.generator import DagGenerator
+from airbender.dag.graph import DagGraph, TaskNode
+from airbender.dag.utils import FrozenDict, FrozenList, freeze
+
+#####################################################################################
+# Test Fixtures
+#####################################################################################
+
+@pytest.fixture
+def chain_graph():
+
+	#a >> [b, c] >> d, with b and c in one family
+	graph = DagGraph()
+	graph.add_section('fe_cols', 'feature_engineering')
+	for task_id in ['a', 'b', 'c', 'd']:
+		graph.add_task(TaskNode(task_id, None, {}, section = 'fe_cols'))
+
+	graph.add_family('train_fe_cols_col', ['b', 'c'], 'fe_cols')
+	graph.connect(['a'], ['b'])
+	graph.connect(['c'], ['d'])
+	graph.add_group('fe_cols_core_head', ['c'], 'fe_cols')
+
+	return graph
+
+#####################################################################################
+# Test Class: Graph IR
+#####################################################################################
+
+class TestDagGraph:
+
+	def test_family_members_are_chained(self, chain_graph):
+		assert chain_graph.upstream['c'] == ['b']
+		assert chain_graph.tasks['b'].family_id == 'train_fe_cols_col'
+
+	def test_duplicate_task_raises(self, chain_graph):
+		with pytest.raises(ValueError):
+			chain_graph.add_task(TaskNode('a', None, {}))
+
+	def test_unknown_task_edge_raises(self, chain_graph):
+		with pytest.raises(KeyError):
+			chain_graph.add_edge('a', 'missing')
+
+	def test_topological_order(self, chain_graph):
+		assert chain_graph.topological_order() == ['a', 'b', 'c', 'd']
+
+	def test_cycle_raises(self, chain_graph):
+		chain_graph.add_edge('d', 'a')
+		with pytest.raises(ValueError):
+			chain_graph.topological_order()
+
+	def test_replace_tasks_rewires(self, chain_graph):
+		chain_graph.replace_tasks(['b', 'c'], TaskNode('bc', None, {}, section = 'fe_cols'))
+
+		assert list(chain_graph.tasks) == ['a', 'bc', 'd']
+		assert chain_graph.upstream['bc'] == ['a']
+		assert chain_graph.upstream['d'] == ['bc']
+		assert chain_graph.families['train_fe_cols_col'] == ['bc']
+		assert chain_graph.groups['fe_cols_core_head'] == ['bc']
+
+	def test_replace_task_sets_in_one_batch(self, chain_graph):
+		chain_graph.replace_task_sets([(['b', 'c'], TaskNode('bc', None, {}, section = 'fe_cols')),
+									   (['d'], TaskNode('d2', None, {}, section = 'fe_cols'))])
+
+		assert list(chain_graph.tasks) == ['a', 'bc', 'd2']
+		assert chain_graph.upstream['bc'] == ['a']
+		assert chain_graph.upstream['d2'] == ['bc']
+		assert chain_graph.families['train_fe_cols_col'] == ['bc']
+
+	@pytest.mark.parametrize("replacements", [[(['b'], TaskNode('x', None, {})), (['b', 'c'], TaskNode('y', None, {}))],
+											  [(['b'], TaskNode('x', None, {})), (['c'], TaskNode('x', None, {}))],
+											  [(['b'], TaskNode('a', None, {}))]])
+	def test_replace_task_sets_conflicts(self, chain_graph, replacements):
+		with pytest.raises(ValueError):
+			chain_graph.replace_task_sets(replacements)
+
+	def test_remove_task_keeps_ordering(self, chain_graph):
+		chain_graph.remove_task('c')
+
+		assert chain_graph.upstream['d'] == ['b']
+		assert chain_graph.families['train_fe_cols_col'] == ['b']
+
+#####################################################################################
+# Test Class: Generator Graph and Emission
+#####################################################################################
+
+class TestGeneratedGraph:
+
+	def test_generator_populates_graph(self, experiment_config):
+		dg = DagGenerator(experiment_config())
+		dg.build()
+
+		assert list(dg.graph.sections) == ['ds_flowers', 's_split', 'fe_cols', 'm_modeling', 'e_metrics']
+		assert dg.graph.upstream['fe_cols_train_merge_layer'] == ['sepal_width_train_normalize_values',
+																  'petal_length_train_normalize_values',
+																  'flower_label_train_encode_labels']
+		assert dg.graph.upstream['LOG_predict_acc'] == ['LOG_predict']
+		assert dg.graph.topological_order()[0] == 'flowers_csv_read_csv'
+
+	def test_emitted_dag_matches_graph(self, experiment_config):
+		dg = DagGenerator(experiment_config())
+		dg.build()
+		dg.graph.remove_task('TREE_predict_f1')
+
+		output = DagEmitter(dg).emit()
+		ast.parse(output)
+
+		for task_id in dg.graph.tasks:
+			assert "task_id='{}'".format(task_id) in output
+		assert "task_id='TREE_predict_f1'" not in output
+		assert "petal_length_train_winsorize >> petal_length_train_normalize_values" in output
+		assert "fe_cols_core_train_head >> fe_cols_train_merge_layer" in output
+		assert "TREE_predict >> [TREE_predict_acc, e_metrics_TREE_predict_merge_metrics]" in output
+
+	def test_graph_passes_run_before_emission(self, experiment_config):
+		dg = DagGenerator(experiment_config())
+		dg.graph_passes.append(lambda graph: graph.remove_task('LOG_predict_f1'))
+		dg.build()
+
+		assert 'LOG_predict_f1' not in dg.graph.tasks
+		assert dg.graph.upstream['e_metrics_LOG_predict_merge_metrics'] == ['LOG_predict_acc', 'LOG_predict']
+
+	def test_nodes_are_compact(self, experiment_config):
+		dg = DagGenerator(experiment_config())
+		dg.build()
+
+		layer = dg.layerbag[2]
+		sublayer = layer.sublayers['core_train']
+		family = sublayer.op_families[0]
+		operator = family.members[0]
+		for node in [sublayer, family, operator, dg.graph.tasks[operator.task_id]]:
+			assert not hasattr(node, '__dict__')
+
+		#Task ids are shared, not duplicated
+		assert sys.intern(''.join(list(operator.task_id))) is operator.task_id
+		assert family.tail is operator.task_id
+		assert layer.get_merge_ids('head', 'merge_layer', split = 'train') == sublayer.head
+
+#####################################################################################
+# Test Class: Frozen Params
+#####################################################################################
+
+class TestFrozenParams:
+
+	def test_frozen_params_cannot_change(self):
+		params = freeze({'params': {'limits': [0.05, 0.05]}, 'split': 'train'})
+
+		assert isinstance(params['params'], FrozenDict)
+		assert isinstance(params['params']['limits'], FrozenList)
+		with pytest.raises(TypeError):
+			params['split'] = 'test'
+		with pytest.raises(TypeError):
+			params['params'].update({'limits': None})
+		with pytest.raises(TypeError):
+			params['params']['limits'].append(0.1)
+
+	def test_changes_share_unchanged_values(self):
+		params = freeze({'params': {'C': 1.0}, 'model': None})
+		changed = params.set('model', 'LOG_fit')
+
+		assert params['model'] is None
+		assert changed == {'params': {'C': 1.0}, 'model': 'LOG_fit'}
+		assert changed['params'] is params['params']
+		assert freeze(params) is params
+		assert copy.deepcopy(params) is params
+
+	def test_frozen_params_behave_as_dicts(self):
+		plain = {'params': {'limits': [0.05, 0.05]}, 'func': None}
+		params = freeze(plain)
+
+		assert pprint.pformat(params) == pprint.pformat(plain)
+		assert pickle.loads(pickle.dumps(params)) == plain
+
+	def test_operators_share_params(self, experiment_config):
+		dg = DagGenerator(experiment_config())
+		dg.build()
+
+		fit, predict = dg.graph.tasks['LOG_fit'], dg.graph.tasks['LOG_predict']
+		assert isinstance(fit.params, FrozenDict)
+		assert predict.params['model'] == 'LOG_fit'
+		assert predict.params['params'] is fit.params['params']
@@ -0,0 +1,132 @@
+#####################################################################################
+#
+#
+# 	Test Script: Local Executor
+#
+#
+#####################################################################################
+
+
+#####################################################################################
+# External Library and Module Imports
+#####################################################################################
+
+#Helper packages
+import os
+import sys
+
+#Data packages
+import pytest
+
+#Airbender
+sys.path.append(os.path.abspath(os.path.join(__file__, "../../")))
+import airbender
+from airbender.airflow.executor import LocalExecutor
+from airbender.dag.generator import DagGenerator
+from airbender.dag.layers import DagLayer
+from airbender.static.feature_engineering import normalize_values
+
+#####################################################################################
+# Test Helpers
+#####################################################################################
+
+def fill_means(data, prefit = None):
+
+	#Preprocessing that fits on the train split and applies to the test split
+	means = prefit['means'] if prefit else data.select_dtypes('number').mean()
+	data = data.fillna(means)
+
+	return data if prefit else (data, {'means': means})
+
+#####################################################################################
+# Test Class: Local Execution of Generated Experiments
+#####################################################################################
+
+class TestLocalExecutor:
+
+	@pytest.mark.parametrize("processes", [False, True], ids = ["threads", "processes"])
+	def test_experiment_runs_to_metrics(self, experiment_config, processes):
+		executor = LocalExecutor(DagGenerator(experiment_config()),
+								 max_workers = 2,
+								 processes = processes)
+		xcom = executor.run()
+
+		for model in ['LOG', 'TREE']:
+			metrics = xcom.pull('e_metrics_{}_predict_merge_metrics'.format(model))
+			model_metrics = metrics['{}_predict'.format(model)]
+
+			assert set(model_metrics) == {'{}_predict_acc'.format(model),
+										  '{}_predict_f1'.format(model)}
+			assert all(0.5 <= value <= 1.0 for value in model_metrics.values())
+
+		assert set(executor.task_timings) == set(executor.operators)
+
+	def test_dependencies_follow_generated_structure(self, experiment_config):
+		executor = LocalExecutor(DagGenerator(experiment_config()))
+		executor.generator.build()
+		executor.collect_graph()
+
+		upstream = executor.upstream
+		assert upstream['sklearn_train_test_split'] == {'flowers_csv_read_csv'}
+		assert upstream['petal_length_train_normalize_values'] == {'petal_length_train_winsorize'}
+		assert upstream['fe_cols_train_merge_layer'] == {'sepal_width_train_normalize_values',
+														 'petal_length_train_normalize_values',
+														 'flower_label_train_encode_labels'}
+		assert upstream['LOG_predict_acc'] == {'LOG_predict'}
+		assert upstream['e_metrics_TREE_predict_merge_metrics'] == {'TREE_predict_acc',
+																	'TREE_predict_f1'}
+
+	def test_task_failure_raises(self, experiment_config):
+		config = experiment_config()
+		config['config']['splitting']['split'].config['sklearn'][
+			list(config['config']['splitting']['split'].config['sklearn'])[0]]['target'] = 'missing'
+
+		with pytest.raises(RuntimeError):
+			LocalExecutor(DagGenerator(config)).run()
+
+	@pytest.mark.parametrize("generation", [{}, {'fuse_families': True, 'group_metrics': True}],
+							 ids = ["plain", "passes"])
+	def test_file_generated_after_run(self, experiment_config, generation, tmp_path):
+		executor = LocalExecutor(DagGenerator(experiment_config(**generation)))
+		executor.run()
+		(tmp_path / 'run').mkdir()
+		(tmp_path / 'fresh').mkdir()
+
+		#The graph already built for the run is emitted as it is
+		filepath = executor.generator.generate_file(dags_folder = str(tmp_path / 'run'), force = True)
+		expected = DagGenerator(experiment_config(**generation)).generate_file(dags_folder = str(tmp_path / 'fresh'))
+
+		with open(filepath) as file, open(expected) as expected_file:
+			assert file.read() == expected_file.read()
+
+#####################################################################################
+# Test Class: Fused Train and Test Splits
+#####################################################################################
+
+class TestFusedSplits:
+
+	@pytest.mark.parametrize("generation", [{}, 
+											{'dataflow': True}, 
+											{'fuse_families': True},
+											{'group_columns': True, 'group_block_bytes': 1 << 30, 'dataflow': True}],
+							 ids = ["layered", "dataflow", "fused_families", "grouped_columns"])
+	def test_fused_splits_match_split_tasks(self, experiment_config, generation):
+		results = {}
+		for fuse_splits in [False, True]:
+			config = experiment_config({'preprocessing': {'missing_data': DagLayer({'means': {fill_means: None}})}},
+									   fuse_splits = fuse_splits, **generation)
+			config['config']['feature_engineering']['cols'].config['sepal_length'] = {normalize_values: None}
+
+			executor = LocalExecutor(DagGenerator(config), max_workers = 2)
+			xcom = executor.run()
+			results[fuse_splits] = (executor.operators, 
+									[xcom.pull('e_metrics_{}_predict_merge_metrics'.format(model)) 
+										for model in ['LOG', 'TREE']])
+
+		split_tasks, split_metrics = results[False]
+		fused_tasks, fused_metrics = results[True]
+
+		assert fused_metrics == split_metrics
+		assert not any('_train_' in task_id.replace('train_test', '') for task_id in fused_tasks)
+		assert 'means_train_test_fill_means' in fused_tasks
+		assert len(fused_tasks) < len(split_tasks)
@@ -0,0 +1,201 @@
+#####################################################################################
+#
+#
+# 	Test Script: Airflow Operator Converter
+#
+#
+#####################################################################################
+
+
+#####################################################################################
+# External Library and Module Imports
+#####################################################################################
+
+#Helper packages
+import os
+import sys
+
+#Data packages
+import pytest
+import numpy as np
+import pandas as pd
+
+#Airbender
+sys.path.append(os.path.abspath(os.path.join(__file__, "../../")))
+import airbender
+from airbender.airflow import artifacts
+from airbender.airflow.artifacts import LocalArtifactStore, store_data, load_data, is_view_ref
+from airbender.airflow.xcom import LocalXComBackend, LocalTaskInstance
+from airbender.airflow.op_converter import (merge_data_operation, 
+											merge_metrics_operation,
+											split_operation,
+											model_split_operation)
+from airbender.static.splitting import train_test_split
+from sklearn.model_selection import train_test_split as sk_train_test_split
+
+#####################################################################################
+# Test Fixtures
+#####################################################################################
+
+@pytest.fixture(params = ['store', 'xcom'])
+def split_xcom(request, tmp_path):
+	if request.param == 'store':
+		artifacts.set_artifact_store(LocalArtifactStore(str(tmp_path)))
+	else:
+		artifacts.set_artifact_store(None)
+
+	train = pd.DataFrame({'sepal_width': np.arange(5, dtype = float),
+						  'sepal_length': np.arange(5, 10, dtype = float),
+						  'flower_label': ['setosa', 'virginica', 'setosa', 'setosa', 'virginica']},
+						  index = [4, 0, 3, 1, 2])
+
+	xcom = LocalXComBackend()
+	xcom.push('split', 'train', store_data(train))
+	xcom.push('sepal_width_train_normalize_values', 'return_value',
+			  store_data((train['sepal_width'] * 2).rename('sepal_width')))
+	xcom.push('flower_label_train_encode_labels', 'return_value',
+			  store_data(pd.Series([0, 1, 0, 0, 1], name = 'flower_label')))
+	xcom.reset_query_count()
+
+	yield xcom, train
+	artifacts.set_artifact_store(None)
+
+@pytest.fixture(params = ['store', 'xcom'])
+def data_xcom(request, tmp_path):
+	store = LocalArtifactStore(str(tmp_path)) if request.param == 'store' else None
+	artifacts.set_artifact_store(store)
+
+	data = pd.DataFrame({'sepal_width': np.arange(20, dtype = float),
+						 'flower_label': ['setosa', 'virginica'] * 10},
+						 index = np.arange(100, 120))
+
+	xcom = LocalXComBackend()
+	xcom.push('read', 'data', store_data(data))
+
+	yield xcom, data, store
+	artifacts.set_artifact_store(None)
+
+#####################################################################################
+# Test Class: Merge Data Operation
+#####################################################################################
+
+class TestMergeDataOperation:
+
+	params = {'merge_ids': ['sepal_width_train_normalize_values',
+							'flower_label_train_encode_labels'],
+			  'pass_through_cols': ['sepal_length'],
+			  'split': 'train',
+			  'params': {}}
+
+	def test_merge_columns_and_pass_through(self, split_xcom):
+		xcom, train = split_xcom
+		merge_data_operation(self.params, None, ti = LocalTaskInstance('merge', xcom))
+		merged = load_data(xcom.pull('merge', key = 'train'))
+
+		assert list(merged.columns) == ['sepal_width', 'flower_label', 'sepal_length']
+		assert list(merged.index) == list(train.index)
+		assert list(merged['sepal_width']) == list(train['sepal_width'] * 2)
+		assert list(merged['flower_label']) == [0, 1, 0, 0, 1]
+		assert list(merged['sepal_length']) == list(train['sepal_length'])
+
+	def test_merge_length_mismatch(self, split_xcom):
+		xcom, train = split_xcom
+		xcom.push('flower_label_train_encode_labels', 'return_value',
+				  store_data(pd.Series([0, 1], name = 'flower_label')))
+
+		with pytest.raises(ValueError):
+			merge_data_operation(self.params, None, ti = LocalTaskInstance('merge', xcom))
+
+	def test_merge_batches_pulls(self, split_xcom):
+		xcom, train = split_xcom
+		merge_data_operation(self.params, None, ti = LocalTaskInstance('merge', xcom))
+
+		#One pull for the split, one batched pull for all merged tasks
+		assert xcom.query_count == 2
+
+#####################################################################################
+# Test Class: Split Operations
+#####################################################################################
+
+class TestSplitOperations:
+
+	params = {'func': train_test_split,
+			  'params': {'target': 'flower_label', 'test_ratio': 0.25}}
+
+	def test_splits_are_views_of_the_data(self, data_xcom):
+		xcom, data, store = data_xcom
+		split_operation(self.params, None, ti = LocalTaskInstance('split', xcom))
+
+		train, test = sk_train_test_split(data, test_size = 0.25, random_state = 42)
+		for split, expected in [('train', train), ('test', test)]:
+			view = xcom.pull('split', key = split)
+			assert is_view_ref(view)
+			if store:
+				assert view['data'] == xcom.pull('read', key = 'data')
+			else:
+				assert view['data'] is data
+			pd.testing.assert_frame_equal(load_data(view), expected)
+
+	def test_model_split_stores_no_data(self, data_xcom):
+		xcom, data, store = data_xcom
+		split_operation(self.params, None, ti = LocalTaskInstance('split', xcom))
+		stored = sorted(os.listdir(store.root)) if store else None
+
+		model_split_operation({'params': {}}, None, ti = LocalTaskInstance('model_data_split', xcom))
+
+		test = load_data(xcom.pull('split', key = 'test'))
+		pd.testing.assert_frame_equal(load_data(xcom.pull(key = 'X_test')), test[['sepal_width']])
+		pd.testing.assert_series_equal(load_data(xcom.pull(key = 'y_test')), test['flower_label'])
+		assert len(load_data(xcom.pull(key = 'X_train'))) == 15
+		if store:
+			assert sorted(os.listdir(store.root)) == stored
+
+	def test_split_frames_are_stored(self, data_xcom):
+		xcom, data, store = data_xcom
+		params = {'func': lambda data, target: (data.iloc[:5], data.iloc[5:], target),
+				  'params': {'target': 'flower_label'}}
+		split_operation(params, None, ti = LocalTaskInstance('split', xcom))
+
+		assert not is_view_ref(xcom.pull(key = 'train'))
+		pd.testing.assert_frame_equal(load_data(xcom.pull(key = 'test')), data.iloc[5:])
+
+#####################################################################################
+# Test Class: Merge Metrics Operation
+#####################################################################################
+
+class TestMergeMetricsOperation:
+
+	def test_merge_metrics_single_query(self):
+		xcom = LocalXComBackend()
+		merge_ids = ['LOG_predict_{}'.format(metric) for metric in ['acc', 'recall', 'f1']]
+		for i, task_id in enumerate(merge_ids):
+			xcom.push(task_id, 'return_value', i / 10.0)
+
+		metrics = merge_metrics_operation({'merge_ids': merge_ids, 
+										   'model': 'LOG_predict',
+										   'params': {}},
+										   None,
+										   ti = LocalTaskInstance('merge_metrics', xcom))
+
+		assert metrics == {'LOG_predict': {'LOG_predict_acc': 0.0,
+										   'LOG_predict_recall': 0.1,
+										   'LOG_predict_f1': 0.2}}
+		assert xcom.query_count == 1
+
+	def test_merge_metrics_of_evaluation_tasks(self):
+		xcom = LocalXComBackend()
+		xcom.push('e_metrics_evaluation', 'return_value', {'LOG_predict': {'LOG_predict_acc': 0.5,
+																		   'LOG_predict_f1': 0.4},
+														   'TREE_predict': {'TREE_predict_acc': 0.9}})
+		xcom.push('LOG_predict_auc', 'return_value', 0.7)
+
+		metrics = merge_metrics_operation({'merge_ids': ['e_metrics_evaluation', 'LOG_predict_auc'],
+										   'evaluations': ['e_metrics_evaluation'],
+										   'model': 'LOG_predict',
+										   'params': {}},
+										   None,
+										   ti = LocalTaskInstance('merge_metrics', xcom))
+
+		assert metrics == {'LOG_predict': {'LOG_predict_acc': 0.5,
+										   'LOG_predict_f1': 0.4,
+										   'LOG_predict_auc': 0.7}}
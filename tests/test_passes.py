@@ -0,0 +1,514 @@
+#####################################################################################
+#
+#
+# 	Test Script: Graph Optimization Passes
+#
+#
+#####################################################################################
+
+
+#####################################################################################
+# External Library and Module Imports
+#####################################################################################
+
+#Helper packages
+import os
+import sys
+import ast
+import subprocess
+
+#Data packages
+import pytest
+import numpy as np
+import pandas as pd
+
+#Airbender
+sys.path.append(os.path.abspath(os.path.join(__file__, "../../")))
+import airbender
+from airbender.airflow import artifacts
+from airbender.airflow.artifacts import LocalArtifactStore, load_data, is_view_ref
+from airbender.airflow.executor import LocalExecutor
+from airbender.airflow.op_converter import fused_col_data_operation, block_data_operation, model_evaluation_operation, \
+										   stacked_evaluation_operation, k_fold_operation, fold_operation, \
+										   fold_metrics_operation
+from airbender.dag.emitter import DagEmitter
+from airbender.dag.generator import DagGenerator
+from airbender.dag.layers import DagLayer
+from airbender.airflow.lazy import run_lazy_task, resolve_callable
+from airbender.dag.passes import estimate_column_bytes, dataflow_dependencies
+from airbender.dag.graph import DagGraph, TaskNode
+from airbender.static.feature_engineering import normalize_values, winsorize, encode_labels, create_ordinal_df
+from airbender.static.splitting import k_fold
+
+#####################################################################################
+# Test Helpers: Layers Replaced in the Experiment Config
+#####################################################################################
+
+def grouped_layers():
+
+	#Three columns share one chain of block operations
+	return {'feature_engineering': {'cols': DagLayer({
+		('sepal_width', 'sepal_length', 'petal_length'): {winsorize: {'limits': [0.05, 0.05]},
+														  normalize_values: None},
+		'flower_label': {encode_labels: None}})}}
+
+def ordinal_layers():
+
+	#Labels are encoded with a large ordinal dict
+	ordinal_dict = dict({'setosa': 0, 'virginica': 1}, 
+						**{'unused_level_{}'.format(i): i + 2 for i in range(500)})
+	return {'feature_engineering': {'cols': DagLayer({
+		'sepal_width': {normalize_values: None},
+		'sepal_length': None,
+		'petal_length': {winsorize: {'limits': [0.05, 0.05]},
+						 normalize_values: None},
+		'flower_label': {create_ordinal_df: {'ordinal_dict': ordinal_dict}}})}}
+
+def fold_layers():
+
+	#Three-fold cross validation in place of the train / test split
+	return {'splitting': {'split': DagLayer({'sklearn': {k_fold: {'target': 'flower_label', 'k': 3}}})}}
+
+#####################################################################################
+# Test Class: Family Fusion
+#####################################################################################
+
+class TestFuseFamilies:
+
+	def test_sequential_families_are_fused(self, experiment_config):
+		dg = DagGenerator(experiment_config(fuse_families = True))
+		dg.build()
+		graph = dg.graph
+
+		for split in ['train', 'test']:
+			fused = graph.tasks['petal_length_{}_normalize_values'.format(split)]
+			assert fused.callable is fused_col_data_operation
+			assert len(fused.params['steps']) == 2
+			assert 'petal_length_{}_winsorize'.format(split) not in graph.tasks
+			assert graph.families['{}_fe_cols_petal_length'.format(split)] == [fused.task_id]
+
+		#Single member families and downstream dependencies are unchanged
+		assert 'sepal_width_train_normalize_values' in graph.tasks
+		assert 'petal_length_train_normalize_values' in graph.upstream['fe_cols_train_merge_layer']
+		assert graph.upstream['petal_length_test_normalize_values'] == ['fe_cols_train_merge_layer']
+
+	def test_fused_dag_is_emitted(self, experiment_config):
+		dg = DagGenerator(experiment_config(fuse_families = True))
+		dg.build()
+		output = DagEmitter(dg).emit()
+
+		ast.parse(output)
+		assert "python_callable=fused_col_data_operation" in output
+		assert "from airbender.airflow.op_converter import fused_col_data_operation" in dg.imports
+		assert "'func': winsorize" in output
+
+	def test_fused_results_match_unfused(self, experiment_config):
+		unfused = LocalExecutor(DagGenerator(experiment_config()))
+		unfused.run()
+		fused = LocalExecutor(DagGenerator(experiment_config(fuse_families = True)))
+		fused.run()
+
+		assert len(fused.operators) == len(unfused.operators) - 2
+		for task_id in ['petal_length_train_normalize_values', 'petal_length_test_normalize_values']:
+			assert load_data(fused.xcom.pull(task_id)).equals(load_data(unfused.xcom.pull(task_id)))
+
+		#Every step's artifact is kept for the test split
+		artifacts = fused.xcom.pull('petal_length_train_normalize_values', key = 'artifact')
+		assert len(artifacts) == 2 and all(artifacts)
+
+		for model in ['LOG', 'TREE']:
+			task_id = 'e_metrics_{}_predict_merge_metrics'.format(model)
+			assert fused.xcom.pull(task_id) == unfused.xcom.pull(task_id)
+
+	def test_unknown_generation_option(self, experiment_config):
+		config = experiment_config(fuse_everything = True)
+
+		with pytest.raises(AttributeError):
+			DagGenerator(config)
+
+#####################################################################################
+# Test Class: Column Grouping
+#####################################################################################
+
+class TestGroupColumns:
+
+	def test_shared_chains_become_one_block(self, experiment_config):
+		dg = DagGenerator(experiment_config(grouped_layers(), group_columns = True))
+		dg.build()
+		graph = dg.graph
+
+		block = graph.tasks['fe_cols_train_block_0']
+		assert block.callable is block_data_operation
+		assert block.params['columns'] == ['sepal_width', 'sepal_length', 'petal_length']
+		assert len(block.params['steps']) == 2
+		assert 'sepal_width_train_winsorize' not in graph.tasks
+		assert graph.tasks['fe_cols_train_merge_layer'].params['merge_ids'] == ['fe_cols_train_block_0',
+																				 'flower_label_train_encode_labels']
+		assert graph.upstream['fe_cols_test_block_0'] == ['fe_cols_train_merge_layer']
+
+		output = DagEmitter(dg).emit()
+		assert "'func': winsorize_block" in output
+		assert "winsorize_block" in dg.imports
+
+	def test_granularity_follows_data_size(self, experiment_config):
+		dg = DagGenerator(experiment_config(grouped_layers()))
+		dg.build()
+		column_bytes = estimate_column_bytes(dg.graph)
+		assert column_bytes > 0
+
+		#Two columns per task leaves the third column on its own
+		dg = DagGenerator(experiment_config(grouped_layers(), group_columns = True, group_block_bytes = 2*column_bytes))
+		dg.build()
+		assert dg.graph.tasks['fe_cols_train_block_0'].params['columns'] == ['sepal_width', 'sepal_length']
+		assert 'petal_length_train_normalize_values' in dg.graph.tasks
+
+		#Blocks smaller than a column keep one task per column
+		dg = DagGenerator(experiment_config(grouped_layers(), group_columns = True, group_block_bytes = 1))
+		dg.build()
+		assert not any('block' in task_id for task_id in dg.graph.tasks)
+
+	def test_grouped_results_match_columns(self, experiment_config):
+		per_column = LocalExecutor(DagGenerator(experiment_config(grouped_layers())))
+		per_column.run()
+		grouped = LocalExecutor(DagGenerator(experiment_config(grouped_layers(), group_columns = True)))
+		grouped.run()
+
+		for split in ['train', 'test']:
+			block = load_data(grouped.xcom.pull('fe_cols_{}_block_0'.format(split)))
+			for col in ['sepal_width', 'sepal_length', 'petal_length']:
+				column = load_data(per_column.xcom.pull('{}_{}_normalize_values'.format(col, split)))
+				assert np.allclose(block[col].to_numpy(), column.to_numpy())
+
+		#Per-column artifacts are kept as arrays
+		artifacts = grouped.xcom.pull('fe_cols_train_block_0', key = 'artifact')
+		assert artifacts[1]['mean'].shape == (3,)
+
+		for model in ['LOG', 'TREE']:
+			task_id = 'e_metrics_{}_predict_merge_metrics'.format(model)
+			predict_id = '{}_predict'.format(model)
+			assert grouped.xcom.pull(task_id)[predict_id] == \
+				   pytest.approx(per_column.xcom.pull(task_id)[predict_id])
+
+#####################################################################################
+# Test Class: Dataflow Dependencies
+#####################################################################################
+
+class TestDataflowDependencies:
+
+	def test_layer_barriers_are_removed(self, experiment_config):
+		dg = DagGenerator(experiment_config(dataflow = True))
+		dg.build()
+		graph = dg.graph
+
+		#Test columns wait for their train artifacts, not the whole train merge
+		assert set(graph.upstream['sepal_width_test_normalize_values']) == {'sklearn_train_test_split',
+																			  'sepal_width_train_normalize_values'}
+		assert graph.upstream['LOG_fit'] == ['model_data_split']
+		assert set(graph.upstream['LOG_predict']) == {'model_data_split', 'LOG_fit'}
+		assert graph.tasks['model_data_split'].params['sources']['train'] == 'fe_cols_train_merge_layer'
+
+		output = DagEmitter(dg).emit()
+		ast.parse(output)
+		assert "'sources': {" in output
+
+	def test_undeclared_operations_keep_barriers(self):
+		graph = DagGraph()
+		graph.add_section('custom', 'custom')
+		graph.add_task(TaskNode('a', None, {}, section = 'custom'))
+		graph.add_task(TaskNode('b', None, {}, section = 'custom'))
+		graph.add_edge('a', 'b')
+
+		dataflow_dependencies(graph)
+		assert graph.upstream['b'] == ['a']
+		assert 'sources' not in graph.tasks['b'].params
+
+	def test_dataflow_results_match_barriers(self, experiment_config):
+		barrier = LocalExecutor(DagGenerator(experiment_config()))
+		barrier.run()
+		dataflow = LocalExecutor(DagGenerator(experiment_config(dataflow = True)))
+		dataflow.run()
+
+		task_id = 'petal_length_test_normalize_values'
+		assert load_data(dataflow.xcom.pull(task_id)).equals(load_data(barrier.xcom.pull(task_id)))
+		assert load_data(dataflow.xcom.pull('fe_cols_test_merge_layer', key = 'test'))\
+					.equals(load_data(barrier.xcom.pull('fe_cols_test_merge_layer', key = 'test')))
+
+		for model in ['LOG', 'TREE']:
+			task_id = 'e_metrics_{}_predict_merge_metrics'.format(model)
+			assert dataflow.xcom.pull(task_id) == barrier.xcom.pull(task_id)
+
+#####################################################################################
+# Test Class: Lazy Imports
+#####################################################################################
+
+class TestLazyImports:
+
+	@pytest.mark.parametrize('module', ['airbender.airflow.lazy', 'airbender.airflow.factory'])
+	def test_runner_imports_are_light(self, module):
+		script = "import sys, {}; print(sorted(set(['numpy', 'pandas']) & set(sys.modules)))".format(module)
+		output = subprocess.check_output([sys.executable, '-c', script], 
+										 cwd = os.path.abspath(os.path.join(__file__, "../../")))
+
+		assert output.decode().strip() == '[]'
+
+	def test_dag_file_imports_only_the_lazy_runner(self, experiment_config):
+		config = experiment_config(lazy_imports = True)
+		dg = DagGenerator(config)
+		dg.build()
+		output = DagEmitter(dg).emit()
+
+		ast.parse(output)
+		assert all(node.callable is run_lazy_task for node in dg.graph.tasks.values())
+		assert dg.imports.count("import ") == 1
+		assert "from airbender.airflow.lazy import run_lazy_task" in dg.imports
+		assert "'operation': 'airbender.airflow.op_converter:col_data_operation'" in output
+		assert "{'__callable__': 'airbender.static.feature_engineering:winsorize'}" in output
+
+	def test_lazy_results_match_eager(self, experiment_config):
+		eager = LocalExecutor(DagGenerator(experiment_config()))
+		eager.run()
+
+		config = experiment_config(lazy_imports = True, fuse_families = True)
+		lazy = LocalExecutor(DagGenerator(config))
+		lazy.run()
+
+		for model in ['LOG', 'TREE']:
+			task_id = 'e_metrics_{}_predict_merge_metrics'.format(model)
+			assert lazy.xcom.pull(task_id) == eager.xcom.pull(task_id)
+
+	def test_unknown_callable_raises(self):
+		assert resolve_callable('airbender.static.feature_engineering:winsorize') is winsorize
+		with pytest.raises(ImportError):
+			resolve_callable('airbender.static.feature_engineering:missing')
+
+#####################################################################################
+# Test Class: Sidecar Params
+#####################################################################################
+
+class TestExternalizeParams:
+
+	def test_large_params_leave_the_dag_file(self, experiment_config):
+		dg = DagGenerator(experiment_config(ordinal_layers(), sidecar_bytes = 1024))
+		dg.build()
+		output = DagEmitter(dg).emit()
+
+		ast.parse(output)
+		assert "unused_level_42" not in output
+		assert "'__airbender_artifact__'" in output
+
+		#Small params and callables stay inline
+		assert "'limits': [0.05, 0.05]" in output
+		assert "'func': create_ordinal_df" in output
+
+		params = dg.graph.tasks['flower_label_train_create_ordinal_df'].params
+		assert params['params']['kind'] == 'object'
+		assert params['split'] == 'train'
+
+	def test_sidecar_results_match_inline(self, experiment_config):
+		inline = LocalExecutor(DagGenerator(experiment_config(ordinal_layers())))
+		inline.run()
+		sidecar = LocalExecutor(DagGenerator(experiment_config(ordinal_layers(), sidecar_bytes = 1024, lazy_imports = True)))
+		sidecar.run()
+
+		for split in ['train', 'test']:
+			task_id = 'flower_label_{}_create_ordinal_df'.format(split)
+			assert load_data(sidecar.xcom.pull(task_id)).equals(load_data(inline.xcom.pull(task_id)))
+
+		task_id = 'e_metrics_LOG_predict_merge_metrics'
+		assert sidecar.xcom.pull(task_id) == inline.xcom.pull(task_id)
+
+	def test_pruned_store_is_refused(self, experiment_config, tmp_path):
+		config = experiment_config(ordinal_layers(), sidecar_bytes = 1024)
+		artifacts.set_artifact_store(LocalArtifactStore(str(tmp_path / 'pruned'), retention = 60))
+
+		with pytest.raises(ValueError):
+			DagGenerator(config).build()
+
+	@pytest.mark.parametrize("spec", [False, True], ids = ["dag", "spec"])
+	def test_missing_sidecars_are_regenerated(self, experiment_config, spec, tmp_path):
+		config = experiment_config(ordinal_layers(), sidecar_bytes = 1024, spec = spec)
+		store = artifacts.get_artifact_store()
+
+		dg = DagGenerator(config)
+		filepath = dg.generate_file(dags_folder = str(tmp_path))
+		sidecars = [os.path.join(path, name) for path, _, names in os.walk(store.root) for name in names]
+		assert sidecars
+
+		dg = DagGenerator(config)
+		dg.generate_file(dags_folder = str(tmp_path))
+		assert not dg.written
+
+		for sidecar in sidecars:
+			os.remove(sidecar)
+		dg = DagGenerator(config)
+		dg.generate_file(dags_folder = str(tmp_path))
+		assert dg.written and all(os.path.exists(sidecar) for sidecar in sidecars)
+
+		#Spec-based dags are regenerated without their spec
+		if spec:
+			os.remove(filepath[:-len(".py")] + ".json")
+			dg = DagGenerator(config)
+			dg.generate_file(dags_folder = str(tmp_path))
+			assert dg.written and os.path.exists(filepath[:-len(".py")] + ".json")
+
+#####################################################################################
+# Test Class: Metric Grouping
+#####################################################################################
+
+class TestGroupMetrics:
+
+	def test_metrics_of_a_model_are_grouped(self, experiment_config):
+		config = experiment_config(group_metrics = True)
+		dg = DagGenerator(config)
+		dg.build()
+		graph = dg.graph
+
+		for model in ['LOG', 'TREE']:
+			evaluation = graph.tasks['e_metrics_{}_predict_evaluation'.format(model)]
+			assert evaluation.callable is model_evaluation_operation
+			assert [metric['task_id'] for metric in evaluation.params['metrics']] == \
+				['{}_predict_acc'.format(model), '{}_predict_f1'.format(model)]
+			assert '{}_predict_acc'.format(model) not in graph.tasks
+
+			merge = graph.tasks['e_metrics_{}_predict_merge_metrics'.format(model)]
+			assert merge.params['merge_ids'] == [evaluation.task_id]
+			assert merge.params['evaluations'] == [evaluation.task_id]
+			assert graph.upstream[merge.task_id] == [evaluation.task_id]
+
+		ast.parse(DagEmitter(dg).emit())
+
+	def test_grouped_results_match_ungrouped(self, experiment_config):
+		ungrouped = LocalExecutor(DagGenerator(experiment_config()))
+		ungrouped.run()
+
+		config = experiment_config(group_metrics = True, dataflow = True)
+		grouped = LocalExecutor(DagGenerator(config))
+		grouped.run()
+
+		assert len(grouped.operators) == len(ungrouped.operators) - 2
+		for model in ['LOG', 'TREE']:
+			task_id = 'e_metrics_{}_predict_merge_metrics'.format(model)
+			metrics = ungrouped.xcom.pull(task_id)['{}_predict'.format(model)]
+			assert grouped.xcom.pull(task_id)['{}_predict'.format(model)] == pytest.approx(metrics)
+
+	def test_models_are_stacked(self, experiment_config):
+		config = experiment_config(stack_models = True, group_metrics = True)
+		dg = DagGenerator(config)
+		dg.build()
+		graph = dg.graph
+
+		evaluation = graph.tasks['e_metrics_evaluation']
+		assert evaluation.callable is stacked_evaluation_operation
+		assert evaluation.params['model_ids'] == ['LOG_predict', 'TREE_predict']
+		assert [metric['task_ids'] for metric in evaluation.params['metrics']] == \
+			[{'LOG_predict': 'LOG_predict_acc', 'TREE_predict': 'TREE_predict_acc'},
+			 {'LOG_predict': 'LOG_predict_f1', 'TREE_predict': 'TREE_predict_f1'}]
+		assert set(graph.upstream[evaluation.task_id]) >= {'LOG_predict', 'TREE_predict'}
+
+		for model in ['LOG', 'TREE']:
+			merge = graph.tasks['e_metrics_{}_predict_merge_metrics'.format(model)]
+			assert merge.params['evaluations'] == [evaluation.task_id]
+
+		ast.parse(DagEmitter(dg).emit())
+
+	@pytest.mark.parametrize('generation', [{}, {'dataflow': True}])
+	def test_stacked_results_match_unstacked(self, experiment_config, generation):
+		unstacked = LocalExecutor(DagGenerator(experiment_config()))
+		unstacked.run()
+
+		config = experiment_config(stack_models = True, **generation)
+		stacked = LocalExecutor(DagGenerator(config))
+		stacked.run()
+
+		assert len(stacked.operators) == len(unstacked.operators) - 3
+		for model in ['LOG', 'TREE']:
+			task_id = 'e_metrics_{}_predict_merge_metrics'.format(model)
+			metrics = unstacked.xcom.pull(task_id)['{}_predict'.format(model)]
+			assert stacked.xcom.pull(task_id)['{}_predict'.format(model)] == pytest.approx(metrics)
+
+#####################################################################################
+# Test Class: Fold Fan-Out
+#####################################################################################
+
+class TestFanOutFolds:
+
+	folds = ['fold0', 'fold1', 'fold2']
+
+	def test_k_fold_positions(self):
+		data = pd.DataFrame({'x': np.arange(10)}, index = np.arange(10, 20))
+		folds, target = k_fold(data, 'x', 5)
+
+		assert list(folds) == ['fold{}'.format(i) for i in range(5)]
+		assert sorted(np.concatenate([fold['test'] for fold in folds.values()])) == list(range(10))
+		for fold in folds.values():
+			assert sorted(np.concatenate([fold['train'], fold['test']])) == list(range(10))
+
+	def test_tasks_are_fanned_out_per_fold(self, experiment_config):
+		dg = DagGenerator(experiment_config(fold_layers()))
+		dg.build()
+		graph = dg.graph
+
+		assert graph.tasks['sklearn_k_fold'].callable is k_fold_operation
+		for fold in self.folds:
+			assert graph.tasks['{}_sklearn_k_fold'.format(fold)].callable is fold_operation
+			assert graph.tasks['{}_LOG_predict_acc'.format(fold)].params['model_id'] == '{}_LOG_predict'.format(fold)
+			assert graph.families['{}_train_fe_cols_petal_length'.format(fold)] == \
+				['{}_petal_length_train_winsorize'.format(fold), '{}_petal_length_train_normalize_values'.format(fold)]
+			assert graph.tasks['{}_petal_length_train_winsorize'.format(fold)].family_id == \
+				'{}_train_fe_cols_petal_length'.format(fold)
+		assert 'LOG_predict' not in graph.tasks
+
+		#Folds share no tasks, so they run in parallel until metrics are averaged
+		for task_id, node in graph.tasks.items():
+			if node.callable is fold_metrics_operation:
+				continue
+			for upstream_id in graph.upstream[task_id]:
+				fold = graph.tasks[upstream_id].meta.get('fold')
+				assert fold is None or fold == node.meta.get('fold')
+
+		merge = graph.tasks['e_metrics_LOG_predict_merge_metrics']
+		assert merge.callable is fold_metrics_operation
+		assert graph.upstream[merge.task_id] == ['{}_e_metrics_LOG_predict_merge_metrics'.format(fold) 
+													for fold in self.folds]
+
+		ast.parse(DagEmitter(dg).emit())
+
+	def test_folds_are_views_of_the_data(self, experiment_config):
+		executor = LocalExecutor(DagGenerator(experiment_config(fold_layers())), max_workers = 3)
+		xcom = executor.run()
+
+		data_ref = xcom.pull('flowers_csv_read_csv', key = 'data')
+		data = load_data(data_ref)
+		folds = xcom.pull('sklearn_k_fold', key = 'folds')
+
+		test_rows = []
+		for fold in self.folds:
+			assert all(is_view_ref(view) and view['data'] == data_ref for view in folds[fold].values())
+
+			y_test = load_data(xcom.pull('{}_model_data_split'.format(fold), key = 'y_test'))
+			assert list(y_test.index) == list(load_data(folds[fold]['test']).index)
+			test_rows += list(y_test.index)
+
+		assert sorted(test_rows) == list(data.index)
+
+	def test_metrics_are_averaged_over_folds(self, experiment_config):
+		xcom = LocalExecutor(DagGenerator(experiment_config(fold_layers())), max_workers = 3).run()
+
+		for model in ['LOG_predict', 'TREE_predict']:
+			metrics = xcom.pull('e_metrics_{}_merge_metrics'.format(model))
+			assert list(metrics) == [model]
+
+			for metric in ['acc', 'f1']:
+				fold_values = [xcom.pull('{}_e_metrics_{}_merge_metrics'.format(fold, model))\
+									['{}_{}'.format(fold, model)]['{}_{}_{}'.format(fold, model, metric)]
+								for fold in self.folds]
+				assert metrics[model]['{}_{}'.format(model, metric)] == pytest.approx(np.mean(fold_values))
+
+	def test_folds_with_other_passes(self, experiment_config):
+		xcom = LocalExecutor(DagGenerator(experiment_config(fold_layers()))).run()
+		optimized = LocalExecutor(DagGenerator(experiment_config(fold_layers(), stack_models = True, fuse_families = True,
+														   fuse_splits = True, lazy_imports = True))).run()
+
+		for model in ['LOG_predict', 'TREE_predict']:
+			task_id = 'e_metrics_{}_merge_metrics'.format(model)
+			assert optimized.pull(task_id)[model] == pytest.approx(xcom.pull(task_id)[model])
@@ -0,0 +1,110 @@
+#####################################################################################
+#
+#
+# 	Test Script: Generation Profiling
+#
+#
+#####################################################################################
+
+
+#####################################################################################
+# External Library and Module Imports
+#####################################################################################
+
+#Helper packages
+import os
+import sys
+import json
+import tracemalloc
+
+#Data packages
+import pytest
+
+#Airbender
+sys.path.append(os.path.abspath(os.path.join(__file__, "../../")))
+import airbender
+from airbender.dag import profiling
+from airbender.dag.generator import DagGenerator
+
+#####################################################################################
+# Test Fixtures
+#####################################################################################
+
+@pytest.fixture
+def profiled(experiment_config):
+	def _profiled(**generation):
+		dg = DagGenerator(experiment_config(profile = True, **generation))
+		dg.build()
+		return dg
+
+	return _profiled
+
+#####################################################################################
+# Test Class: Generation Profile
+#####################################################################################
+
+class TestGenerationProfile:
+
+	def test_every_phase_is_measured(self, profiled):
+		profile = profiled().profile
+
+		assert list(profile.phases) == ['parse_dag_config', 'detect_external_imports',
+										'determine_layer_lineage', 'flatten_layers',
+										'parse_layers', 'write_layers', 'connect_layers',
+										'graph_passes', 'write_imports']
+		assert all(record['seconds'] >= 0 and record['peak_bytes'] >= 0 for record in profile.phases.values())
+		assert profile.phases['write_layers']['peak_bytes'] > 0
+
+		#Layers are measured within the layer phases
+		assert list(profile.layers) == ['ds_flowers', 's_split', 'fe_cols', 'm_modeling', 'e_metrics']
+		for records in profile.layers.values():
+			assert list(records) == ['parse_layers', 'write_layers']
+		assert profile.layers['fe_cols']['write_layers']['seconds'] <= profile.phases['write_layers']['seconds']
+
+		#Tracing is stopped once the build is done
+		assert not tracemalloc.is_tracing()
+
+	def test_peaks_without_reset(self, profiled, monkeypatch):
+
+		#Python before 3.9 cannot reset the traced peak
+		monkeypatch.setattr(profiling, 'RESET_PEAK', False)
+		profile = profiled().profile
+
+		assert all(record['peak_bytes'] >= 0 for record in profile.phases.values())
+		assert profile.phases['write_layers']['peak_bytes'] > 0
+		for records in profile.layers.values():
+			assert all(record['peak_bytes'] >= 0 for record in records.values())
+
+	def test_graph_statistics(self, profiled):
+		dg = profiled()
+		stats = dg.profile.graph
+
+		assert stats['tasks'] == len(dg.graph.tasks)
+		assert stats['edges'] == sum(len(upstream) for upstream in dg.graph.upstream.values())
+		assert stats['max_width'] >= 4
+		assert stats['depth'] < stats['tasks']
+		assert stats['sections']['fe_cols'] == 10
+		assert stats['estimated_xcom_bytes']['ds_flowers'] > 0
+		assert stats['estimated_xcom_bytes']['e_metrics'] == 0
+
+	def test_lazy_graphs_are_estimated(self, profiled):
+		eager = profiled().profile.graph['estimated_xcom_bytes']
+		lazy = profiled(lazy_imports = True).profile.graph['estimated_xcom_bytes']
+
+		assert lazy == eager
+
+	def test_profile_dumps_to_json(self, profiled, tmp_path):
+		profile = profiled().profile
+		path = str(tmp_path / 'profile.json')
+		profile.to_json(path)
+
+		with open(path) as profile_file:
+			dumped = json.load(profile_file)
+		assert dumped['graph']['tasks'] == profile.graph['tasks']
+		assert set(dumped) == {'phases', 'layers', 'graph'}
+
+	def test_profiling_is_opt_in(self, experiment_config):
+		dg = DagGenerator(experiment_config())
+		dg.build()
+
+		assert dg.profile is None
@@ -0,0 +1,102 @@
+#####################################################################################
+#
+#
+# 	Test Script: Stage Registry
+#
+#
+#####################################################################################
+
+
+#####################################################################################
+# External Library and Module Imports
+#####################################################################################
+
+#Helper packages
+import os
+import sys
+
+#Data packages
+import pytest
+
+#Airbender
+sys.path.append(os.path.abspath(os.path.join(__file__, "../../")))
+import airbender
+from airbender.dag.generator import DagGenerator
+from airbender.dag.layers import DagLayer
+from airbender.dag import stages
+from airbender.dag.stages import Stage, register_stage, unregister_stage, get_stage, stage_table
+from airbender.airflow.op_converter import bulk_data_operation
+
+#####################################################################################
+# Test Helpers and Fixtures
+#####################################################################################
+
+def plot_features(data):
+	return data
+
+@pytest.fixture
+def visualization_stage():
+	stage = register_stage(Stage('visualization', bulk_data_operation,
+								 args = lambda layer, route: {'func': route['op'],
+															  'params': route['params']},
+								 task_tag = lambda layer, route: [route['family'], route['op_name']]))
+	yield stage
+	unregister_stage('visualization')
+
+#####################################################################################
+# Test Class: Stage Registry
+#####################################################################################
+
+class TestStageRegistry:
+
+	def test_table_follows_hierarchy(self):
+		assert list(stage_table()) == ['data_sources', 'splitting', 'preprocessing', 'feature_engineering',
+									   'modeling', 'evaluation', 'merge_layer', 'merge_metrics',
+									   'model_data_split']
+
+		#The table is compiled once
+		assert stage_table() is stage_table()
+
+	def test_unregistered_stage(self):
+		with pytest.raises(ValueError, match = "No stage is registered for 'storage'"):
+			get_stage('storage')
+
+	def test_duplicate_stage(self):
+		with pytest.raises(ValueError, match = "already registered"):
+			register_stage(Stage('modeling', bulk_data_operation, args = None, task_tag = None))
+
+	def test_stage_outside_hierarchy(self):
+		stages.STAGES['plotting'] = Stage('plotting', bulk_data_operation, args = None, task_tag = None)
+		stage_table.cache_clear()
+		try:
+			with pytest.raises(ValueError, match = "neither in the execution hierarchy"):
+				stage_table()
+		finally:
+			unregister_stage('plotting')
+
+	def test_registered_stage_is_generated(self, experiment_config, visualization_stage):
+		config = experiment_config()
+		config['config']['visualization'] = {'plots': DagLayer({'features': {plot_features: None}})}
+		dg = DagGenerator(config)
+		dg.build()
+
+		visualization = [node for node in dg.graph.tasks.values() if node.callable is bulk_data_operation]
+		assert [node.task_id for node in visualization] == ['features_plot_features']
+		assert visualization[0].params['func'] is plot_features
+
+	def test_merge_ids_only_built_for_merges(self, experiment_config, monkeypatch):
+		parents = []
+		get_merge_ids = DagLayer.get_merge_ids
+
+		def tracked(layer, return_type, parent, *args):
+			parents.append(parent)
+			return get_merge_ids(layer, return_type, parent, *args)
+
+		monkeypatch.setattr(DagLayer, 'get_merge_ids', tracked)
+		dg = DagGenerator(experiment_config())
+		dg.build()
+
+		merges = [node for node in dg.graph.tasks.values() if 'merge_ids' in node.params]
+		assert merges
+		assert set(parents) == {'merge_layer', 'merge_metrics'}
+		assert len(parents) == sum(2 if 'pass_through_cols' in node.params else 1 for node in merges)
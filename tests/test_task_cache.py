@@ -0,0 +1,226 @@
+#####################################################################################
+#
+#
+# 	Test Script: Task Result Cache
+#
+#
+#####################################################################################
+
+
+#####################################################################################
+# External Library and Module Imports
+#####################################################################################
+
+#Helper packages
+import os
+import sys
+
+#Data packages
+import pytest
+import numpy as np
+import pandas as pd
+
+#Airbender
+sys.path.append(os.path.abspath(os.path.join(__file__, "../../")))
+import airbender
+from airbender.airflow import artifacts
+from airbender.airflow.artifacts import LocalArtifactStore, store_data
+from airbender.airflow.cache import TaskResultCache
+from airbender.airflow.executor import LocalExecutor
+from airbender.airflow.op_converter import col_data_operation, fit_operation
+from airbender.dag.generator import DagGenerator
+from airbender.dag.operators import DagOperator
+
+#####################################################################################
+# Test Fixtures
+#####################################################################################
+
+@pytest.fixture
+def cache(tmp_path):
+	return TaskResultCache(str(tmp_path / 'cache'))
+
+def make_operator(params):
+	return DagOperator('sepal_width_train_normalize_values', col_data_operation, params)
+
+#####################################################################################
+# Test Class: Task Result Cache
+#####################################################################################
+
+class TestTaskResultCache:
+
+	params = {'column_data_id': 'sepal_width',
+			  'inherits': False,
+			  'split': 'train',
+			  'func': pd.Series.abs,
+			  'params': {'limits': [0.05, 0.05]}}
+
+	def test_key_is_stable(self, cache):
+		assert cache.key(make_operator(dict(self.params)), ['a', 'b']) == \
+			   cache.key(make_operator(dict(self.params)), ['b', 'a'])
+
+	@pytest.mark.parametrize("change", [{'func': pd.Series.round},
+										{'params': {'limits': [0.1, 0.1]}},
+										{'split': 'test'}])
+	def test_key_changes_with_params(self, cache, change):
+		changed = dict(self.params, **change)
+		assert cache.key(make_operator(self.params), []) != cache.key(make_operator(changed), [])
+
+	def test_key_changes_with_upstream(self, cache):
+		assert cache.key(make_operator(self.params), ['a']) != \
+			   cache.key(make_operator(self.params), ['b'])
+
+	def test_key_changes_with_callable(self, cache):
+		assert cache.key(make_operator(self.params), []) != \
+			   cache.key(DagOperator('fit', fit_operation, self.params), [])
+
+	def test_key_hashes_array_contents(self, cache):
+		first, second = np.zeros(10000), np.zeros(10000)
+		second[5000] = 1.0
+		assert repr(first) == repr(second)
+
+		def keyed(array):
+			return cache.key(make_operator(dict(self.params, params = {'weights': array})), [])
+
+		assert keyed(first) != keyed(second)
+		assert keyed(first) == keyed(first.copy())
+		assert keyed(first) != keyed(first.astype(np.float32))
+		assert keyed(first) != keyed(first.reshape(100, 100))
+
+	def test_uncanonical_params_are_not_cached(self, cache):
+		operator = make_operator(dict(self.params, params = {'rng': np.random.default_rng(0)}))
+
+		assert cache.key(operator, []) is None
+		assert cache.key(make_operator(self.params), [None]) is None
+
+	def test_round_trip_and_persistence(self, cache):
+		cache.put('ab' * 32, [('artifact', None), ('return_value', 3)])
+
+		reopened = TaskResultCache(cache.root)
+		assert reopened.get('ab' * 32) == [('artifact', None), ('return_value', 3)]
+		assert reopened.get('cd' * 32) is None
+		assert (reopened.hits, reopened.misses) == (1, 1)
+
+	def test_lru_eviction(self, tmp_path):
+		cache = TaskResultCache(str(tmp_path), max_bytes = 2500)
+		for key in ['a', 'b', 'c']:
+			cache.put(key * 64, [('return_value', key * 1000)])
+			cache.get('a' * 64)
+
+		assert cache.size <= cache.max_bytes
+		assert cache.get('a' * 64) is not None
+		assert cache.get('b' * 64) is None
+		assert cache.get('c' * 64) is not None
+
+	def test_missing_artifact_is_a_miss(self, cache, tmp_path):
+		artifacts.set_artifact_store(LocalArtifactStore(str(tmp_path / 'artifacts')))
+		try:
+			ref = store_data(pd.Series([1.0, 2.0], name = 'sepal_width'))
+			cache.put('ef' * 32, [('return_value', ref)])
+			assert cache.get('ef' * 32) is not None
+
+			#Artifacts removed from the active store are restored by the cache
+			store = artifacts.get_artifact_store()
+			store.delete(ref)
+			assert cache.get('ef' * 32) is not None
+			assert store.exists(ref)
+
+			os.remove(cache.store.path(ref[artifacts.ARTIFACT_KEY], ref['format']))
+			assert cache.get('ef' * 32) is None
+			assert not os.path.exists(cache.path('ef' * 32))
+		finally:
+			artifacts.set_artifact_store(None)
+
+	def test_artifacts_count_toward_the_bound(self, tmp_path):
+		artifacts.set_artifact_store(LocalArtifactStore(str(tmp_path / 'artifacts')))
+		try:
+			store = artifacts.get_artifact_store()
+			refs = [store_data(pd.Series(np.arange(1000, dtype = float) + i, name = 'sepal_width')) for i in range(3)]
+			artifact_bytes = store.size(refs[0])
+
+			cache = TaskResultCache(str(tmp_path / 'cache'), max_bytes = int(2.5 * artifact_bytes))
+			for i, ref in enumerate(refs):
+				cache.put(str(i) * 64, [('return_value', ref)])
+
+			assert cache.size <= cache.max_bytes
+			assert cache.get('0' * 64) is None
+
+			#Copies of artifacts are evicted with their entry. The active store keeps them
+			assert not cache.store.exists(refs[0])
+			assert cache.store.exists(refs[1]) and cache.store.exists(refs[2])
+			assert all(store.exists(ref) for ref in refs)
+
+			#Entries larger than the whole cache are not stored
+			large = store_data(pd.Series(np.arange(3000, dtype = float), name = 'sepal_width'))
+			assert not cache.put('f' * 64, [('return_value', large)])
+		finally:
+			artifacts.set_artifact_store(None)
+
+	def test_shared_artifacts_are_kept(self, tmp_path):
+		artifacts.set_artifact_store(LocalArtifactStore(str(tmp_path / 'artifacts')))
+		try:
+			store = artifacts.get_artifact_store()
+			ref = store_data(pd.Series(np.arange(1000, dtype = float), name = 'sepal_width'))
+
+			cache = TaskResultCache(str(tmp_path / 'cache'))
+			cache.put('a' * 64, [('return_value', ref)])
+			cache.put('b' * 64, [('return_value', ref)])
+			assert cache.size < 2 * store.size(ref)
+
+			cache.clear()
+			assert not cache.store.exists(ref)
+			assert store.exists(ref)
+
+			#Sizes are recovered by a reopened cache
+			ref = store_data(pd.Series(np.arange(1000, dtype = float), name = 'sepal_width'))
+			cache.put('a' * 64, [('return_value', ref)])
+			reopened = TaskResultCache(cache.root)
+			assert reopened.size == cache.size > store.size(ref)
+		finally:
+			artifacts.set_artifact_store(None)
+
+	def test_result_without_stored_artifacts_is_skipped(self, cache, tmp_path):
+		artifacts.set_artifact_store(LocalArtifactStore(str(tmp_path / 'artifacts')))
+		ref = store_data(pd.Series([1.0, 2.0], name = 'sepal_width'))
+		artifacts.set_artifact_store(None)
+
+		assert not cache.put('ef' * 32, [('return_value', ref)])
+		assert cache.get('ef' * 32) is None
+
+	def test_unpicklable_result_is_skipped(self, cache):
+		assert not cache.put('aa' * 32, [('return_value', lambda x: x)])
+		assert cache.get('aa' * 32) is None
+
+#####################################################################################
+# Test Class: Cached Local Execution
+#####################################################################################
+
+class TestCachedExecution:
+
+	def test_rerun_is_fully_cached(self, experiment_config, cache):
+		first = LocalExecutor(DagGenerator(experiment_config()), cache = cache)
+		first.run()
+		assert first.cached_tasks == []
+
+		second = LocalExecutor(DagGenerator(experiment_config()), cache = cache)
+		xcom = second.run()
+
+		assert set(second.cached_tasks) == set(second.operators)
+		assert len(second.task_timings) == 0
+		assert xcom.pull('e_metrics_LOG_predict_merge_metrics') == \
+			   first.xcom.pull('e_metrics_LOG_predict_merge_metrics')
+
+	def test_model_change_reruns_only_that_model(self, experiment_config, cache):
+		LocalExecutor(DagGenerator(experiment_config()), cache = cache).run()
+
+		config = experiment_config()
+		tree = config['config']['modeling']['modeling'].config['TREE']
+		tree[list(tree)[0]]['max_depth'] = 2
+
+		executor = LocalExecutor(DagGenerator(config), cache = cache)
+		executor.run()
+
+		assert set(executor.task_timings) == {'TREE_fit', 'TREE_predict',
+											  'TREE_predict_acc', 'TREE_predict_f1',
+											  'e_metrics_TREE_predict_merge_metrics'}
+		assert 'flowers_csv_read_csv' in executor.cached_tasks
+		assert 'LOG_fit' in executor.cached_tasks